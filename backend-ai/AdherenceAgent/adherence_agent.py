@@ -1,73 +1,31 @@
 import sys
 import os
-import json
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from Prompts.prompt import medication_adherence_prompt
 from Configurations.config import llm_model
+from AgentRuntime.structured_output import StructuredOutput
+from AgentRuntime.single_flight import SingleFlight
+from AgentRuntime.token_budget import TokenBudget
 from PydanticModels.model import MedicationAdherenceInput, AdherencePrediction
 
 
-def predict_medication_adherence(user_input: MedicationAdherenceInput) -> AdherencePrediction:
-    """
-    Predict patient medication adherence risk based on demographics, prescription complexity, 
-    and history.
-    
-    Args:
-        user_input: MedicationAdherenceInput containing patient ID, demographics, prescription, 
-                   and history
-        
-    Returns:
-        AdherencePrediction object with adherence probability, risk level, risk factors, 
-        and interventions
-    """
-    # Create format instructions for AdherencePrediction
-    format_instructions = """
-    You must return a JSON object with the following structure:
-    {
-        "adherenceProbability": 65,
-        "riskLevel": "moderate",
-        "riskFactors": [
-            {
-                "factor": "High medication complexity",
-                "impact": 25,
-                "description": "Complex dosing schedule with 4 doses per day reduces adherence likelihood"
-            },
-            {
-                "factor": "Previous poor adherence",
-                "impact": 30,
-                "description": "Previous adherence rate of 45% is a strong predictor of future non-adherence"
-            }
-        ],
-        "interventions": [
-            {
-                "strategy": "Medication reminder system",
-                "expectedImprovement": 15,
-                "priority": "high"
-            },
-            {
-                "strategy": "Simplify dosing schedule",
-                "expectedImprovement": 20,
-                "priority": "high"
-            },
-            {
-                "strategy": "Patient education program",
-                "expectedImprovement": 10,
-                "priority": "medium"
-            }
-        ]
-    }
-    
-    Important:
-    - adherenceProbability is an integer 0-100
-    - riskLevel must be one of: "low", "moderate", "high", "very_high"
-    - impact for risk factors is an integer 0-100
-    - expectedImprovement for interventions is an integer 0-100
-    - priority must be one of: "low", "medium", "high"
-    - Rank risk factors by impact (highest first)
-    - Rank interventions by priority and expected improvement (highest first)
-    """
-    
+# Reply schema derived from AdherencePrediction; the provider enforces it, the prompt only adds these rules
+STRUCTURED_OUTPUT = StructuredOutput("adherence_prediction", AdherencePrediction, guidance="""
+- adherenceProbability is an integer 0-100
+- impact for risk factors is an integer 0-100
+- expectedImprovement for interventions is an integer 0-100
+- Rank risk factors by impact (highest first)
+- Rank interventions by priority and expected improvement (highest first)
+""")
+
+
+TOKEN_BUDGET = TokenBudget(STRUCTURED_OUTPUT)
+_single_flight = SingleFlight(STRUCTURED_OUTPUT.name)
+
+
+def _format_prompt(user_input: MedicationAdherenceInput) -> list:
+    """Build the system and patient messages sent to the model for `predict_medication_adherence`."""
     # Format optional fields
     socioeconomic_status = user_input.demographics.socioeconomicStatus or "Not specified"
     education = user_input.demographics.education or "Not specified"
@@ -77,7 +35,7 @@ def predict_medication_adherence(user_input: MedicationAdherenceInput) -> Adhere
     missed_appointments = user_input.history.missedAppointments if user_input.history.missedAppointments is not None else "Not specified"
     has_support = "Yes" if user_input.history.hasSupport else "No" if user_input.history.hasSupport is not None else "Not specified"
     
-    formatted_prompt = medication_adherence_prompt.format(
+    formatted_prompt = TOKEN_BUDGET.fit(medication_adherence_prompt, dict(
         patient_id=user_input.patientId,
         age=user_input.demographics.age,
         socioeconomic_status=socioeconomic_status,
@@ -91,32 +49,42 @@ def predict_medication_adherence(user_input: MedicationAdherenceInput) -> Adhere
         previous_adherence=previous_adherence,
         missed_appointments=missed_appointments,
         has_support=has_support,
-        format_instructions=format_instructions
-    )
+        format_instructions=STRUCTURED_OUTPUT.format_instructions
+    ))
 
-    response = llm_model.LLM().invoke(formatted_prompt)
+    return formatted_prompt
+
+
+def _parse_response(response) -> AdherencePrediction:
+    """Parse the model reply for `predict_medication_adherence` into AdherencePrediction."""
+    return STRUCTURED_OUTPUT.parse(response)
+
+
+def predict_medication_adherence(user_input: MedicationAdherenceInput) -> AdherencePrediction:
+    """
+    Predict patient medication adherence risk based on demographics, prescription complexity, 
+    and history.
     
-    # Parse the JSON response
-    try:
-        content = response.content.strip()
-        # Remove markdown code blocks if present
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-        
-        data = json.loads(content)
+    Args:
+        user_input: MedicationAdherenceInput containing patient ID, demographics, prescription, 
+                   and history
         
-        # Validate and create AdherencePrediction object
-        if isinstance(data, dict):
-            return AdherencePrediction(**data)
-        else:
-            raise ValueError(f"Expected JSON object, got {type(data)}")
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to parse JSON response: {str(e)}. Response content: {content[:200]}")
-    except Exception as e:
-        raise ValueError(f"Failed to process medication adherence prediction response: {str(e)}")
+    Returns:
+        AdherencePrediction object with adherence probability, risk level, risk factors, 
+        and interventions
+    """
+    response = STRUCTURED_OUTPUT.bind(llm_model.LLM()).invoke(_format_prompt(user_input))
+    return _parse_response(response)
+
+
+async def predict_medication_adherence_async(user_input: MedicationAdherenceInput) -> AdherencePrediction:
+    """
+    Async variant of `predict_medication_adherence` that awaits the model's native async API,
+    so the calling event loop is free while the request is in flight. Identical
+    requests arriving while it is in flight share its model call.
+    """
+    async def compute():
+        response = await STRUCTURED_OUTPUT.bind(llm_model.LLM()).ainvoke(_format_prompt(user_input))
+        return _parse_response(response)
 
+    return await _single_flight.do(_single_flight.make_key(user_input), compute)
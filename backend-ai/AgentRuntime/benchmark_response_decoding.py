@@ -0,0 +1,128 @@
+"""
+Microbenchmark: decoding agent replies with one validate_json pass vs the old per-agent parse.
+
+The old path (kept here as `legacy_parse`) stripped the text, sliced off
+code fences, ran json.loads, checked the top-level type and built the model
+with Model(**item), walking the payload twice. The new path validates the
+raw text directly with a cached TypeAdapter. Replies are generated from the
+response classes with list fields of --list-items entries, so their size is
+close to real agent output.
+
+Also timed: the repair path (fenced reply, reply cut off mid-value) and the
+cost of building a TypeAdapter, which is why adapters are cached per type.
+
+Usage:
+    python -m AgentRuntime.benchmark_response_decoding
+    python -m AgentRuntime.benchmark_response_decoding --list-items 8 --repeats 2000
+"""
+import sys
+import os
+import json
+import time
+import argparse
+from typing import List, Literal, Union, get_args, get_origin
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pydantic import BaseModel, TypeAdapter
+from AgentRuntime.response_decoding import decode, decode_lenient, type_adapter
+from PydanticModels.model import (
+    AdherencePrediction, ComprehensiveHealthAnalysis, ImagingAnalysis, LabInterpretation, NoShowPrediction,
+    VitalsAnomalyDetection, AIPrediction, ReadmissionRisk, PrescriptionRecommendation, SummarizedNotes,
+    DiagnosisOutput, ICD10Suggestion, DrugInteraction, PossibleCauses,
+)
+
+
+OUTPUT_TYPES = [
+    AdherencePrediction, ComprehensiveHealthAnalysis, ImagingAnalysis, LabInterpretation, NoShowPrediction,
+    VitalsAnomalyDetection, AIPrediction, ReadmissionRisk, PrescriptionRecommendation, SummarizedNotes,
+    PossibleCauses, List[DiagnosisOutput], List[ICD10Suggestion], List[DrugInteraction],
+]
+
+SAMPLE_TEXT = "Clinically relevant finding that warrants follow-up with the care team"
+
+
+def sample_value(annotation, list_items: int):
+    """A plausible value of `annotation` (lists get `list_items` entries)."""
+    origin = get_origin(annotation)
+    if origin is Literal:
+        return get_args(annotation)[0]
+    if origin is Union:
+        return sample_value(next(arg for arg in get_args(annotation) if arg is not type(None)), list_items)
+    if origin in (list, List):
+        return [sample_value(get_args(annotation)[0], list_items) for _ in range(list_items)]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return {name: sample_value(field.annotation, list_items) for name, field in annotation.model_fields.items()}
+    return {str: SAMPLE_TEXT, int: 42, float: 0.73, bool: True}[annotation]
+
+
+def legacy_parse(content: str, output_type):
+    """The parse every agent used to carry (minus its error wrapping)."""
+    content = content.strip()
+    if content.startswith("```json"):
+        content = content[7:]
+    if content.startswith("```"):
+        content = content[3:]
+    if content.endswith("```"):
+        content = content[:-3]
+    content = content.strip()
+    data = json.loads(content)
+    if get_origin(output_type) in (list, List):
+        model = get_args(output_type)[0]
+        if isinstance(data, dict):
+            return [model(**data)]
+        return [model(**item) for item in data]
+    if isinstance(data, dict):
+        return output_type(**data)
+    raise ValueError(f"Expected JSON object, got {type(data)}")
+
+
+def _best_per_call(function, repeats: int, rounds: int = 5) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(repeats):
+            function()
+        best = min(best, (time.perf_counter() - started) / repeats)
+    return best
+
+
+def _name(output_type) -> str:
+    if get_origin(output_type) in (list, List):
+        return f"List[{get_args(output_type)[0].__name__}]"
+    return output_type.__name__
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time agent reply decoding: legacy parse vs validate_json.")
+    parser.add_argument("--list-items", type=int, default=4, help="Entries per list field in the sample replies")
+    parser.add_argument("--repeats", type=int, default=1000, help="Decodes per timing round")
+    args = parser.parse_args()
+
+    print(f"{'response type':<30} {'bytes':>6} {'legacy us':>10} {'decode us':>10} {'speedup':>8} "
+          f"{'fenced us':>10} {'truncated us':>13}")
+    totals = {"legacy": 0.0, "decode": 0.0}
+    for output_type in OUTPUT_TYPES:
+        text = json.dumps(sample_value(output_type, args.list_items), indent=2)
+        fenced = f"```json\n{text}\n```"
+        truncated = text[: int(len(text) * 0.8)]
+        assert legacy_parse(text, output_type) == decode(text, output_type)
+
+        legacy = _best_per_call(lambda: legacy_parse(text, output_type), args.repeats)
+        fast = _best_per_call(lambda: decode(text, output_type), args.repeats)
+        repaired_fenced = _best_per_call(lambda: decode_lenient(fenced, output_type), args.repeats // 10 or 1)
+        try:
+            decode_lenient(truncated, output_type)
+            repaired_truncated = f"{_best_per_call(lambda: decode_lenient(truncated, output_type), args.repeats // 10 or 1) * 1e6:>13.1f}"
+        except ValueError:
+            # Cut inside a required field: rejected rather than guessed
+            repaired_truncated = f"{'rejected':>13}"
+        totals["legacy"] += legacy
+        totals["decode"] += fast
+        print(f"{_name(output_type):<30} {len(text):>6} {legacy * 1e6:>10.1f} {fast * 1e6:>10.1f} "
+              f"{legacy / fast:>7.1f}x {repaired_fenced * 1e6:>10.1f} {repaired_truncated}")
+
+    print(f"{'all types':<30} {'':>6} {totals['legacy'] * 1e6:>10.1f} {totals['decode'] * 1e6:>10.1f} "
+          f"{totals['legacy'] / totals['decode']:>7.1f}x")
+    build = _best_per_call(lambda: TypeAdapter(List[DrugInteraction]), 20, rounds=3)
+    cached = _best_per_call(lambda: type_adapter(List[DrugInteraction]), args.repeats)
+    print(f"TypeAdapter(List[DrugInteraction]): built {build * 1e6:.0f} us, cached lookup {cached * 1e6:.2f} us")
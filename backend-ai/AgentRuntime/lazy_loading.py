@@ -0,0 +1,97 @@
+import sys
+import os
+import time
+import importlib
+import threading
+from contextlib import contextmanager
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+# Reference point for the startup report: the app imports this module first
+PROCESS_STARTED = time.perf_counter()
+
+_imports = {}     # module -> seconds spent importing it at startup
+_loads = {}       # artifact or lazily imported module -> load record
+_phases = {}      # startup phase -> seconds since PROCESS_STARTED
+_lazy_callables = []
+_lock = threading.Lock()
+
+
+def timed_import(module_name: str):
+    """Import a module and record how long it took (shared dependencies count toward the first importer)."""
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    _imports[module_name] = round(time.perf_counter() - started, 4)
+    return module
+
+
+@contextmanager
+def timed_load(name: str, trigger: str = "first use"):
+    """Record the time taken to load an artifact or module the first time it is needed."""
+    started = time.perf_counter()
+    yield
+    with _lock:
+        _loads[name] = {
+            "seconds": round(time.perf_counter() - started, 4),
+            "trigger": trigger,
+            "at_seconds_since_start": round(started - PROCESS_STARTED, 4),
+        }
+
+
+def mark_phase(name: str):
+    """Record when a startup phase (e.g. "ready") was reached."""
+    _phases[name] = round(time.perf_counter() - PROCESS_STARTED, 4)
+
+
+class LazyCallable:
+    """
+    Stand-in for a function in a module that is only imported on first call.
+
+    Endpoint modules bind agent functions through this, so importing the app
+    does not import every agent and its LangChain stack. `load()` imports the
+    module ahead of time (used by the startup warm-up).
+    """
+
+    def __init__(self, module_name: str, attribute: str):
+        self.module_name = module_name
+        self.attribute = attribute
+        self._target = None
+        self._lock = threading.Lock()
+        _lazy_callables.append(self)
+
+    def load(self, trigger: str = "first use"):
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    with timed_load(self.module_name, trigger):
+                        module = importlib.import_module(self.module_name)
+                    self._target = getattr(module, self.attribute)
+        return self._target
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+
+def lazy_callable(module_name: str, attribute: str) -> LazyCallable:
+    """Bind `module_name.attribute` without importing the module until it is called."""
+    return LazyCallable(module_name, attribute)
+
+
+def warm_up_lazy_callables():
+    """Import every lazily bound module now (startup warm-up)."""
+    for target in _lazy_callables:
+        target.load(trigger="warm-up")
+
+
+def startup_report() -> dict:
+    """Startup phases, per-module import times and lazy load times for this process."""
+    with _lock:
+        loads = dict(sorted(_loads.items(), key=lambda item: -item[1]["seconds"]))
+    return {
+        "phases_seconds_since_start": dict(_phases),
+        "imports_seconds": dict(sorted(_imports.items(), key=lambda item: -item[1])),
+        "loads": loads,
+        "lazy_modules_pending": sorted({
+            target.module_name for target in _lazy_callables if target._target is None
+        }),
+    }
@@ -0,0 +1,56 @@
+import sys
+import os
+import threading
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+# Providers only cache prompts whose shared prefix is at least this long (OpenAI: 1024 tokens)
+MIN_CACHEABLE_PREFIX_TOKENS = 1024
+
+# Token usage per agent since worker start
+_usage = {}
+_lock = threading.Lock()
+
+
+def _cached_tokens(input_details: dict) -> int:
+    # "cache_read", or "priority_cache_read" / "flex_cache_read" on the other service tiers
+    return sum(count or 0 for key, count in input_details.items() if key.endswith("cache_read"))
+
+
+def record_usage(name: str, response):
+    """
+    Add the token usage reported with a model reply to the totals for agent `name`.
+
+    Replies without usage metadata (e.g. from providers that do not report it)
+    are counted but contribute no tokens.
+    """
+    usage = getattr(response, "usage_metadata", None) or {}
+    input_tokens = usage.get("input_tokens", 0) or 0
+    cached_tokens = _cached_tokens(usage.get("input_token_details") or {})
+    with _lock:
+        totals = _usage.setdefault(name, {
+            "calls": 0, "calls_with_usage": 0, "calls_with_cache_hit": 0,
+            "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0,
+        })
+        totals["calls"] += 1
+        if usage:
+            totals["calls_with_usage"] += 1
+        if cached_tokens:
+            totals["calls_with_cache_hit"] += 1
+        totals["input_tokens"] += input_tokens
+        totals["cached_tokens"] += cached_tokens
+        totals["output_tokens"] += usage.get("output_tokens", 0) or 0
+
+
+def prompt_usage_stats() -> dict:
+    """Input, cached and output token totals and the cached-token ratio per agent since worker start."""
+    with _lock:
+        agents = {
+            name: dict(
+                totals,
+                cached_token_ratio=round(totals["cached_tokens"] / totals["input_tokens"], 4) if totals["input_tokens"] else 0.0,
+                avg_input_tokens=round(totals["input_tokens"] / totals["calls_with_usage"], 1) if totals["calls_with_usage"] else 0.0,
+            )
+            for name, totals in sorted(_usage.items())
+        }
+    return {"min_cacheable_prefix_tokens": MIN_CACHEABLE_PREFIX_TOKENS, "agents": agents}
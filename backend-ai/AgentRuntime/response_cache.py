@@ -0,0 +1,276 @@
+import sys
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, NamedTuple
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pydantic import BaseModel
+from Configurations.config import settings
+from AgentRuntime.response_decoding import type_adapter
+
+
+_MISSING = object()
+
+# Every cache created in this process, by namespace (for monitoring)
+_caches = {}
+
+
+class Uncached(NamedTuple):
+    """Returned by a `get_or_compute` callback for a value to hand back without caching it."""
+    value: Any
+
+
+def canonical_hash(user_input: BaseModel, *parts: str) -> str:
+    """
+    Stable SHA-256 of a validated Pydantic input plus any extra key parts
+    (prompt version, model name). Field order and whitespace in the original
+    request body do not affect the hash.
+    """
+    payload = json.dumps(
+        user_input.model_dump(mode="json"),
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    digest = hashlib.sha256()
+    for part in (*parts, payload):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def template_version(*texts: str) -> str:
+    """Short fingerprint of prompt template text; changes whenever the prompt does."""
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()[:12]
+
+
+class _SQLiteTier:
+    """On-disk cache tier shared by all namespaces of a process."""
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_path(cls, path: str):
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path)
+            return cls._instances[path]
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, expires_at REAL NOT NULL,"
+            " created_at REAL NOT NULL, value TEXT NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get(self, namespace: str, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at, value FROM response_cache WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+        if row is None:
+            return None
+        expires_at, value = row
+        if expires_at < time.time():
+            self.delete(namespace, key)
+            return None
+        return value
+
+    def set(self, namespace: str, key: str, value: str, ttl_seconds: float):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, now + ttl_seconds, now, value),
+            )
+            self._writes += 1
+            # Trim expired and oldest rows every so often to keep the file bounded
+            if self._writes % 500 == 0:
+                self._conn.execute("DELETE FROM response_cache WHERE expires_at < ?", (now,))
+                self._conn.execute(
+                    "DELETE FROM response_cache WHERE rowid IN ("
+                    " SELECT rowid FROM response_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (settings.RESPONSE_CACHE_DISK_MAX_ENTRIES,),
+                )
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM response_cache WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+
+    def clear(self, namespace: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache WHERE namespace = ?", (namespace,))
+
+
+class ResponseCache:
+    """
+    Two-tier cache for agent results keyed on a canonical hash of the request.
+
+    The in-process tier is a size-bounded LRU with a per-entry TTL and holds the
+    parsed result objects themselves, so a hit costs a dict lookup. The optional
+    SQLite tier (RESPONSE_CACHE_DISK_PATH) survives restarts and is shared by
+    workers; its values are stored as JSON and re-validated into `output_type`.
+
+    Cached objects are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, namespace: str, output_type, ttl_seconds: float,
+                 max_entries: int | None = None, disk_path: str | None = None):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries or settings.RESPONSE_CACHE_MAX_ENTRIES
+        self.enabled = settings.RESPONSE_CACHE_ENABLED
+        self._adapter = type_adapter(output_type)
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        disk_path = disk_path or settings.RESPONSE_CACHE_DISK_PATH
+        self._disk = _SQLiteTier.for_path(disk_path) if disk_path else None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.uncached = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+
+        _caches[namespace] = self
+
+    def make_key(self, user_input: BaseModel, prompt_version: str, model_name: str) -> str:
+        return canonical_hash(user_input, self.namespace, prompt_version, model_name)
+
+    def get(self, key: str, default=None):
+        if not self.enabled:
+            return default
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= time.monotonic():
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+
+        if self._disk is not None:
+            raw = self._disk.get(self.namespace, key)
+            if raw is not None:
+                value = self._adapter.validate_json(raw)
+                self._set_memory(key, value)
+                with self._lock:
+                    self.disk_hits += 1
+                return value
+        return default
+
+    def set(self, key: str, value):
+        if not self.enabled:
+            return
+        self._set_memory(key, value)
+        if self._disk is not None:
+            self._disk.set(self.namespace, key, self._adapter.dump_json(value).decode("utf-8"), self.ttl_seconds)
+
+    def _set_memory(self, key: str, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _store(self, key: str, value):
+        """Cache a computed value unless `compute` returned it as Uncached; returns the plain value."""
+        if isinstance(value, Uncached):
+            with self._lock:
+                self.uncached += 1
+            return value.value
+        self.set(key, value)
+        return value
+
+    def get_or_compute(self, key: str, compute):
+        """
+        Return the cached value for `key`, calling `compute()` and caching its result on a miss.
+
+        `compute` returns Uncached(value) for a result that must not be cached
+        (e.g. a model reply that was cut off); the value is still returned.
+        """
+        started = time.perf_counter()
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            self.record_lookup(hit=True, seconds=time.perf_counter() - started)
+            return value
+        value = self._store(key, compute())
+        self.record_lookup(hit=False, seconds=time.perf_counter() - started)
+        return value
+
+    async def aget_or_compute(self, key: str, compute):
+        """Async variant of `get_or_compute`; `compute` is a coroutine function."""
+        started = time.perf_counter()
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            self.record_lookup(hit=True, seconds=time.perf_counter() - started)
+            return value
+        value = self._store(key, await compute())
+        self.record_lookup(hit=False, seconds=time.perf_counter() - started)
+        return value
+
+    def record_lookup(self, hit: bool, seconds: float):
+        """Count a lookup made outside `get_or_compute` (e.g. batched partial lookups)."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.hit_seconds += seconds
+            else:
+                self.misses += 1
+                self.miss_seconds += seconds
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._disk is not None:
+            self._disk.clear(self.namespace)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_tier": self._disk is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "uncached": self.uncached,
+                "avg_hit_ms": round(self.hit_seconds / self.hits * 1000, 4) if self.hits else 0.0,
+                "avg_miss_ms": round(self.miss_seconds / self.misses * 1000, 2) if self.misses else 0.0,
+            }
+
+
+def cache_stats():
+    """Stats for every response cache in this process, keyed by namespace."""
+    return {namespace: cache.stats() for namespace, cache in _caches.items()}
@@ -0,0 +1,121 @@
+import sys
+import os
+import re
+import json
+from functools import lru_cache
+from typing import Any
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pydantic import TypeAdapter
+
+
+_FENCE = re.compile(r"```(?:json|JSON)?[ \t]*\n?")
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+# Strings (closing quote optional, so a cut-off string runs to the end) and structural characters
+_TOKENS = re.compile(r'"(?:[^"\\]|\\.)*"?|[{}\[\],]')
+_CLOSED_STRING = re.compile(r'(?<!\\)(?:\\\\)*"$')
+
+
+@lru_cache(maxsize=None)
+def type_adapter(output_type: Any) -> TypeAdapter:
+    """
+    Shared TypeAdapter for a response type (a Pydantic model class or e.g. List[ICD10Suggestion]).
+
+    Building an adapter compiles the type's validator, which costs far more
+    than validating one reply, so each type is compiled once per process.
+    """
+    return TypeAdapter(output_type)
+
+
+def decode(text: str, output_type: Any):
+    """
+    Validate raw JSON text straight into `output_type` in one pass (no json.loads, no Model(**data)).
+
+    Raises:
+        pydantic.ValidationError: If the text is not valid JSON or does not match the type
+    """
+    return type_adapter(output_type).validate_json(text)
+
+
+def _unwrap(text: str) -> str:
+    """Drop code fences and anything before the first JSON object or array."""
+    text = _FENCE.sub("", text)
+    starts = [index for index in (text.find("{"), text.find("[")) if index != -1]
+    return text[min(starts):] if starts else text.strip()
+
+
+def _cuttable(stack: list) -> bool:
+    """Whether truncating here leaves no list item half-written (no object open inside an array)."""
+    return "[" not in stack or "{" not in stack[stack.index("["):]
+
+
+def repair_json(text: str) -> str:
+    """
+    Best-effort well-formed JSON from a model reply that did not parse.
+
+    Handles the ways replies go wrong in practice: markdown code fences,
+    prose before or after the JSON value, and output cut off mid-value
+    (a token limit). A truncated reply is cut back to its last complete
+    element and the open arrays and objects are closed, so partial values
+    are dropped rather than guessed: a partial list item is dropped whole,
+    a partial top-level object keeps its complete fields. The caller's
+    validation then decides whether what remains is acceptable.
+
+    Returns:
+        JSON text (possibly still invalid, e.g. when nothing complete was received)
+    """
+    text = _unwrap(text)
+    stack = []
+    # Where the text may be cut, and the brackets still open at that point
+    cut, cut_stack = 0, []
+    for token in _TOKENS.finditer(text):
+        char = token.group()
+        if char[0] == '"':
+            if len(char) < 2 or not _CLOSED_STRING.search(char):
+                # Unterminated string: the reply ends inside it
+                break
+        elif char in _CLOSERS:
+            stack.append(char)
+        elif char == ",":
+            # Everything before a separator is complete
+            if _cuttable(stack):
+                cut, cut_stack = token.start(), list(stack)
+        elif not stack:
+            break
+        else:
+            stack.pop()
+            if _cuttable(stack):
+                cut, cut_stack = token.end(), list(stack)
+            if not stack:
+                # One complete top-level value; anything after it is prose
+                return text[:cut]
+    return text[:cut].rstrip().rstrip(",") + "".join(_CLOSERS[bracket] for bracket in reversed(cut_stack))
+
+
+def decode_lenient(text: str, output_type: Any, wrap_list_key: str | None = None):
+    """
+    `decode` with the repair path: fences and prose are stripped and truncated JSON is closed first.
+
+    Args:
+        text: Raw model reply
+        output_type: Type to validate into
+        wrap_list_key: For envelope types like {"items": [...]}: a bare array is wrapped as
+            {wrap_list_key: array} and a bare object as {wrap_list_key: [object]}
+
+    Raises:
+        ValueError: If the repaired text is still not JSON
+        pydantic.ValidationError: If it does not match the type
+    """
+    text = _unwrap(text)
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = json.loads(repair_json(text))
+    if wrap_list_key is not None:
+        if isinstance(data, list):
+            data = {wrap_list_key: data}
+        elif isinstance(data, dict) and wrap_list_key not in data:
+            data = {wrap_list_key: [data]}
+    return type_adapter(output_type).validate_python(data)
@@ -0,0 +1,97 @@
+import sys
+import os
+import asyncio
+import threading
+from functools import partial
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pydantic import BaseModel
+from Configurations.config import settings
+from AgentRuntime.response_cache import canonical_hash
+
+
+# Every coalescer created in this process, by agent name (for monitoring)
+_flights = {}
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical requests to one agent into a single model call.
+
+    The first request for a key starts the call as a task; requests for the
+    same key that arrive while it is in flight await that task instead of
+    starting their own, and all of them get its result (or its exception).
+    Nothing is kept once the call finishes: later requests start a new call
+    (agents with a response cache answer those from the cache).
+
+    Callers await the task through `asyncio.shield`, so a client that
+    disconnects does not cancel the call for the others sharing it. Results
+    are shared objects and must not be mutated.
+
+    In-flight calls are tracked per worker process and event loop; requests
+    landing on different workers are not coalesced.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight = {}  # key -> [task, callers]
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.largest_group = 0
+        _flights[name] = self
+
+    def make_key(self, user_input: BaseModel, *parts: str) -> str:
+        """Canonical hash of the validated input (field order and whitespace do not matter) plus any extra key parts."""
+        return canonical_hash(user_input, self.name, *parts)
+
+    async def do(self, key: str, compute):
+        """
+        Await the in-flight call for `key`, or start one with the coroutine function `compute`.
+
+        Returns:
+            The call's result, shared by every request coalesced into it
+        """
+        if not settings.LLM_COALESCE_REQUESTS:
+            return await compute()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None and flight[0].get_loop() is loop:
+                flight[1] += 1
+                self.coalesced += 1
+            else:
+                flight = [loop.create_task(compute()), 1]
+                self._inflight[key] = flight
+                self.calls += 1
+                flight[0].add_done_callback(partial(self._finished, key))
+        return await asyncio.shield(flight[0])
+
+    def _finished(self, key: str, task: asyncio.Task):
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None and flight[0] is task:
+                del self._inflight[key]
+                self.largest_group = max(self.largest_group, flight[1])
+            # Also marks the exception retrieved when every caller has gone away
+            if not task.cancelled() and task.exception() is not None:
+                self.failed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.calls + self.coalesced
+            return {
+                "enabled": settings.LLM_COALESCE_REQUESTS,
+                "in_flight": len(self._inflight),
+                "upstream_calls": self.calls,
+                "coalesced_requests": self.coalesced,
+                "coalesced_ratio": round(self.coalesced / requests, 4) if requests else 0.0,
+                "failed_calls": self.failed,
+                "largest_group": self.largest_group,
+            }
+
+
+def single_flight_stats() -> dict:
+    """Upstream calls, coalesced requests and largest group per agent since worker start."""
+    return {name: flight.stats() for name, flight in sorted(_flights.items())}
@@ -0,0 +1,216 @@
+import sys
+import os
+import json
+import threading
+from typing import Any, List, NamedTuple, get_origin, get_args
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pydantic import ValidationError, create_model
+from Configurations.config import settings
+from AgentRuntime.response_decoding import type_adapter, decode_lenient
+from AgentRuntime.prompt_usage import record_usage
+
+
+# Every structured output created in this process, by name (for monitoring)
+_outputs = {}
+
+
+class StructuredOutputError(ValueError):
+    """The model reply could not be turned into the expected response type."""
+
+
+class ParsedReply(NamedTuple):
+    """A validated reply, and whether it arrived whole (not cut off and not repaired)."""
+    value: Any
+    complete: bool
+
+
+def strict_json_schema(schema: dict) -> dict:
+    """
+    Rewrite a Pydantic JSON schema into the subset OpenAI's strict structured outputs accept.
+
+    Every object lists all of its properties as required and forbids extra
+    ones (optional fields stay nullable through their `anyOf` null branch),
+    and defaults and titles are dropped since the provider does not use them.
+    """
+    if isinstance(schema, list):
+        return [strict_json_schema(item) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    strict = {
+        key: strict_json_schema(value)
+        for key, value in schema.items()
+        if key not in ("default", "title")
+    }
+    if "properties" in schema:
+        # Property names are data, not schema keywords: keep them all, including "title"
+        strict["properties"] = {name: strict_json_schema(value) for name, value in schema["properties"].items()}
+        strict["required"] = list(schema["properties"])
+        strict["additionalProperties"] = False
+    return strict
+
+
+class StructuredOutput:
+    """
+    JSON-schema-constrained replies for one agent, validated into its Pydantic response type.
+
+    The schema is derived from the response class in PydanticModels.model.
+    In "json_schema" mode (settings.LLM_STRUCTURED_OUTPUT) it is sent as the
+    provider's `response_format`, so the reply is guaranteed to match it and
+    is validated with a single `validate_json` call; the prompt only carries
+    the rules a schema cannot express (value ranges, ordering). In "prompt"
+    mode, for providers without structured outputs, the schema goes into
+    the prompt instead.
+
+    Replies that fail the one-pass validation (fenced or wrapped in prose,
+    cut off by a token limit, a bare array for a list output) go through the
+    repair path in AgentRuntime/response_decoding.py before being rejected.
+    Repaired replies may be missing whatever the repair dropped, so
+    `parse_reply` reports them as incomplete and callers must not cache them.
+
+    The provider requires an object at the top level, so list outputs are
+    requested as {"items": [...]} and unwrapped after validation.
+    """
+
+    def __init__(self, name: str, output_type: Any, guidance: str = ""):
+        """
+        Args:
+            name: Schema name sent to the provider (letters, digits, _ and -)
+            output_type: Pydantic model class, or List[model class]
+            guidance: Rules for the reply that the schema cannot express, one per line
+        """
+        self.name = name
+        self.output_type = output_type
+        self.is_list = get_origin(output_type) in (list, List)
+        if self.is_list:
+            (item_type,) = get_args(output_type)
+            self._envelope = create_model(f"{item_type.__name__}List", items=(List[item_type], ...))
+        else:
+            self._envelope = output_type
+        self._adapter = type_adapter(self._envelope)
+        self.schema = strict_json_schema(self._envelope.model_json_schema())
+        self.guidance = guidance.strip()
+        self._bound = {}
+        self._lock = threading.Lock()
+        self._stats = {"validated": 0, "repaired": 0, "truncated": 0, "invalid": 0, "refusals": 0}
+        _outputs[name] = self
+
+    @property
+    def response_format(self) -> dict:
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": self.name, "schema": self.schema, "strict": True},
+        }
+
+    @property
+    def format_instructions(self) -> str:
+        """Text for the prompt's {format_instructions} slot."""
+        if settings.LLM_STRUCTURED_OUTPUT == "json_schema":
+            lead = "Reply with a JSON object matching the response schema."
+        else:
+            lead = ("Reply with only a JSON object, without markdown code fences, matching this JSON schema:\n"
+                    + json.dumps(self.schema, separators=(",", ":")))
+        return "\n".join(part for part in (lead, self.guidance) if part)
+
+    @property
+    def version_text(self) -> str:
+        """Everything that shapes the request besides the prompt template (for prompt versioning)."""
+        return f"{settings.LLM_STRUCTURED_OUTPUT}\n{self.format_instructions}\n{json.dumps(self.schema, sort_keys=True)}"
+
+    @property
+    def request_options(self) -> dict:
+        """Extra chat completion parameters sent with every request of this agent."""
+        options = {}
+        if settings.LLM_STRUCTURED_OUTPUT == "json_schema":
+            options["response_format"] = self.response_format
+        if settings.LLM_PROMPT_CACHE_KEY:
+            # Requests sharing a key are routed to the same cache, so the agent's static prefix stays warm
+            options["prompt_cache_key"] = self.name
+        return options
+
+    def bind(self, llm):
+        """`llm` with the response schema and prompt cache key attached (see `request_options`)."""
+        options = self.request_options
+        if not options:
+            return llm
+        # Clients are pooled for the life of the process, so bindings are built once per client
+        bound = self._bound.get(id(llm))
+        if bound is None or bound[0] is not llm:
+            bound = (llm, llm.bind(**options))
+            self._bound[id(llm)] = bound
+        return bound[1]
+
+    def parse(self, response):
+        """
+        Validate a model reply into the response type.
+
+        Args:
+            response: AIMessage returned by the bound model
+
+        Returns:
+            Instance of the response type (a list for list outputs)
+
+        Raises:
+            StructuredOutputError: If the model refused or the reply does not match the schema
+        """
+        return self.parse_reply(response).value
+
+    def parse_reply(self, response) -> ParsedReply:
+        """
+        `parse`, also reporting whether the reply is complete.
+
+        The reply's token usage (including provider-cached prompt tokens) is
+        recorded first, for /metrics/prompt-cache. A reply is incomplete when
+        the model stopped at its token limit (finish_reason "length") or when
+        it only validated after repair; its value may be missing items, so it
+        must not be cached.
+
+        Args:
+            response: AIMessage returned by the bound model
+
+        Returns:
+            ParsedReply(value, complete)
+
+        Raises:
+            StructuredOutputError: If the model refused or the reply does not match the schema
+        """
+        record_usage(self.name, response)
+        refusal = getattr(response, "additional_kwargs", {}).get("refusal")
+        if refusal:
+            self._count("refusals")
+            raise StructuredOutputError(f"Model refused to answer: {refusal}")
+        content = response.content if isinstance(response.content, str) else str(response.content)
+        truncated = (getattr(response, "response_metadata", None) or {}).get("finish_reason") == "length"
+        if truncated:
+            self._count("truncated")
+        try:
+            result = self._adapter.validate_json(content)
+            self._count("validated")
+            complete = not truncated
+        except ValidationError as e:
+            try:
+                result = decode_lenient(content, self._envelope, "items" if self.is_list else None)
+            except ValueError:
+                self._count("invalid")
+                raise StructuredOutputError(
+                    f"Reply does not match the {self.name} schema: {e}. Response content: {content[:200]}"
+                ) from e
+            self._count("repaired")
+            complete = False
+        return ParsedReply(result.items if self.is_list else result, complete)
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+def structured_output_stats() -> dict:
+    """Mode plus validated / repaired / truncated / invalid / refused reply counts per agent since worker start."""
+    return {
+        "mode": settings.LLM_STRUCTURED_OUTPUT,
+        "outputs": {name: output.stats() for name, output in sorted(_outputs.items())},
+    }
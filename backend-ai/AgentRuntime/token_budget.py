@@ -0,0 +1,221 @@
+import sys
+import os
+import json
+import threading
+from functools import lru_cache
+from typing import Callable, Dict
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Configurations.config import settings
+from AgentRuntime.lazy_loading import timed_load
+
+
+# Chat formatting adds a few tokens per message on top of its content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Every token budget created in this process, by agent name (for monitoring)
+_budgets = {}
+
+_tokenizer_lock = threading.Lock()
+_tokenizer = None
+
+
+class TokenBudgetError(ValueError):
+    """The prompt does not fit the agent's input token budget even after trimming."""
+
+
+def tokenizer(trigger: str = "first use"):
+    """
+    The model's tiktoken encoding, or None to estimate from length instead.
+
+    Loaded once per process. The encoding files come from the network on first
+    use (or TIKTOKEN_CACHE_DIR), so offline workers and settings.LLM_TOKENIZER
+    = "estimate" fall back to about 4 characters per token.
+    """
+    global _tokenizer
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                _tokenizer = _load_tokenizer(trigger)
+    return _tokenizer or None
+
+
+def _load_tokenizer(trigger: str):
+    if settings.LLM_TOKENIZER != "tiktoken":
+        return False
+    with timed_load("tokenizer", trigger=trigger):
+        try:
+            import tiktoken
+            try:
+                return tiktoken.encoding_for_model(settings.OPENAI_MODEL)
+            except KeyError:
+                # Model name unknown to this tiktoken release: current OpenAI models use o200k_base
+                return tiktoken.get_encoding("o200k_base")
+        except Exception:
+            # Not installed, or the encoding could not be downloaded
+            return False
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens `text` encodes to (an estimate when no tokenizer is available)."""
+    encoding = tokenizer()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+@lru_cache(maxsize=256)
+def count_static_tokens(text: str) -> int:
+    """`count_tokens` for text that repeats across requests (system messages, schemas)."""
+    return count_tokens(text)
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """
+    Shorten free text to about `max_tokens`, keeping its beginning and end.
+
+    The middle is replaced with a marker saying how much was left out, so the
+    model knows the text is incomplete. Clinical notes usually open with the
+    complaint and close with the assessment and plan, which both survive.
+    """
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    chars_per_token = len(text) / max(tokens, 1)
+    keep = int(max_tokens * chars_per_token) - 80
+    while True:
+        if keep <= 0:
+            return f"[... {len(text)} characters omitted to fit the token budget ...]"
+        head, tail = text[: keep * 2 // 3], text[len(text) - keep // 3:]
+        marker = f"\n[... {len(text) - len(head) - len(tail)} characters omitted to fit the token budget ...]\n"
+        shortened = head + marker + tail
+        if count_tokens(shortened) <= max_tokens:
+            return shortened
+        keep = int(keep * 0.9)
+
+
+def compact_lines(text: str, max_tokens: int, keep: Callable[[str], bool] = lambda line: False) -> str:
+    """
+    Shorten a one-entry-per-line section (e.g. lab results) to about `max_tokens`.
+
+    Repeated lines are dropped first. If that is not enough, lines for which
+    `keep` is false are dropped from the end, then the kept lines, and a
+    marker line records how many entries were left out.
+    """
+    lines = list(dict.fromkeys(line for line in text.split("\n") if line.strip()))
+    compacted = "\n".join(lines)
+    if count_tokens(compacted) <= max_tokens:
+        return compacted
+
+    indent = lines[0][: len(lines[0]) - len(lines[0].lstrip())]
+    marker = f"{indent}- ... {{}} more entries omitted to fit the token budget"
+    # Each line is counted once; the joined text encodes to about the sum of its lines
+    line_tokens = [count_tokens(line) + 1 for line in lines]
+    total = sum(line_tokens) + count_tokens(marker.format(len(lines)))
+    drop_order = ([index for index in reversed(range(len(lines))) if not keep(lines[index])]
+                  + [index for index in reversed(range(len(lines))) if keep(lines[index])])
+    dropped = set()
+    for index in drop_order:
+        if total <= max_tokens:
+            break
+        dropped.add(index)
+        total -= line_tokens[index]
+    remaining = [line for index, line in enumerate(lines) if index not in dropped]
+    return "\n".join(remaining + [marker.format(len(dropped))])
+
+
+class TokenBudget:
+    """
+    Input token budget for one agent's prompts.
+
+    `fit` renders the agent's prompt, counts its tokens (system message and, in
+    json_schema mode, the response schema are counted once per process since
+    they never change), and when the total exceeds the budget shortens the
+    variable sections the agent marked as compactable, largest section
+    first. Prompts that still do not fit are rejected before reaching the
+    model, so no request costs more than its agent's budget in input tokens.
+    """
+
+    def __init__(self, structured_output, max_input_tokens: int | None = None):
+        """
+        Args:
+            structured_output: The agent's StructuredOutput (names the budget; its schema counts toward input)
+            max_input_tokens: Budget for one call; settings.LLM_INPUT_TOKEN_BUDGET when None
+        """
+        self.name = structured_output.name
+        self.structured_output = structured_output
+        self.max_input_tokens = max_input_tokens or settings.LLM_INPUT_TOKEN_BUDGET
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "input_tokens": 0, "max_tokens_seen": 0, "trimmed": 0, "tokens_trimmed": 0, "rejected": 0}
+        _budgets[self.name] = self
+
+    def count(self, messages: list) -> int:
+        """Tokens the rendered messages (plus the response schema, if sent) take up."""
+        tokens = 0
+        for position, message in enumerate(messages):
+            # The leading system message is the static prompt prefix
+            counter = count_static_tokens if position == 0 and message.type == "system" else count_tokens
+            tokens += counter(message.content) + MESSAGE_OVERHEAD_TOKENS
+        if settings.LLM_STRUCTURED_OUTPUT == "json_schema":
+            tokens += count_static_tokens(json.dumps(self.structured_output.schema))
+        return tokens
+
+    def fit(self, prompt, variables: dict, compactors: Dict[str, Callable[[str, int], str]] | None = None) -> list:
+        """
+        Render `prompt` with `variables`, trimming compactable sections to fit the budget.
+
+        Args:
+            prompt: The agent's ChatPromptTemplate
+            variables: Values for every template variable
+            compactors: Variable name -> function(value, max_tokens) returning a shorter value
+
+        Returns:
+            Messages to send to the model
+
+        Raises:
+            TokenBudgetError: If the prompt is over budget after every compactor ran
+        """
+        messages = prompt.format_messages(**variables)
+        tokens = original_tokens = self.count(messages)
+        if tokens > self.max_input_tokens and compactors:
+            variables = dict(variables)
+            sizes = {name: count_tokens(str(variables[name])) for name in compactors}
+            for name in sorted(compactors, key=sizes.get, reverse=True):
+                allowance = max(sizes[name] - (tokens - self.max_input_tokens), 0)
+                variables[name] = compactors[name](str(variables[name]), allowance)
+                messages = prompt.format_messages(**variables)
+                tokens = self.count(messages)
+                if tokens <= self.max_input_tokens:
+                    break
+
+        with self._lock:
+            if tokens > self.max_input_tokens:
+                self._stats["rejected"] += 1
+            else:
+                self._stats["calls"] += 1
+                self._stats["input_tokens"] += tokens
+                self._stats["max_tokens_seen"] = max(self._stats["max_tokens_seen"], tokens)
+                if tokens < original_tokens:
+                    self._stats["trimmed"] += 1
+                    self._stats["tokens_trimmed"] += original_tokens - tokens
+        if tokens > self.max_input_tokens:
+            raise TokenBudgetError(
+                f"{self.name} prompt needs {tokens} input tokens, over its budget of {self.max_input_tokens}"
+            )
+        return messages
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["budget"] = self.max_input_tokens
+        stats["avg_input_tokens"] = round(stats["input_tokens"] / stats["calls"], 1) if stats["calls"] else 0.0
+        return stats
+
+
+def token_budget_stats() -> dict:
+    """Tokenizer in use plus per-agent budget, counted input tokens, trims and rejections since worker start."""
+    encoding = tokenizer()
+    return {
+        "tokenizer": encoding.name if encoding is not None else "estimate (4 characters per token)",
+        "agents": {name: budget.stats() for name, budget in sorted(_budgets.items())},
+    }
@@ -2,27 +2,44 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from langchain_core.output_parsers import PydanticOutputParser
 from Prompts.prompt import appointment_prompt
 from Configurations.config import llm_model
+from AgentRuntime.structured_output import StructuredOutput
+from AgentRuntime.single_flight import SingleFlight
+from AgentRuntime.token_budget import TokenBudget, truncate_text
 from PydanticModels.model import UserSymptoms, PossibleCauses
 
 
 
-parser = PydanticOutputParser(pydantic_object=PossibleCauses)
+# Reply schema derived from PossibleCauses; the provider enforces it
+STRUCTURED_OUTPUT = StructuredOutput("possible_causes", PossibleCauses)
 
+# The free-text description is shortened when a prompt runs over budget
+TOKEN_BUDGET = TokenBudget(STRUCTURED_OUTPUT)
+_single_flight = SingleFlight(STRUCTURED_OUTPUT.name)
 
 
-# Chain it all together
-def get_possible_causes(user_input: UserSymptoms):
-    formatted_prompt = appointment_prompt.format(
+
+def _format_prompt(user_input: UserSymptoms) -> list:
+    return TOKEN_BUDGET.fit(appointment_prompt, dict(
         symptoms=user_input.symptoms,
         description=user_input.user_description,
-        format_instructions=parser.get_format_instructions()
-    )
+        format_instructions=STRUCTURED_OUTPUT.format_instructions
+    ), compactors={"description": truncate_text})
+
+
+# Chain it all together
+def get_possible_causes(user_input: UserSymptoms):
+    response = STRUCTURED_OUTPUT.bind(llm_model.LLM()).invoke(_format_prompt(user_input))
+    return STRUCTURED_OUTPUT.parse(response)
+
+
+async def get_possible_causes_async(user_input: UserSymptoms):
+    async def compute():
+        response = await STRUCTURED_OUTPUT.bind(llm_model.LLM()).ainvoke(_format_prompt(user_input))
+        return STRUCTURED_OUTPUT.parse(response)
 
-    response = llm_model.LLM().invoke(formatted_prompt)
-    return parser.parse(response.content)
+    return await _single_flight.do(_single_flight.make_key(user_input), compute)
 
 
 # # Example usage
@@ -1,5 +1,6 @@
+import threading
+import httpx
 from pydantic_settings import BaseSettings
-from langchain_openai import ChatOpenAI
 
 
 class Settings(BaseSettings):
@@ -12,6 +13,64 @@ class Settings(BaseSettings):
     MAIL_PORT: int | None = 465
     MAIL_SERVER: str | None = None
 
+    # Shared LLM HTTP connection pool
+    LLM_POOL_MAX_CONNECTIONS: int = 100        # Total open connections to the LLM provider
+    LLM_POOL_MAX_KEEPALIVE: int = 20           # Idle keep-alive connections kept warm
+    LLM_POOL_KEEPALIVE_EXPIRY: float = 30.0    # Seconds an idle connection is kept
+    LLM_CONNECT_TIMEOUT: float = 5.0           # Seconds to establish a connection
+    LLM_READ_TIMEOUT: float = 60.0             # Seconds to wait for a model response
+    LLM_POOL_TIMEOUT: float = 10.0             # Seconds to wait for a free pooled connection
+    LLM_MAX_RETRIES: int = 2
+    LLM_PROMPT_CACHE_KEY: bool = True          # Send each agent's name as prompt_cache_key, keeping its static prompt prefix cached
+    LLM_COALESCE_REQUESTS: bool = True         # Identical concurrent requests to an agent share one model call
+    LLM_STRUCTURED_OUTPUT: str = "json_schema" # "json_schema" (provider enforces the response schema) or "prompt" (schema in the prompt, for providers without structured outputs)
+
+    # Input token budgets: every prompt is counted before the call, oversized sections are trimmed
+    LLM_TOKENIZER: str = "tiktoken"             # "tiktoken" (the model's encoding; estimates if it cannot be loaded) or "estimate" (4 characters per token)
+    LLM_INPUT_TOKEN_BUDGET: int = 4000          # Input tokens per call for agents without their own budget
+    TOKEN_BUDGET_SUMMARIZATION: int = 8000
+    TOKEN_BUDGET_LAB_INTERPRETATION: int = 6000
+
+    # Response cache for deterministic agents
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2048      # In-process LRU entries per agent
+    RESPONSE_CACHE_DISK_PATH: str | None = None # SQLite file for the optional on-disk tier
+    RESPONSE_CACHE_DISK_MAX_ENTRIES: int = 100000
+    CACHE_TTL_ICD10_SECONDS: int = 7 * 24 * 3600
+    CACHE_TTL_DRUG_INTERACTION_SECONDS: int = 24 * 3600
+    CACHE_TTL_DIAGNOSIS_SECONDS: int = 3600
+
+    # Local ICD-10 code index
+    ICD10_LOCAL_LOOKUP: bool = True             # Answer unambiguous lookups without the LLM
+    ICD10_TABLE_PATH: str = "Datasets/icd10cm_codes.csv.gz"
+    ICD10_LOCAL_CANDIDATES: int = 20            # Top BM25 hits checked for an unambiguous match
+    ICD10_FUZZY_MIN_SIMILARITY: float = 0.5     # Trigram similarity needed to correct a misspelt word
+
+    # Vitals ML predictions
+    VITALS_MODEL_FORMAT: str = "flat"           # "flat" (memory-mapped arrays) or "pickle" (sklearn estimators)
+    VITALS_FLAT_MAX_ROWS: int = 640             # Larger batches are scored by the sklearn model, loaded on first use (faster per row from ~600 rows); 0: always flat
+    VITALS_REGISTRY_DIR: str = "Models/registry"  # Versioned model bundles plus manifest.json (active version)
+    VITALS_REGISTRY_POLL_SECONDS: float = 2.0   # How often each worker checks the manifest for a new active version
+    VITALS_BATCH_MAX_READINGS: int = 50000      # Largest batch accepted by /predict/vitals/batch
+    VITALS_WS_QUEUE_SIZE: int = 32              # Frames buffered per /ws/predict socket before reads pause
+    VITALS_WS_DROP_OLDEST: bool = False         # Drop the oldest buffered frame instead of pausing reads
+    VITALS_WS_MAX_READINGS_PER_FRAME: int = 1000
+    VITALS_MICRO_BATCHING: bool = True          # Score readings from all sockets together
+    VITALS_BATCH_WINDOW_MS: float = 10.0        # How long the first reading waits for others to join its batch
+    VITALS_BATCH_MAX_ROWS: int = 512            # Dispatch early once this many readings are waiting
+    VITALS_INFERENCE_EXECUTOR: str = "thread"   # "thread" or "process"; inference never runs on the event loop
+    VITALS_INFERENCE_WORKERS: int = 2
+    VITALS_INFERENCE_MAX_PENDING: int = 8       # Inference jobs queued or running before callers wait
+    VITALS_RULES_MODE: str = "off"              # "off", "shadow" (model serves, rules compared), "hybrid" (rules, model for ambiguous readings) or "rules"
+    VITALS_RULES_PATH: str = "Vitals/vitals_rules.json"  # Threshold ruleset for the rules modes
+    VITALS_RULES_AUDIT_RATE: float = 0.0        # Share of rule-decided readings also scored by the model, for agreement metrics
+
+    # Admin
+    ADMIN_TOKEN: str | None = None              # Required in X-Admin-Token for /admin/*; admin routes are disabled when unset
+
+    # Startup
+    STARTUP_WARMUP: bool = False                # Load models, indexes and agent modules before serving
+
 
     class Config:
         env_file = ".env"
@@ -23,17 +82,131 @@ settings = Settings()
 # print(settings.OPENAI_MODEL )  # Test to ensure settings are loaded correctly
 
 class LLMSetup:
-    
+    """
+    Process-wide registry of chat model clients.
+
+    Every agent calls `llm_model.LLM()`; the first call for a model name builds a
+    ChatOpenAI bound to a shared keep-alive connection pool, later calls reuse it so
+    requests skip the TLS handshake and connection setup. The pool only talks to the
+    LLM provider, so its limits are effectively per-host limits.
+    """
+
     def __init__(self):
         self.api_key = settings.OPENAI_API_KEY
         self.model_name = settings.OPENAI_MODEL
-    
-    def LLM(self):
-        llm = ChatOpenAI(model=self.model_name,openai_api_key=self.api_key)
-        return llm
+        self._clients = {}
+        self._http_client = None
+        self._http_async_client = None
+        self._lock = threading.Lock()
+        # LLM() calls answered by an existing client / that had to build one
+        self.client_registry_hits = 0
+        self.client_registry_misses = 0
+
+    def _pool_limits(self):
+        return httpx.Limits(
+            max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.LLM_POOL_KEEPALIVE_EXPIRY,
+        )
+
+    def _timeout(self):
+        return httpx.Timeout(
+            settings.LLM_READ_TIMEOUT,
+            connect=settings.LLM_CONNECT_TIMEOUT,
+            pool=settings.LLM_POOL_TIMEOUT,
+        )
+
+    def _shared_http_clients(self):
+        # Called with self._lock held
+        if self._http_client is None:
+            self._http_client = httpx.Client(limits=self._pool_limits(), timeout=self._timeout())
+        if self._http_async_client is None:
+            self._http_async_client = httpx.AsyncClient(limits=self._pool_limits(), timeout=self._timeout())
+        return self._http_client, self._http_async_client
+
+    def LLM(self, model_name: str | None = None):
+        name = model_name or self.model_name
+        llm = self._clients.get(name)
+        if llm is not None:
+            with self._lock:
+                self.client_registry_hits += 1
+            return llm
+
+        with self._lock:
+            llm = self._clients.get(name)
+            if llm is not None:
+                self.client_registry_hits += 1
+                return llm
+
+            # Imported here: langchain_openai is the slowest import in the app and only LLM routes need it
+            from langchain_openai import ChatOpenAI
+
+            http_client, http_async_client = self._shared_http_clients()
+            llm = ChatOpenAI(
+                model=name,
+                openai_api_key=self.api_key,
+                http_client=http_client,
+                http_async_client=http_async_client,
+                timeout=self._timeout(),
+                max_retries=settings.LLM_MAX_RETRIES,
+            )
+            self._clients[name] = llm
+            self.client_registry_misses += 1
+            return llm
+
+    @staticmethod
+    def _connection_stats(client) -> dict | None:
+        """
+        Best-effort open, idle and in-use connections of an httpx client's pool.
+
+        httpx has no public API for pool state, so this reads the private
+        httpcore pool on the client's transport. It returns None before the
+        client exists, and also when an httpx/httpcore upgrade changes those
+        internals, so monitoring degrades instead of failing.
+        """
+        if client is None:
+            return None
+        try:
+            connections = list(client._transport._pool.connections)
+            idle = sum(bool(connection.is_idle()) for connection in connections)
+        except Exception:
+            return None
+        return {"open": len(connections), "idle": idle, "in_use": len(connections) - idle}
+
+    def stats(self):
+        """Client registry counters, HTTP connection pool state and configuration, for monitoring."""
+        with self._lock:
+            return {
+                "clients": sorted(self._clients.keys()),
+                "client_registry_hits": self.client_registry_hits,
+                "client_registry_misses": self.client_registry_misses,
+                "sync_connections": self._connection_stats(self._http_client),
+                "async_connections": self._connection_stats(self._http_async_client),
+                "max_connections": settings.LLM_POOL_MAX_CONNECTIONS,
+                "max_keepalive_connections": settings.LLM_POOL_MAX_KEEPALIVE,
+                "keepalive_expiry": settings.LLM_POOL_KEEPALIVE_EXPIRY,
+                "connect_timeout": settings.LLM_CONNECT_TIMEOUT,
+                "read_timeout": settings.LLM_READ_TIMEOUT,
+                "pool_timeout": settings.LLM_POOL_TIMEOUT,
+            }
+
+    def close(self):
+        """Close the shared connection pools (sync part; async pool is closed by aclose)."""
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+            self._clients.clear()
+
+    async def aclose(self):
+        client = self._http_async_client
+        self._http_async_client = None
+        self.close()
+        if client is not None:
+            await client.aclose()
 
 llm_model = LLMSetup()
 
 # test = llm_model.LLM().invoke("Hello, world!")  # Test invocation to ensure setup is correct
 # print(test.content)  # Print the response content to verify functionality
-    
\ No newline at end of file
+
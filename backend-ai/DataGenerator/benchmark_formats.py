@@ -0,0 +1,80 @@
+"""
+Compare CSV, Parquet and Feather for the vitals training set.
+
+Generates one dataset in memory, writes it in every format, and reports the
+file size, the write time, the time to load every column and the time to
+load only the columns training uses. The untyped `pd.read_csv` the training
+notebook used to do is included as the baseline. Needs pyarrow.
+
+Usage:
+    python -m DataGenerator.benchmark_formats                 # 2M rows
+    python -m DataGenerator.benchmark_formats --rows 10000000 --dir /tmp/vitals-formats
+"""
+import sys
+import os
+import time
+import argparse
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+from DataGenerator.dataGenerator import iter_patient_chunks
+from DataGenerator.dataset_io import write_dataset, read_dataset
+from Vitals.inference import FEATURE_NAMES
+
+
+TRAINING_COLUMNS = FEATURE_NAMES + ["label_status", "probable_condition"]
+
+# (name, file extension, compression)
+VARIANTS = [
+    ("csv", ".csv", None),
+    ("parquet snappy", ".parquet", "snappy"),
+    ("parquet zstd", ".parquet", "zstd"),
+    ("feather", ".feather", "none"),
+    ("feather lz4", ".feather", "lz4"),
+    ("feather zstd", ".feather", "zstd"),
+]
+
+
+def _best_of(function, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="File size and load time of the vitals dataset per format.")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=500_000)
+    parser.add_argument("--repeats", type=int, default=3, help="Loads timed per variant (best is kept)")
+    parser.add_argument("--dir", default=None, help="Where to write the files (default: a temporary directory)")
+    args = parser.parse_args()
+
+    chunks = list(iter_patient_chunks(args.rows, args.chunk_rows, seed=42))
+    directory = args.dir or tempfile.mkdtemp(prefix="vitals-formats-")
+    os.makedirs(directory, exist_ok=True)
+    print(f"{args.rows} rows in {directory}")
+    print(f"{'format':<16} {'size MB':>8} {'write s':>8} {'load all s':>11} {'load training s':>16}")
+
+    baseline_path = None
+    for name, extension, compression in VARIANTS:
+        path = os.path.join(directory, f"vitals_{name.replace(' ', '_')}{extension}")
+        started = time.perf_counter()
+        write_dataset(chunks, path, compression)
+        write_seconds = time.perf_counter() - started
+        load_all = _best_of(lambda: read_dataset(path), args.repeats)
+        load_training = _best_of(lambda: read_dataset(path, TRAINING_COLUMNS), args.repeats)
+        print(f"{name:<16} {os.path.getsize(path) / 2**20:>8.1f} {write_seconds:>8.2f} {load_all:>11.2f} {load_training:>16.2f}")
+        if extension == ".csv":
+            baseline_path = path
+
+    untyped = _best_of(lambda: pd.read_csv(baseline_path), args.repeats)
+    print(f"{'csv, untyped':<16} {'':>8} {'':>8} {untyped:>11.2f} {'':>16}  (pd.read_csv with inferred dtypes)")
+    memory = {
+        "typed": read_dataset(baseline_path).memory_usage(deep=True).sum(),
+        "untyped": pd.read_csv(baseline_path).memory_usage(deep=True).sum(),
+    }
+    print(f"In memory: {memory['typed'] / 2**20:.1f} MB typed vs {memory['untyped'] / 2**20:.1f} MB untyped")
@@ -1,95 +1,246 @@
-import random
+"""
+Synthetic vitals dataset generator.
+
+Rows are generated a chunk at a time with NumPy (seeded Generator, no Python
+per-row loop) and appended to the output file (CSV, Parquet or Feather,
+see DataGenerator/dataset_io.py), so datasets of tens of millions of rows
+are produced in constant memory.
+
+With balancing, half of the rows are Healthy and half Not Healthy. Both
+halves are drawn directly from their own distributions instead of by
+rejecting draws from the full ranges: Healthy rows come from the normal
+range of every labelled vital; Not Healthy rows pick the first abnormal
+vital (with the probability it would be the first abnormal one under
+uniform draws), take its value from outside its normal range, earlier
+vitals from inside theirs and later vitals from their full range. This is
+exactly the distribution the rejection loop produced, without the loop.
+
+Usage:
+    python -m DataGenerator.dataGenerator                           # 500 rows -> Datasets/vitals.csv
+    python -m DataGenerator.dataGenerator --rows 10000000 --output Datasets/vitals_10m.csv
+    python -m DataGenerator.dataGenerator --rows 1000000 --no-balance --seed 7
+    python -m DataGenerator.dataGenerator --rows 10000000 --output Datasets/vitals_10m.parquet --compression zstd
+"""
+import sys
+import os
+import time
+import argparse
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
 import pandas as pd
+from DataGenerator.dataset_io import AGE_GROUPS, LABEL_STATUSES, CONDITIONS, write_dataset
 
 # Define age groups
-age_groups = ["Infant", "Child", "Adolescent", "Adult", "Elderly"]
+age_groups = AGE_GROUPS
 
-# Function to randomly pick values within ranges
-def random_vital(low, high):
-    return random.randint(low, high)
+# Sampling range and normal range of each vital: (low, high, normal_low, normal_high).
+# Integer vitals are drawn uniformly from [low, high]; temperature is drawn
+# uniformly from [35.0, 39.0) and rounded to 0.1, so its normal range is the
+# interval that rounds into 36.1 - 37.2.
+VITAL_RANGES = {
+    "heart_rate": (50, 160, 60, 120),
+    "resp_rate": (10, 30, 12, 24),
+    "blood_pressure_systolic": (90, 140, 90, 140),
+    "blood_pressure_diastolic": (60, 90, 60, 90),
+    "spo2": (85, 100, 95, 100),
+    "temperature_c": (35.0, 39.0, 36.05, 37.25),
+    "glucose_mgdl": (60, 180, 70, 125),
+}
 
-# Function to assign label and probable_condition
-def assign_labels_and_condition(heart_rate, resp_rate, spo2, temp, glucose):
-    label_status = "Normal"
+# Vitals that decide label_status, in the order used to pick the first abnormal one
+LABELLED_VITALS = ["heart_rate", "resp_rate", "spo2", "temperature_c", "glucose_mgdl"]
 
-    # Check vitals for abnormal values
-    if (
-        heart_rate < 60 or heart_rate > 120 or
-        resp_rate < 12 or resp_rate > 24 or
-        spo2 < 95 or
-        temp < 36.1 or temp > 37.2 or
-        glucose < 70 or glucose > 125
-    ):
-        label_status = "Warning"
-
-    if (
-        heart_rate < 50 or heart_rate > 140 or
-        resp_rate < 10 or resp_rate > 40 or
-        spo2 < 90 or
-        temp < 35.0 or temp > 38.0 or
-        glucose < 60 or glucose > 180
-    ):
-        label_status = "Critical"
+COLUMNS = ["patient_id", "age_group", *VITAL_RANGES, "label_status", "probable_condition"]
 
-    # Simplified probable_condition
-    probable_condition = "Healthy" if label_status == "Normal" else "Not Healthy"
 
-    return label_status, probable_condition
+def _is_continuous(name: str) -> bool:
+    return isinstance(VITAL_RANGES[name][0], float)
 
-# Generate synthetic dataset
-def generate_patient_data(n_samples=100, balance=True):
-    data = []
-    healthy, not_healthy = 0, 0
-    target_each = n_samples // 2 if balance else None
-
-    i = 1
-    while len(data) < n_samples:
-        age_group = random.choice(age_groups)
-        heart_rate = random_vital(50, 160)
-        resp_rate = random_vital(10, 30)
-        bp_sys = random_vital(90, 140)
-        bp_dia = random_vital(60, 90)
-        spo2 = random_vital(85, 100)
-        temp = round(random.uniform(35.0, 39.0), 1)
-        glucose = random_vital(60, 180)
-
-        label_status, probable_condition = assign_labels_and_condition(
-            heart_rate, resp_rate, spo2, temp, glucose
-        )
 
-        # If balancing, enforce equal class counts
-        if balance:
-            if probable_condition == "Healthy" and healthy >= target_each:
-                continue
-            if probable_condition == "Not Healthy" and not_healthy >= target_each:
-                continue
-
-        data.append({
-            "patient_id": i,
-            "age_group": age_group,
-            "heart_rate": heart_rate,
-            "resp_rate": resp_rate,
-            "blood_pressure_systolic": bp_sys,
-            "blood_pressure_diastolic": bp_dia,
-            "spo2": spo2,
-            "temperature_c": temp,
-            "glucose_mgdl": glucose,
-            "label_status": label_status,
-            "probable_condition": probable_condition
-        })
-
-        if probable_condition == "Healthy":
-            healthy += 1
+def _normal_probability(name: str) -> float:
+    """Chance that a draw from the full range of `name` lands in its normal range."""
+    low, high, normal_low, normal_high = VITAL_RANGES[name]
+    if _is_continuous(name):
+        return (normal_high - normal_low) / (high - low)
+    return (normal_high - normal_low + 1) / (high - low + 1)
+
+
+# Function to randomly pick values within ranges
+def random_vital(rng: np.random.Generator, name: str, size: int, part: str = "full") -> np.ndarray:
+    """
+    Draw `size` values of one vital.
+
+    Args:
+        rng: NumPy random Generator
+        name: Key of VITAL_RANGES
+        size: Number of values
+        part: "full" (whole range), "normal" (normal range) or "abnormal" (outside it)
+
+    Returns:
+        Array of `size` values
+    """
+    low, high, normal_low, normal_high = VITAL_RANGES[name]
+    if _is_continuous(name):
+        if part == "full":
+            values = rng.uniform(low, high, size)
+        elif part == "normal":
+            values = rng.uniform(normal_low, normal_high, size)
         else:
-            not_healthy += 1
-        i += 1
+            below = normal_low - low
+            offset = rng.uniform(0.0, below + (high - normal_high), size)
+            values = np.where(offset < below, low + offset, normal_high + (offset - below))
+        return np.round(values, 1)
+
+    if part == "full":
+        return rng.integers(low, high + 1, size, dtype=np.int16)
+    if part == "normal":
+        return rng.integers(normal_low, normal_high + 1, size, dtype=np.int16)
+    below = normal_low - low
+    offset = rng.integers(0, below + (high - normal_high), size, dtype=np.int16)
+    return np.where(offset < below, low + offset, normal_high + 1 + (offset - below))
+
+
+def _status_codes(heart_rate, resp_rate, spo2, temp, glucose) -> np.ndarray:
+    """Index into LABEL_STATUSES for each reading (0 Normal, 1 Warning, 2 Critical)."""
+    # Check vitals for abnormal values
+    warning = (
+        (heart_rate < 60) | (heart_rate > 120) |
+        (resp_rate < 12) | (resp_rate > 24) |
+        (spo2 < 95) |
+        (temp < 36.1) | (temp > 37.2) |
+        (glucose < 70) | (glucose > 125)
+    )
+    critical = (
+        (heart_rate < 50) | (heart_rate > 140) |
+        (resp_rate < 10) | (resp_rate > 40) |
+        (spo2 < 90) |
+        (temp < 35.0) | (temp > 38.0) |
+        (glucose < 60) | (glucose > 180)
+    )
+    return np.where(critical, 2, warning.astype(np.int8)).astype(np.int8)
+
+
+# Function to assign label and probable_condition
+def assign_labels_and_condition(heart_rate, resp_rate, spo2, temp, glucose):
+    """
+    Label readings by the warning and critical thresholds (vectorized).
 
-    return pd.DataFrame(data)
+    Args:
+        heart_rate, resp_rate, spo2, temp, glucose: Scalars or equal-length arrays
 
-# Example usage
-df = generate_patient_data(500, balance=True)
-print(df["probable_condition"].value_counts())
-print(df.head())
+    Returns:
+        (label_status, probable_condition) arrays of strings
+    """
+    status_code = _status_codes(*(np.asarray(values) for values in (heart_rate, resp_rate, spo2, temp, glucose)))
 
-# Save to CSV
-df.to_csv("Datasets/vitals.csv", index=False)
+    # Simplified probable_condition
+    return np.array(LABEL_STATUSES)[status_code], np.array(CONDITIONS)[(status_code > 0).astype(np.intp)]
+
+
+def _sample_vitals(rng: np.random.Generator, size: int, condition: str | None) -> dict:
+    """Vitals for `size` rows: from the full ranges (None), or conditioned on "Healthy" / "Not Healthy"."""
+    if condition is None:
+        return {name: random_vital(rng, name, size) for name in VITAL_RANGES}
+    if condition == "Healthy":
+        return {
+            name: random_vital(rng, name, size, "normal" if name in LABELLED_VITALS else "full")
+            for name in VITAL_RANGES
+        }
+
+    # P(vital k is the first abnormal one) = P(all before k normal) * P(k abnormal)
+    normal = np.array([_normal_probability(name) for name in LABELLED_VITALS])
+    first_abnormal = np.cumprod(np.concatenate(([1.0], normal[:-1]))) * (1 - normal)
+    first = rng.choice(len(LABELLED_VITALS), size=size, p=first_abnormal / first_abnormal.sum())
+
+    vitals = {}
+    for name in VITAL_RANGES:
+        if name not in LABELLED_VITALS:
+            vitals[name] = random_vital(rng, name, size)
+            continue
+        k = LABELLED_VITALS.index(name)
+        vitals[name] = np.select(
+            [first > k, first == k],
+            [random_vital(rng, name, size, "normal"), random_vital(rng, name, size, "abnormal")],
+            random_vital(rng, name, size),
+        )
+    return vitals
+
+
+# Generate synthetic dataset
+def generate_patient_data(n_samples=100, balance=True, seed=None, start_id=1, rng=None):
+    """
+    Generate a synthetic vitals dataset.
+
+    Args:
+        n_samples: Number of rows
+        balance: Half Healthy, half Not Healthy (the extra row of an odd count is Not Healthy);
+            otherwise every vital is drawn from its full range
+        seed: Seed for a new Generator (ignored when `rng` is given)
+        start_id: patient_id of the first row
+        rng: Generator to draw from, so successive chunks continue one random stream
+
+    Returns:
+        DataFrame with the COLUMNS of Datasets/vitals.csv
+    """
+    rng = rng or np.random.default_rng(seed)
+    if balance:
+        healthy = _sample_vitals(rng, n_samples // 2, "Healthy")
+        not_healthy = _sample_vitals(rng, n_samples - n_samples // 2, "Not Healthy")
+        # Interleave the two classes
+        order = rng.permutation(n_samples)
+        vitals = {name: np.concatenate((healthy[name], not_healthy[name]))[order] for name in VITAL_RANGES}
+    else:
+        vitals = _sample_vitals(rng, n_samples, None)
+
+    status_code = _status_codes(
+        vitals["heart_rate"], vitals["resp_rate"], vitals["spo2"], vitals["temperature_c"], vitals["glucose_mgdl"]
+    )
+    # Label columns are categoricals built from codes: no per-row string objects
+    return pd.DataFrame({
+        "patient_id": np.arange(start_id, start_id + n_samples),
+        "age_group": pd.Categorical.from_codes(rng.integers(0, len(age_groups), n_samples), age_groups),
+        **vitals,
+        "label_status": pd.Categorical.from_codes(status_code, LABEL_STATUSES),
+        "probable_condition": pd.Categorical.from_codes((status_code > 0).astype(np.int8), CONDITIONS),
+    })
+
+
+def iter_patient_chunks(n_samples, chunk_rows=1_000_000, balance=True, seed=None):
+    """Yield the dataset as DataFrames of at most `chunk_rows` rows (balanced within each chunk)."""
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_samples, chunk_rows):
+        yield generate_patient_data(min(chunk_rows, n_samples - start), balance, rng=rng, start_id=start + 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic vitals dataset.")
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--output", default="Datasets/vitals.csv",
+                        help="Output file: .csv, .parquet or .feather (Parquet and Feather need pyarrow)")
+    parser.add_argument("--compression", default=None, help="Parquet/Feather codec, e.g. zstd, lz4, snappy or none")
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000, help="Rows generated and written per chunk")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--no-balance", dest="balance", action="store_false",
+                        help="Draw every vital from its full range instead of balancing Healthy / Not Healthy")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    generate_seconds = 0.0
+
+    def timed_chunks():
+        global generate_seconds
+        chunks = iter_patient_chunks(args.rows, args.chunk_rows, args.balance, args.seed)
+        while True:
+            chunk_started = time.perf_counter()
+            chunk = next(chunks, None)
+            generate_seconds += time.perf_counter() - chunk_started
+            if chunk is None:
+                return
+            yield chunk
+
+    rows = write_dataset(timed_chunks(), args.output, args.compression)
+    total_seconds = time.perf_counter() - started
+    print(f"Wrote {rows} rows to {args.output} ({os.path.getsize(args.output) / 2**20:.1f} MB) in {total_seconds:.2f} s: "
+          f"generation {rows / max(generate_seconds, 1e-9) / 1e6:.2f}M rows/s, "
+          f"end to end {rows / total_seconds / 1e6:.2f}M rows/s")
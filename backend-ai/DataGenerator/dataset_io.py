@@ -0,0 +1,175 @@
+"""
+Typed reading and writing of vitals datasets as CSV, Parquet or Feather.
+
+All three formats share one schema: int16 vitals, float32 temperature,
+int32 patient ids and categoricals (with fixed categories) for age_group,
+label_status and probable_condition. The format follows the file
+extension (.csv, .parquet, .feather / .arrow).
+
+Writes are streamed a chunk at a time (one Parquet row group or Arrow
+record batch per chunk) and `iter_dataset` reads back in batches, so
+neither side has to hold the whole dataset. Parquet and Feather need the
+optional pyarrow package (`pip install pyarrow`); CSV works without it.
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+
+
+AGE_GROUPS = ["Infant", "Child", "Adolescent", "Adult", "Elderly"]
+LABEL_STATUSES = ["Normal", "Warning", "Critical"]
+CONDITIONS = ["Healthy", "Not Healthy"]
+
+# Column -> dtype of the typed schema, in file column order
+DATASET_DTYPES = {
+    "patient_id": np.dtype(np.int32),
+    "age_group": pd.CategoricalDtype(AGE_GROUPS),
+    "heart_rate": np.dtype(np.int16),
+    "resp_rate": np.dtype(np.int16),
+    "blood_pressure_systolic": np.dtype(np.int16),
+    "blood_pressure_diastolic": np.dtype(np.int16),
+    "spo2": np.dtype(np.int16),
+    "temperature_c": np.dtype(np.float32),
+    "glucose_mgdl": np.dtype(np.int16),
+    "label_status": pd.CategoricalDtype(LABEL_STATUSES),
+    "probable_condition": pd.CategoricalDtype(CONDITIONS),
+}
+
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".feather": "feather", ".arrow": "feather"}
+
+
+def dataset_format(path: str) -> str:
+    """"csv", "parquet" or "feather", from the file extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported dataset extension {extension!r}; use one of {', '.join(FORMATS)}")
+    return FORMATS[extension]
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.ipc
+    except ImportError as e:
+        raise ImportError("Parquet and Feather datasets need pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def to_typed(frame: pd.DataFrame) -> pd.DataFrame:
+    """Cast a vitals DataFrame to the typed schema (columns not in it are kept as they are)."""
+    return frame.astype({name: dtype for name, dtype in DATASET_DTYPES.items() if name in frame.columns})
+
+
+def _arrow_schema():
+    pa = _pyarrow()
+    return pa.Schema.from_pandas(to_typed(pd.DataFrame({
+        name: pd.Series([], dtype=dtype) for name, dtype in DATASET_DTYPES.items()
+    })), preserve_index=False)
+
+
+def write_csv(chunks, path: str) -> int:
+    """Append each chunk to a CSV file (header once); returns the number of rows written."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    rows, first = 0, True
+    with open(path, "w", encoding="utf-8", newline="") as handle:
+        for chunk in chunks:
+            chunk.to_csv(handle, header=first, index=False, lineterminator="\n")
+            rows += len(chunk)
+            first = False
+    return rows
+
+
+def write_dataset(chunks, path: str, compression: str | None = None) -> int:
+    """
+    Stream DataFrame chunks into one dataset file.
+
+    Args:
+        chunks: Iterable of DataFrames with the DATASET_DTYPES columns
+        path: Output file; the extension picks the format
+        compression: Parquet/Feather codec ("zstd", "lz4", "snappy" for Parquet, or "none");
+            defaults to snappy for Parquet and uncompressed for Feather. Ignored for CSV
+
+    Returns:
+        Number of rows written
+    """
+    file_format = dataset_format(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    typed = (to_typed(chunk) for chunk in chunks)
+    if file_format == "csv":
+        return write_csv(typed, path)
+
+    pa = _pyarrow()
+    schema = _arrow_schema()
+    rows = 0
+    if file_format == "parquet":
+        writer = pa.parquet.ParquetWriter(path, schema, compression=compression or "snappy")
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=None if compression in (None, "none") else compression)
+        writer = pa.ipc.new_file(path, schema, options=options)
+    with writer:
+        for chunk in typed:
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            if file_format == "parquet":
+                # One row group per chunk
+                writer.write_table(table)
+            else:
+                for batch in table.to_batches():
+                    writer.write_batch(batch)
+            rows += len(chunk)
+    return rows
+
+
+def iter_dataset(path: str, batch_rows: int = 1_000_000, columns: list | None = None):
+    """
+    Read a dataset file back in typed DataFrames of about `batch_rows` rows.
+
+    Args:
+        path: Dataset file; the extension picks the format
+        batch_rows: Rows per CSV chunk or Parquet batch (Feather yields its stored record batches)
+        columns: Subset of columns to read (Parquet and Feather skip the others entirely)
+    """
+    file_format = dataset_format(path)
+    if file_format == "csv":
+        dtypes = {name: dtype for name, dtype in DATASET_DTYPES.items() if columns is None or name in columns}
+        yield from pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=batch_rows)
+        return
+
+    pa = _pyarrow()
+    if file_format == "parquet":
+        batches = pa.parquet.ParquetFile(path).iter_batches(batch_size=batch_rows, columns=columns)
+        for batch in batches:
+            yield batch.to_pandas()
+        return
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        for index in range(reader.num_record_batches):
+            batch = reader.get_batch(index)
+            yield (batch.select(columns) if columns else batch).to_pandas()
+
+
+def read_dataset(path: str, columns: list | None = None) -> pd.DataFrame:
+    """
+    Load a whole dataset file as one typed DataFrame.
+
+    Args:
+        path: Dataset file (.csv, .parquet, .feather / .arrow)
+        columns: Subset of columns to read
+    """
+    file_format = dataset_format(path)
+    if file_format == "csv":
+        dtypes = {name: dtype for name, dtype in DATASET_DTYPES.items() if columns is None or name in columns}
+        return pd.read_csv(path, usecols=columns, dtype=dtypes)
+
+    pa = _pyarrow()
+    if file_format == "parquet":
+        table = pa.parquet.read_table(path, columns=columns)
+    else:
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+        if columns:
+            table = table.select(columns)
+    return table.to_pandas()
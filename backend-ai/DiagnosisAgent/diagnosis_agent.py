@@ -1,14 +1,56 @@
 import sys
 import os
-import json
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from Prompts.prompt import diagnosis_prompt
-from Configurations.config import llm_model
+from Configurations.config import llm_model, settings
+from AgentRuntime.structured_output import StructuredOutput
+from AgentRuntime.single_flight import SingleFlight
+from AgentRuntime.token_budget import TokenBudget
+from AgentRuntime.response_cache import ResponseCache, Uncached, template_version
 from PydanticModels.model import DiagnosisInput, DiagnosisOutput
 from typing import List
 
 
+# Reply schema derived from List[DiagnosisOutput]; the provider enforces it, the prompt only adds these rules
+STRUCTURED_OUTPUT = StructuredOutput("diagnoses", List[DiagnosisOutput], guidance="""
+- items holds the diagnoses, most likely first
+- confidence is an integer 0-100
+""")
+
+# Bumps automatically whenever the prompt template or response schema change
+PROMPT_VERSION = template_version(diagnosis_prompt.pretty_repr(), STRUCTURED_OUTPUT.version_text)
+
+_cache = ResponseCache("diagnosis", List[DiagnosisOutput], ttl_seconds=settings.CACHE_TTL_DIAGNOSIS_SECONDS)
+
+
+TOKEN_BUDGET = TokenBudget(STRUCTURED_OUTPUT)
+_single_flight = SingleFlight(STRUCTURED_OUTPUT.name)
+
+
+def _format_prompt(user_input: DiagnosisInput) -> list:
+    """Build the system and patient messages sent to the model for `get_diagnosis`."""
+    formatted_prompt = TOKEN_BUDGET.fit(diagnosis_prompt, dict(
+        symptoms=user_input.symptoms,
+        format_instructions=STRUCTURED_OUTPUT.format_instructions
+    ))
+
+    return formatted_prompt
+
+
+def _parse_response(response):
+    """
+    Parse the model reply for `get_diagnosis` into List[DiagnosisOutput];
+    a cut-off or repaired reply is returned as Uncached.
+    """
+    reply = STRUCTURED_OUTPUT.parse_reply(response)
+    return reply.value if reply.complete else Uncached(reply.value)
+
+
+def _cache_key(user_input: DiagnosisInput) -> str:
+    return _cache.make_key(user_input, PROMPT_VERSION, llm_model.model_name)
+
+
 def get_diagnosis(user_input: DiagnosisInput) -> List[DiagnosisOutput]:
     """
     Analyze patient symptoms and return possible diagnoses with ICD-10 codes.
@@ -18,59 +60,26 @@ def get_diagnosis(user_input: DiagnosisInput) -> List[DiagnosisOutput]:
         
     Returns:
         List of DiagnosisOutput objects with diagnosis, ICD-10 code, and confidence
+        
+    Diagnoses are cached per canonical input, prompt version and model name,
+    so repeat requests do not reach the model.
     """
-    # Create format instructions for a list of DiagnosisOutput
-    format_instructions = """
-    You must return a JSON array of diagnosis objects. Each object should have:
-    - diagnosis: string (the diagnosis name)
-    - icd10: string (the ICD-10 code)
-    - confidence: integer (0-100, percentage confidence)
-    
-    Example format:
-    [
-        {
-            "diagnosis": "Influenza",
-            "icd10": "J11.1",
-            "confidence": 87
-        },
-        {
-            "diagnosis": "Common Cold",
-            "icd10": "J00",
-            "confidence": 72
-        }
-    ]
-    """
-    
-    formatted_prompt = diagnosis_prompt.format(
-        symptoms=user_input.symptoms,
-        format_instructions=format_instructions
-    )
+    def compute():
+        response = STRUCTURED_OUTPUT.bind(llm_model.LLM()).invoke(_format_prompt(user_input))
+        return _parse_response(response)
 
-    response = llm_model.LLM().invoke(formatted_prompt)
-    
-    # Parse the JSON response
-    try:
-        content = response.content.strip()
-        # Remove markdown code blocks if present
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-        
-        data = json.loads(content)
-        
-        # Handle both single dict and list of dicts
-        if isinstance(data, dict):
-            return [DiagnosisOutput(**data)]
-        elif isinstance(data, list):
-            return [DiagnosisOutput(**item) for item in data]
-        else:
-            raise ValueError(f"Unexpected response format: {type(data)}")
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to parse JSON response: {str(e)}. Response content: {content[:200]}")
-    except Exception as e:
-        raise ValueError(f"Failed to process diagnosis response: {str(e)}")
+    return _cache.get_or_compute(_cache_key(user_input), compute)
+
+
+async def get_diagnosis_async(user_input: DiagnosisInput) -> List[DiagnosisOutput]:
+    """
+    Async variant of `get_diagnosis` that awaits the model's native async API,
+    so the calling event loop is free while the request is in flight. Identical
+    requests arriving while it is in flight share its model call.
+    """
+    async def compute():
+        response = await STRUCTURED_OUTPUT.bind(llm_model.LLM()).ainvoke(_format_prompt(user_input))
+        return _parse_response(response)
 
+    key = _cache_key(user_input)
+    return await _cache.aget_or_compute(key, lambda: _single_flight.do(key, compute))
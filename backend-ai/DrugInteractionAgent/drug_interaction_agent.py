@@ -1,12 +1,165 @@
 import sys
 import os
+import re
 import json
+import time
+from itertools import combinations
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from Prompts.prompt import drug_interaction_prompt
-from Configurations.config import llm_model
+from Configurations.config import llm_model, settings
+from AgentRuntime.structured_output import StructuredOutput, ParsedReply
+from AgentRuntime.single_flight import SingleFlight
+from AgentRuntime.token_budget import TokenBudget
+from AgentRuntime.response_cache import ResponseCache, template_version
 from PydanticModels.model import DrugInteractionInput, DrugInteraction
-from typing import List
+from typing import Dict, List, Tuple
+
+
+# Reply schema derived from List[DrugInteraction]; the provider enforces it, the prompt only adds these rules
+STRUCTURED_OUTPUT = StructuredOutput("drug_interactions", List[DrugInteraction], guidance="""
+- items holds the interactions; it is empty if no interactions are found
+- recommendation is null when there is no specific clinical recommendation
+""")
+
+# Bumps automatically whenever the prompt template or response schema change
+PROMPT_VERSION = template_version(drug_interaction_prompt.pretty_repr(), STRUCTURED_OUTPUT.version_text)
+
+# Results are cached per normalized drug pair, so N-drug requests reuse earlier pairs
+_cache = ResponseCache("drug_interaction", List[DrugInteraction], ttl_seconds=settings.CACHE_TTL_DRUG_INTERACTION_SECONDS)
+
+# Salt, ester and hydrate suffixes that do not change the interacting active ingredient
+SALT_SUFFIXES = {
+    "hydrochloride", "hcl", "hydrobromide", "sodium", "potassium", "calcium", "magnesium",
+    "sulfate", "sulphate", "bisulfate", "maleate", "mesylate", "besylate", "tartrate",
+    "bitartrate", "succinate", "citrate", "phosphate", "acetate", "fumarate", "hyclate",
+    "monohydrate", "dihydrate", "trihydrate", "anhydrous", "dipropionate", "propionate",
+    "valerate", "gluconate", "lactate", "malate", "oxalate", "pamoate", "tosylate",
+}
+
+SEVERITY_RANK = {"severe": 0, "high": 1, "moderate": 2, "low": 3}
+
+DrugPair = Tuple[str, str]
+
+
+TOKEN_BUDGET = TokenBudget(STRUCTURED_OUTPUT)
+_single_flight = SingleFlight(STRUCTURED_OUTPUT.name)
+
+
+def _format_prompt(user_input: DrugInteractionInput) -> list:
+    """Build the system and patient messages sent to the model for `check_drug_interactions`."""
+    formatted_prompt = TOKEN_BUDGET.fit(drug_interaction_prompt, dict(
+        drugs=user_input.drugs,
+        format_instructions=STRUCTURED_OUTPUT.format_instructions
+    ))
+
+    return formatted_prompt
+
+
+def _parse_response(response) -> ParsedReply:
+    """Parse the model reply for `check_drug_interactions` into List[DrugInteraction], and whether it is complete."""
+    return STRUCTURED_OUTPUT.parse_reply(response)
+
+
+def normalize_drug_name(name: str) -> str:
+    """
+    Canonical form of a medication name: case-folded, whitespace collapsed and
+    trailing salt/hydrate suffixes removed ("Warfarin Sodium " -> "warfarin").
+
+    Suffixes are only removed after a base name. When the words before them are
+    salt words too, the salt is the drug ("magnesium sulfate", "potassium
+    citrate", "calcium") and the name is kept whole.
+    """
+    words = re.sub(r"[\s,;]+", " ", name.casefold()).strip().split(" ")
+    base = len(words)
+    while base > 1 and words[base - 1] in SALT_SUFFIXES:
+        base -= 1
+    if words[base - 1] not in SALT_SUFFIXES:
+        words = words[:base]
+    return " ".join(words)
+
+
+def normalize_drug_list(drugs: List[str]) -> List[str]:
+    """Sorted, de-duplicated canonical drug names; order and casing of the request do not matter."""
+    return sorted({normalized for normalized in map(normalize_drug_name, drugs) if normalized})
+
+
+def _pair_key(pair: DrugPair) -> str:
+    return _cache.make_key(DrugInteractionInput(drugs=list(pair)), PROMPT_VERSION, llm_model.model_name)
+
+
+def _match_drug(name: str, drugs: List[str]):
+    """
+    Map a drug name returned by the model back to one of the normalized request drugs.
+
+    Names must match exactly after normalization; a substring match would tie
+    "potassium" to "potassium chloride" or "aspirin" to "aspirin dipyridamole".
+    """
+    normalized = normalize_drug_name(name)
+    return normalized if normalized in drugs else None
+
+
+def _lookup_pairs(drugs: List[str]):
+    """Split the drug pairs of a request into cached results and pairs the model has not seen."""
+    known: Dict[DrugPair, List[DrugInteraction]] = {}
+    unseen: List[DrugPair] = []
+    for pair in combinations(drugs, 2):
+        started = time.perf_counter()
+        cached = _cache.get(_pair_key(pair))
+        _cache.record_lookup(hit=cached is not None, seconds=time.perf_counter() - started)
+        if cached is None:
+            unseen.append(pair)
+        else:
+            known[pair] = cached
+    return known, unseen
+
+
+def _query_drugs(unseen: List[DrugPair]) -> DrugInteractionInput:
+    """Only the drugs taking part in unseen pairs are sent to the model."""
+    return DrugInteractionInput(drugs=sorted({drug for pair in unseen for drug in pair}))
+
+
+def _store_pairs(query: DrugInteractionInput, unseen: List[DrugPair], reply: ParsedReply):
+    """
+    Attribute each returned interaction to every unseen drug pair it involves and
+    cache those pairs (pairs without an interaction cache an empty list). Pairs
+    that were already cached keep their earlier result. Interactions whose drugs
+    cannot be matched are returned as `unattributed`.
+
+    Nothing is cached from a cut-off or repaired reply: the interactions it lost
+    would otherwise be cached as "no interaction" for their pairs.
+    """
+    fresh: Dict[DrugPair, List[DrugInteraction]] = {pair: [] for pair in unseen}
+    unattributed: List[DrugInteraction] = []
+    for interaction in reply.value:
+        matched = sorted({drug for drug in (_match_drug(name, query.drugs) for name in interaction.drugs) if drug})
+        if len(matched) < 2:
+            unattributed.append(interaction)
+            continue
+        for pair in combinations(matched, 2):
+            if pair in fresh:
+                fresh[pair].append(interaction)
+    if reply.complete:
+        for pair, pair_interactions in fresh.items():
+            _cache.set(_pair_key(pair), pair_interactions)
+    return fresh, unattributed
+
+
+def _assemble(drugs: List[str], results: Dict[DrugPair, List[DrugInteraction]],
+              unattributed: List[DrugInteraction]) -> List[DrugInteraction]:
+    """Merge per-pair results for the requested drugs, most severe first."""
+    merged, seen = [], set()
+    for interaction in [item for pair_items in results.values() for item in pair_items] + unattributed:
+        signature = (interaction.severity, interaction.msg, tuple(interaction.drugs))
+        if signature in seen:
+            continue
+        # Multi-drug interactions cached under a pair only apply if every drug was requested
+        if interaction not in unattributed and not all(_match_drug(name, drugs) for name in interaction.drugs):
+            continue
+        seen.add(signature)
+        merged.append(interaction)
+    merged.sort(key=lambda interaction: SEVERITY_RANK[interaction.severity])
+    return merged
 
 
 def check_drug_interactions(user_input: DrugInteractionInput) -> List[DrugInteraction]:
@@ -18,61 +171,48 @@ def check_drug_interactions(user_input: DrugInteractionInput) -> List[DrugIntera
         
     Returns:
         List of DrugInteraction objects with severity, message, drugs, and recommendation
+        
+    Drug names are normalized first (case, whitespace, salt suffixes, order,
+    duplicates). The request is then decomposed into drug pairs; pairs already
+    checked are served from the cache and only drugs in unseen pairs are sent
+    to the model.
     """
-    # Create format instructions for a list of DrugInteraction
-    format_instructions = """
-    You must return a JSON array of drug interaction objects. Each object should have:
-    - severity: string (one of 'low', 'moderate', 'high', 'severe')
-    - msg: string (interaction description)
-    - drugs: array of strings (affected drug names)
-    - recommendation: string (optional, clinical recommendation)
-    
-    Example format:
-    [
-        {
-            "severity": "high",
-            "msg": "Aspirin + Warfarin: Increased bleeding risk",
-            "drugs": ["Aspirin", "Warfarin"],
-            "recommendation": "Monitor INR closely. Consider alternative antiplatelet agent."
-        }
-    ]
-    
-    If no interactions are found, return an empty array [].
+    drugs = normalize_drug_list(user_input.drugs)
+    if len(drugs) < 2:
+        return []
+
+    known, unseen = _lookup_pairs(drugs)
+    unattributed = []
+    if unseen:
+        query = _query_drugs(unseen)
+        response = STRUCTURED_OUTPUT.bind(llm_model.LLM()).invoke(_format_prompt(query))
+        fresh, unattributed = _store_pairs(query, unseen, _parse_response(response))
+        known.update(fresh)
+    return _assemble(drugs, known, unattributed)
+
+
+async def check_drug_interactions_async(user_input: DrugInteractionInput) -> List[DrugInteraction]:
     """
-    
-    formatted_prompt = drug_interaction_prompt.format(
-        drugs=user_input.drugs,
-        format_instructions=format_instructions
-    )
+    Async variant of `check_drug_interactions` that awaits the model's native async API,
+    so the calling event loop is free while the request is in flight. Identical
+    requests arriving while it is in flight share its model call.
+    """
+    drugs = normalize_drug_list(user_input.drugs)
+    if len(drugs) < 2:
+        return []
 
-    response = llm_model.LLM().invoke(formatted_prompt)
-    
-    # Parse the JSON response
-    try:
-        content = response.content.strip()
-        # Remove markdown code blocks if present
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-        
-        data = json.loads(content)
-        
-        # Handle both single dict and list of dicts
-        if isinstance(data, dict):
-            return [DrugInteraction(**data)]
-        elif isinstance(data, list):
-            # Handle empty list
-            if len(data) == 0:
-                return []
-            return [DrugInteraction(**item) for item in data]
-        else:
-            raise ValueError(f"Unexpected response format: {type(data)}")
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to parse JSON response: {str(e)}. Response content: {content[:200]}")
-    except Exception as e:
-        raise ValueError(f"Failed to process drug interaction response: {str(e)}")
+    known, unseen = _lookup_pairs(drugs)
+    unattributed = []
+    if unseen:
+        query = _query_drugs(unseen)
+
+        async def compute():
+            response = await STRUCTURED_OUTPUT.bind(llm_model.LLM()).ainvoke(_format_prompt(query))
+            return _store_pairs(query, unseen, _parse_response(response))
 
+        # Keyed on the pairs still to look up: requests for the same drugs can differ in which
+        # pairs are cached, and a flight only returns results for the pairs it was started for
+        key = _single_flight.make_key(query, json.dumps(unseen))
+        fresh, unattributed = await _single_flight.do(key, compute)
+        known.update(fresh)
+    return _assemble(drugs, known, unattributed)
@@ -0,0 +1,78 @@
+import sys
+import os
+import secrets
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Vitals.body_vitals import registry, activate_version, model_versions_stats
+from Vitals.model_registry import UnknownModelVersion, ModelBundleError
+from PydanticModels.model import ModelActivationInput
+from Configurations.config import settings
+from fastapi import APIRouter, Depends, Header, HTTPException
+from starlette.concurrency import run_in_threadpool
+
+
+def require_admin_token(x_admin_token: str | None = Header(default=None)):
+    """Reject the request unless X-Admin-Token matches settings.ADMIN_TOKEN (admin routes are off when it is unset)."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin_token)])
+
+
+@router.get("/admin/models", tags=["Admin"])
+def list_model_versions():
+    """
+    Endpoint to list the registered vitals model versions.
+
+    Input:
+    - X-Admin-Token header
+
+    Output:
+    - active_version: Version named in the registry manifest
+    - versions: Manifest entry per version (created_at, sklearn_version, features, metrics, files)
+    - worker: Version served by the worker that answered, with the load time and
+      memory delta of each version it has loaded
+    """
+    try:
+        manifest = registry.manifest()
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=500, detail=f"Error reading the model manifest: {str(e)}")
+    return {
+        "active_version": manifest["active"],
+        "versions": manifest["versions"],
+        "worker": model_versions_stats(),
+    }
+
+
+@router.post("/admin/models/activate", tags=["Admin"])
+async def activate_model_version(input: ModelActivationInput):
+    """
+    Endpoint to make a registered vitals model version the active one.
+
+    Input:
+    - X-Admin-Token header
+    - version: Registered version to serve (string)
+
+    Output:
+    - active_version: The newly active version
+    - worker: This worker's model stats after loading it
+
+    The bundle's checksums are verified and this worker loads the version
+    before the manifest is replaced (atomically); if either fails the active
+    version does not change. Other workers swap it in within
+    VITALS_REGISTRY_POLL_SECONDS. Open /ws/predict sockets stay connected and
+    move to the new version with their next batch.
+    """
+    try:
+        # Checksums and model loading are blocking file and CPU work
+        worker = await run_in_threadpool(activate_version, input.version)
+    except UnknownModelVersion:
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {input.version}")
+    except (FileNotFoundError, ModelBundleError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Version {input.version} failed to load and was not activated: {e}")
+    return {"active_version": input.version, "worker": worker}
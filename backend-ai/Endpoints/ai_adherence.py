@@ -2,16 +2,20 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from AdherenceAgent.adherence_agent import predict_medication_adherence
+from AgentRuntime.lazy_loading import lazy_callable
+from AgentRuntime.token_budget import TokenBudgetError
 from PydanticModels.model import MedicationAdherenceInput
 from fastapi import APIRouter, HTTPException
 
 
 router = APIRouter()
 
+# Agent module (and its LangChain stack) is imported on first request
+predict_medication_adherence_async = lazy_callable("AdherenceAgent.adherence_agent", "predict_medication_adherence_async")
+
 
 @router.post("/ai-medication-adherence", tags=["AI Medication Adherence"])
-def medication_adherence_endpoint(user_input: MedicationAdherenceInput):
+async def medication_adherence_endpoint(user_input: MedicationAdherenceInput):
     """
     Endpoint to predict patient medication adherence risk based on demographics, 
     prescription complexity, and history.
@@ -45,8 +49,10 @@ def medication_adherence_endpoint(user_input: MedicationAdherenceInput):
                      priority ("low" | "medium" | "high")
     """
     try:
-        prediction = predict_medication_adherence(user_input)
+        prediction = await predict_medication_adherence_async(user_input)
         return prediction
+    except TokenBudgetError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing medication adherence prediction: {str(e)}")
 
@@ -2,21 +2,24 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from BookingAgent.book_agent import get_possible_causes
+from AgentRuntime.lazy_loading import lazy_callable
 from PydanticModels.model import UserSymptoms
 from fastapi import APIRouter
 
 
 router = APIRouter()
 
+# Agent module (and its LangChain stack) is imported on first request
+get_possible_causes_async = lazy_callable("BookingAgent.book_agent", "get_possible_causes_async")
+
 # Endpoint for possible causes based on user symptoms
 @router.post("/ai-appointment",tags=["Appointment Booking Agent"])
-def possible_causes_endpoint(user_input: UserSymptoms):
+async def possible_causes_endpoint(user_input: UserSymptoms):
     """
     Endpoint to get possible causes based on user symptoms.
     """
     
-    possible_causes = get_possible_causes(user_input)
+    possible_causes = await get_possible_causes_async(user_input)
     return possible_causes
 
 
@@ -2,16 +2,20 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from DiagnosisAgent.diagnosis_agent import get_diagnosis
+from AgentRuntime.lazy_loading import lazy_callable
+from AgentRuntime.token_budget import TokenBudgetError
 from PydanticModels.model import DiagnosisInput
 from fastapi import APIRouter, HTTPException
 
 
 router = APIRouter()
 
+# Agent module (and its LangChain stack) is imported on first request
+get_diagnosis_async = lazy_callable("DiagnosisAgent.diagnosis_agent", "get_diagnosis_async")
+
 
 @router.post("/ai-diagnosis", tags=["AI Diagnosis"])
-def diagnosis_endpoint(user_input: DiagnosisInput):
+async def diagnosis_endpoint(user_input: DiagnosisInput):
     """
     Endpoint to analyze patient symptoms and provide possible diagnosis suggestions with ICD-10 codes.
     
@@ -25,8 +29,10 @@ def diagnosis_endpoint(user_input: DiagnosisInput):
       - confidence: Percentage (0-100)
     """
     try:
-        diagnoses = get_diagnosis(user_input)
+        diagnoses = await get_diagnosis_async(user_input)
         return diagnoses
+    except TokenBudgetError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing diagnosis: {str(e)}")
 
@@ -2,16 +2,20 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from DrugInteractionAgent.drug_interaction_agent import check_drug_interactions
+from AgentRuntime.lazy_loading import lazy_callable
+from AgentRuntime.token_budget import TokenBudgetError
 from PydanticModels.model import DrugInteractionInput
 from fastapi import APIRouter, HTTPException
 
 
 router = APIRouter()
 
+# Agent module (and its LangChain stack) is imported on first request
+check_drug_interactions_async = lazy_callable("DrugInteractionAgent.drug_interaction_agent", "check_drug_interactions_async")
+
 
 @router.post("/ai-drug-interaction", tags=["AI Drug Interaction"])
-def drug_interaction_endpoint(user_input: DrugInteractionInput):
+async def drug_interaction_endpoint(user_input: DrugInteractionInput):
     """
     Endpoint to check for potential drug interactions when multiple medications are prescribed.
     
@@ -26,8 +30,10 @@ def drug_interaction_endpoint(user_input: DrugInteractionInput):
       - recommendation: Clinical recommendation (optional string)
     """
     try:
-        interactions = check_drug_interactions(user_input)
+        interactions = await check_drug_interactions_async(user_input)
         return interactions
+    except TokenBudgetError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing drug interactions: {str(e)}")
 
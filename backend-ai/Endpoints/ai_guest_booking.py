@@ -2,16 +2,20 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from GuestBookingAgent.guest_booking_agent import get_guest_booking_prediction
+from AgentRuntime.lazy_loading import lazy_callable
+from AgentRuntime.token_budget import TokenBudgetError
 from PydanticModels.model import GuestBookingPredictionInput
 from fastapi import APIRouter, HTTPException
 
 
 router = APIRouter()
 
+# Agent module (and its LangChain stack) is imported on first request
+get_guest_booking_prediction_async = lazy_callable("GuestBookingAgent.guest_booking_agent", "get_guest_booking_prediction_async")
+
 
 @router.post("/ai-guest-booking", tags=["AI Guest Booking"])
-def guest_booking_prediction_endpoint(user_input: GuestBookingPredictionInput):
+async def guest_booking_prediction_endpoint(user_input: GuestBookingPredictionInput):
     """
     Endpoint to analyze guest symptoms during booking to predict urgency level, possible 
     conditions, and recommend appropriate department/specialist.
@@ -31,8 +35,10 @@ def guest_booking_prediction_endpoint(user_input: GuestBookingPredictionInput):
     - confidence_score: Confidence score 0-1 (float)
     """
     try:
-        prediction = get_guest_booking_prediction(user_input)
+        prediction = await get_guest_booking_prediction_async(user_input)
         return prediction
+    except TokenBudgetError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing guest booking prediction: {str(e)}")
 
@@ -2,16 +2,20 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from HealthAnalysisAgent.health_analysis_agent import get_comprehensive_health_analysis
+from AgentRuntime.lazy_loading import lazy_callable
+from AgentRuntime.token_budget import TokenBudgetError
 from PydanticModels.model import HealthAnalysisInput
 from fastapi import APIRouter, HTTPException
 
 
 router = APIRouter()
 
+# Agent module (and its LangChain stack) is imported on first request
+get_comprehensive_health_analysis_async = lazy_callable("HealthAnalysisAgent.health_analysis_agent", "get_comprehensive_health_analysis_async")
+
 
 @router.post("/ai-health-analysis", tags=["AI Health Analysis"])
-def comprehensive_health_analysis_endpoint(user_input: HealthAnalysisInput):
+async def comprehensive_health_analysis_endpoint(user_input: HealthAnalysisInput):
     """
     Endpoint for comprehensive AI-powered health analysis combining symptoms, vitals, 
     and medical history to provide:
@@ -39,8 +43,10 @@ def comprehensive_health_analysis_endpoint(user_input: HealthAnalysisInput):
     - followUpRecommendations: List of follow-up actions (List[str])
     """
     try:
-        analysis = get_comprehensive_health_analysis(user_input)
+        analysis = await get_comprehensive_health_analysis_async(user_input)
         return analysis
+    except TokenBudgetError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing comprehensive health analysis: {str(e)}")
 
@@ -2,16 +2,20 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from ICD10Agent.icd10_agent import get_icd10_suggestions
+from AgentRuntime.lazy_loading import lazy_callable
+from AgentRuntime.token_budget import TokenBudgetError
 from PydanticModels.model import ICD10Input
 from fastapi import APIRouter, HTTPException
 
 
 router = APIRouter()
 
+# Agent module (and its LangChain stack) is imported on first request
+get_icd10_suggestions_async = lazy_callable("ICD10Agent.icd10_agent", "get_icd10_suggestions_async")
+
 
 @router.post("/ai-icd10", tags=["AI ICD-10"])
-def icd10_endpoint(user_input: ICD10Input):
+async def icd10_endpoint(user_input: ICD10Input):
     """
     Endpoint to suggest appropriate ICD-10 diagnosis codes based on clinical diagnosis text.
     
@@ -25,8 +29,10 @@ def icd10_endpoint(user_input: ICD10Input):
       - confidence: Confidence percentage (0-100) (integer)
     """
     try:
-        suggestions = get_icd10_suggestions(user_input)
+        suggestions = await get_icd10_suggestions_async(user_input)
         return suggestions
+    except TokenBudgetError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing ICD-10 suggestions: {str(e)}")
 
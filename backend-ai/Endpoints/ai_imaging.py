@@ -2,16 +2,20 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from ImagingAgent.imaging_agent import analyze_medical_imaging
+from AgentRuntime.lazy_loading import lazy_callable
+from AgentRuntime.token_budget import TokenBudgetError
 from PydanticModels.model import ImagingAnalysisInput
 from fastapi import APIRouter, HTTPException
 
 
 router = APIRouter()
 
+# Agent module (and its LangChain stack) is imported on first request
+analyze_medical_imaging_async = lazy_callable("ImagingAgent.imaging_agent", "analyze_medical_imaging_async")
+
 
 @router.post("/ai-imaging-analysis", tags=["AI Medical Imaging Analysis"])
-def imaging_analysis_endpoint(user_input: ImagingAnalysisInput):
+async def imaging_analysis_endpoint(user_input: ImagingAnalysisInput):
     """
     Endpoint for AI-assisted analysis of medical images (X-rays, CT, MRI, Ultrasound).
     
@@ -45,8 +49,10 @@ def imaging_analysis_endpoint(user_input: ImagingAnalysisInput):
     - radiologistReviewRequired: Boolean (if findings require radiologist review)
     """
     try:
-        analysis = analyze_medical_imaging(user_input)
+        analysis = await analyze_medical_imaging_async(user_input)
         return analysis
+    except TokenBudgetError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing medical imaging analysis: {str(e)}")
 
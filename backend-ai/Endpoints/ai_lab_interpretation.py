@@ -2,16 +2,20 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from LabInterpretationAgent.lab_interpretation_agent import interpret_lab_results
+from AgentRuntime.lazy_loading import lazy_callable
+from AgentRuntime.token_budget import TokenBudgetError
 from PydanticModels.model import LabInterpretationInput
 from fastapi import APIRouter, HTTPException
 
 
 router = APIRouter()
 
+# Agent module (and its LangChain stack) is imported on first request
+interpret_lab_results_async = lazy_callable("LabInterpretationAgent.lab_interpretation_agent", "interpret_lab_results_async")
+
 
 @router.post("/ai-lab-interpretation", tags=["AI Lab Interpretation"])
-def lab_interpretation_endpoint(user_input: LabInterpretationInput):
+async def lab_interpretation_endpoint(user_input: LabInterpretationInput):
     """
     Endpoint for AI-assisted interpretation of lab results in clinical context.
     
@@ -48,8 +52,10 @@ def lab_interpretation_endpoint(user_input: LabInterpretationInput):
     - confidence: Confidence score 0-1 (float)
     """
     try:
-        interpretation = interpret_lab_results(user_input)
+        interpretation = await interpret_lab_results_async(user_input)
         return interpretation
+    except TokenBudgetError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing lab result interpretation: {str(e)}")
 
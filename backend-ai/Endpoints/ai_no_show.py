@@ -2,16 +2,20 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from NoShowAgent.no_show_agent import predict_no_show
+from AgentRuntime.lazy_loading import lazy_callable
+from AgentRuntime.token_budget import TokenBudgetError
 from PydanticModels.model import NoShowPredictionInput
 from fastapi import APIRouter, HTTPException
 
 
 router = APIRouter()
 
+# Agent module (and its LangChain stack) is imported on first request
+predict_no_show_async = lazy_callable("NoShowAgent.no_show_agent", "predict_no_show_async")
+
 
 @router.post("/ai-no-show-prediction", tags=["AI No-Show Prediction"])
-def no_show_prediction_endpoint(user_input: NoShowPredictionInput):
+async def no_show_prediction_endpoint(user_input: NoShowPredictionInput):
     """
     Endpoint to predict likelihood of patient missing scheduled appointment.
     
@@ -50,8 +54,10 @@ def no_show_prediction_endpoint(user_input: NoShowPredictionInput):
                        effort ("low" | "medium" | "high")
     """
     try:
-        prediction = predict_no_show(user_input)
+        prediction = await predict_no_show_async(user_input)
         return prediction
+    except TokenBudgetError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing no-show prediction: {str(e)}")
 
@@ -2,16 +2,20 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from PrescriptionAgent.prescription_agent import get_prescription_recommendations
+from AgentRuntime.lazy_loading import lazy_callable
+from AgentRuntime.token_budget import TokenBudgetError
 from PydanticModels.model import PrescriptionSupportInput
 from fastapi import APIRouter, HTTPException
 
 
 router = APIRouter()
 
+# Agent module (and its LangChain stack) is imported on first request
+get_prescription_recommendations_async = lazy_callable("PrescriptionAgent.prescription_agent", "get_prescription_recommendations_async")
+
 
 @router.post("/ai-prescription-support", tags=["AI Prescription Support"])
-def prescription_support_endpoint(user_input: PrescriptionSupportInput):
+async def prescription_support_endpoint(user_input: PrescriptionSupportInput):
     """
     Endpoint for AI-powered recommendations for optimal medication selection based on 
     diagnosis, patient factors, and evidence-based guidelines.
@@ -50,8 +54,10 @@ def prescription_support_endpoint(user_input: PrescriptionSupportInput):
       * interaction, severity ("low" | "moderate" | "high"), management
     """
     try:
-        recommendations = get_prescription_recommendations(user_input)
+        recommendations = await get_prescription_recommendations_async(user_input)
         return recommendations
+    except TokenBudgetError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing prescription recommendations: {str(e)}")
 
@@ -2,16 +2,20 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from ReadmissionAgent.readmission_agent import predict_readmission_risk
+from AgentRuntime.lazy_loading import lazy_callable
+from AgentRuntime.token_budget import TokenBudgetError
 from PydanticModels.model import ReadmissionRiskInput
 from fastapi import APIRouter, HTTPException
 
 
 router = APIRouter()
 
+# Agent module (and its LangChain stack) is imported on first request
+predict_readmission_risk_async = lazy_callable("ReadmissionAgent.readmission_agent", "predict_readmission_risk_async")
+
 
 @router.post("/ai-readmission-risk", tags=["AI Readmission Risk"])
-def readmission_risk_endpoint(user_input: ReadmissionRiskInput):
+async def readmission_risk_endpoint(user_input: ReadmissionRiskInput):
     """
     Endpoint to predict likelihood of patient readmission within 30 days of discharge.
     
@@ -48,8 +52,10 @@ def readmission_risk_endpoint(user_input: ReadmissionRiskInput):
     - confidence: Confidence score 0-1 (float)
     """
     try:
-        risk_prediction = predict_readmission_risk(user_input)
+        risk_prediction = await predict_readmission_risk_async(user_input)
         return risk_prediction
+    except TokenBudgetError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing readmission risk prediction: {str(e)}")
 
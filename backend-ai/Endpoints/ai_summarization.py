@@ -2,16 +2,20 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from SummarizationAgent.summarization_agent import summarize_notes
+from AgentRuntime.lazy_loading import lazy_callable
+from AgentRuntime.token_budget import TokenBudgetError
 from PydanticModels.model import NotesSummarizationInput
 from fastapi import APIRouter, HTTPException
 
 
 router = APIRouter()
 
+# Agent module (and its LangChain stack) is imported on first request
+summarize_notes_async = lazy_callable("SummarizationAgent.summarization_agent", "summarize_notes_async")
+
 
 @router.post("/ai-summarization", tags=["AI Summarization"])
-def summarization_endpoint(user_input: NotesSummarizationInput):
+async def summarization_endpoint(user_input: NotesSummarizationInput):
     """
     Endpoint to transform raw clinical notes into structured, formatted medical documentation.
     
@@ -23,8 +27,10 @@ def summarization_endpoint(user_input: NotesSummarizationInput):
     - confidence: Confidence score (0-1) (float)
     """
     try:
-        summarized = summarize_notes(user_input)
+        summarized = await summarize_notes_async(user_input)
         return summarized
+    except TokenBudgetError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing summarization: {str(e)}")
 
@@ -2,16 +2,20 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from VitalsAnomalyAgent.vitals_anomaly_agent import detect_vitals_anomalies
+from AgentRuntime.lazy_loading import lazy_callable
+from AgentRuntime.token_budget import TokenBudgetError
 from PydanticModels.model import VitalsAnomalyInput
 from fastapi import APIRouter, HTTPException
 
 
 router = APIRouter()
 
+# Agent module (and its LangChain stack) is imported on first request
+detect_vitals_anomalies_async = lazy_callable("VitalsAnomalyAgent.vitals_anomaly_agent", "detect_vitals_anomalies_async")
+
 
 @router.post("/ai-vitals-anomaly", tags=["AI Vitals Anomaly Detection"])
-def vitals_anomaly_detection_endpoint(user_input: VitalsAnomalyInput):
+async def vitals_anomaly_detection_endpoint(user_input: VitalsAnomalyInput):
     """
     Endpoint for real-time monitoring of patient vital signs to detect anomalies and trigger alerts.
     
@@ -46,8 +50,10 @@ def vitals_anomaly_detection_endpoint(user_input: VitalsAnomalyInput):
     - confidence: Confidence score 0-1 (float)
     """
     try:
-        detection = detect_vitals_anomalies(user_input)
+        detection = await detect_vitals_anomalies_async(user_input)
         return detection
+    except TokenBudgetError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing vital signs anomaly detection: {str(e)}")
 
@@ -2,29 +2,96 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from Vitals.body_vitals import sensor_data_stream
-from fastapi import APIRouter, WebSocket
+from Vitals.body_vitals import sensor_data_stream, simulated_data_stream, parse_readings, max_readings, predict_async, executor
+from PydanticModels.model import VitalsBatchPrediction
+from Configurations.config import settings
+from fastapi import APIRouter, WebSocket, Request, HTTPException
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import ValidationError
 
 
 router = APIRouter()
 
 # For WebSocket endpoint to stream sensor data and predictions
 @router.websocket("/ws/predict",)
-async def websocket_endpoint(websocket:WebSocket):
+async def websocket_endpoint(websocket:WebSocket, simulate: bool = False):
     """
-    WebSocket endpoint to stream sensor data and predictions.
+    WebSocket endpoint to score vitals pushed by bedside devices and stream predictions back.
 
     Protocol:
-    - The client should connect to this endpoint using a WebSocket.
-    - The server will periodically send JSON-formatted sensor data and prediction results.
-    - The client is not required to send messages, but if it does, they should be JSON objects (specify expected keys if any).
+    - The client connects to this endpoint and sends readings as either:
+      - Text frames: a JSON reading object, or a JSON array of them, with heart_rate,
+        resp_rate, blood_pressure_systolic, blood_pressure_diastolic, spo2,
+        temperature_c and glucose_mgdl
+      - Binary frames: one or more readings packed as 7 little-endian float32 values
+        each (28 bytes per reading), in the order above
+    - The server replies once per frame: a prediction message for a single reading, a JSON
+      array of prediction messages for a multi-reading frame, or {"error": "..."} for an
+      invalid frame (the socket stays open).
     - Example server message:
       {
-        "timestamp": "2024-06-01T12:00:00Z",
-        "sensor_data": {...},
-        "prediction": "Normal"
+        "timestamp": "2024-06-01 12:00:00",
+        "data": {"heart_rate": 82.0, ...},
+        "prediction": {
+          "label_status": "Normal",
+          "probable_condition": "Healthy",
+          "confidence": {"label_status": 97.0, "probable_condition": 99.0}
+        }
       }
+    - A client that stops reading replies is back-pressured: once its frame queue is
+      full the server stops reading from the socket.
+    - With VITALS_RULES_MODE "hybrid" or "rules", readings clear of every threshold are
+      labelled by the rules in Vitals/vitals_rules.json (confidence 100) instead of the model.
+    - Connect with ?simulate=true for the demo stream of random vitals (one per second,
+      nothing needs to be sent).
     """
-    await sensor_data_stream(websocket)
+    if simulate:
+        await simulated_data_stream(websocket)
+    else:
+        await sensor_data_stream(websocket)
 
 
+
+
+@router.post("/predict/vitals/batch", response_model=VitalsBatchPrediction, tags=["Vitals"])
+async def vitals_batch_endpoint(request: Request):
+    """
+    Endpoint to score many buffered vitals readings in one request.
+
+    Input (Content-Type application/json or application/x-ndjson):
+    - A JSON array of readings, or one reading object per line (NDJSON). Each reading has
+      heart_rate, resp_rate, blood_pressure_systolic, blood_pressure_diastolic,
+      spo2, temperature_c and glucose_mgdl (finite numbers; NaN and Infinity are rejected)
+
+    Output:
+    - count: Number of readings scored
+    - predictions: One object per reading, in input order, with:
+      - label_status: Critical, Normal or Warning (string)
+      - probable_condition: Healthy or Not Healthy (string)
+      - confidence: label_status and probable_condition confidence percentages (0-100);
+        100 for readings labelled by the threshold rules (VITALS_RULES_MODE)
+    """
+    body = await request.body()
+    # Oversized batches are refused before any validation work is spent on them
+    readings = max_readings(body)
+    if readings > settings.VITALS_BATCH_MAX_READINGS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {readings} readings exceeds the limit of {settings.VITALS_BATCH_MAX_READINGS}",
+        )
+    content_type = request.headers.get("content-type", "")
+    ndjson = "ndjson" in content_type or "jsonlines" in content_type
+    try:
+        # Validation is CPU-bound too; keep it off the event loop
+        features = await run_in_threadpool(parse_readings, body, ndjson)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+    try:
+        predictions = (await predict_async(features, executor.run)).to_records() if len(features) else []
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error scoring vitals batch: {str(e)}")
+    # Already plain JSON types; skip per-row response model validation for large batches
+    return JSONResponse(content={"count": len(predictions), "predictions": predictions})
@@ -0,0 +1,144 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Configurations.config import llm_model
+from AgentRuntime.response_cache import cache_stats
+from AgentRuntime.structured_output import structured_output_stats
+from AgentRuntime.prompt_usage import prompt_usage_stats
+from AgentRuntime.token_budget import token_budget_stats
+from AgentRuntime.single_flight import single_flight_stats
+from AgentRuntime.lazy_loading import lazy_callable, startup_report
+from Vitals.body_vitals import stream_stats, scheduler, executor, rule_router
+from fastapi import APIRouter
+
+
+router = APIRouter()
+
+lookup_stats = lazy_callable("ICD10Agent.icd10_agent", "lookup_stats")
+
+
+@router.get("/metrics/llm-pool", tags=["Monitoring"])
+def llm_pool_metrics():
+    """
+    Endpoint to report usage of the shared LLM client pool.
+
+    Output:
+    - clients: Model names with a pooled client
+    - client_registry_hits / client_registry_misses: LLM() calls that reused a pooled
+      client / built a new one, since worker start
+    - sync_connections / async_connections: Open, idle and in-use HTTP connections to the
+      provider right now (null until the first client is built)
+    - Connection pool limits and timeouts in effect
+    """
+    return llm_model.stats()
+
+
+@router.get("/metrics/response-cache", tags=["Monitoring"])
+def response_cache_metrics():
+    """
+    Endpoint to report hit/miss counts, hit ratio, evictions and average hit/miss
+    latency for each agent response cache.
+    """
+    return cache_stats()
+
+
+@router.get("/metrics/structured-output", tags=["Monitoring"])
+def structured_output_metrics():
+    """
+    Endpoint to report how agent replies were validated against their response
+    schemas: the structured output mode, and per agent the replies validated in
+    one pass, accepted after repair (fences, truncation), rejected as not matching
+    the schema, and refused by the model.
+    """
+    return structured_output_stats()
+
+
+@router.get("/metrics/prompt-cache", tags=["Monitoring"])
+def prompt_cache_metrics():
+    """
+    Endpoint to report provider prompt caching per agent endpoint: LLM calls,
+    input / cached / output tokens, the share of input tokens served from the
+    provider's prompt cache, and calls that hit it.
+    """
+    return prompt_usage_stats()
+
+
+@router.get("/metrics/token-budget", tags=["Monitoring"])
+def token_budget_metrics():
+    """
+    Endpoint to report input token budgets per agent endpoint: the tokenizer in
+    use, each budget, input tokens counted before the calls (average and
+    largest), prompts trimmed to fit and tokens removed, and prompts rejected
+    as over budget. Provider-reported input/output tokens are in /metrics/prompt-cache.
+    """
+    return token_budget_stats()
+
+
+@router.get("/metrics/single-flight", tags=["Monitoring"])
+def single_flight_metrics():
+    """
+    Endpoint to report request coalescing per agent endpoint: model calls started,
+    identical concurrent requests that shared an in-flight call instead, failed
+    calls, and the largest group of requests served by one call.
+    """
+    return single_flight_stats()
+
+
+@router.get("/metrics/icd10", tags=["Monitoring"])
+def icd10_lookup_metrics():
+    """
+    Endpoint to report how ICD-10 lookups were answered: locally from the
+    bundled code index, or escalated to the LLM (and how many LLM codes were
+    rejected as invalid).
+    """
+    return lookup_stats()
+
+
+@router.get("/metrics/vitals-stream", tags=["Monitoring"])
+def vitals_stream_metrics():
+    """
+    Endpoint to report /ws/predict activity in this worker: open sockets, frames
+    received, rejected and dropped, and readings scored.
+    """
+    return stream_stats()
+
+
+@router.get("/metrics/vitals-batching", tags=["Monitoring"])
+def vitals_batching_metrics():
+    """
+    Endpoint to report the /ws/predict micro-batching scheduler: batches run, readings
+    and requests per batch, queue wait and predict time, and a batch-size histogram.
+    """
+    return scheduler.stats()
+
+
+@router.get("/metrics/vitals-executor", tags=["Monitoring"])
+def vitals_executor_metrics():
+    """
+    Endpoint to report the vitals inference executor: mode (thread or process), worker
+    count, bounded queue size, jobs in flight and completed, average run time and total
+    time callers spent waiting for a free slot.
+    """
+    return executor.stats()
+
+
+@router.get("/metrics/vitals-rules", tags=["Monitoring"])
+def vitals_rules_metrics():
+    """
+    Endpoint to report the vitals rules fast path: mode, readings labelled by the
+    threshold rules vs the model, ambiguous and undecidable (NaN or infinite) readings
+    sent to the model, audits run, and how often rules and model agree (overall and
+    as a status confusion table).
+    """
+    return rule_router.stats()
+
+
+@router.get("/metrics/startup", tags=["Monitoring"])
+def startup_metrics():
+    """
+    Endpoint to report where startup time went in this worker: when each startup phase
+    was reached, per-module import times, and how long each lazily loaded artifact or
+    agent module took to load (and whether warm-up or a first request loaded it).
+    """
+    return startup_report()
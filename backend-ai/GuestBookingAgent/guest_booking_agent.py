@@ -1,49 +1,28 @@
 import sys
 import os
-import json
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from Prompts.prompt import guest_booking_prediction_prompt
 from Configurations.config import llm_model
+from AgentRuntime.structured_output import StructuredOutput
+from AgentRuntime.single_flight import SingleFlight
+from AgentRuntime.token_budget import TokenBudget, truncate_text
 from PydanticModels.model import GuestBookingPredictionInput, AIPrediction
 
 
-def get_guest_booking_prediction(user_input: GuestBookingPredictionInput) -> AIPrediction:
-    """
-    Analyze guest symptoms during booking to predict urgency level, possible conditions, 
-    and recommend appropriate department/specialist.
-    
-    Args:
-        user_input: GuestBookingPredictionInput containing symptoms, description, and optional 
-                   patient information
-        
-    Returns:
-        AIPrediction object with urgency level, possible conditions, recommended department, 
-        summary, and confidence score
-    """
-    # Create format instructions for AIPrediction
-    format_instructions = """
-    You must return a JSON object with:
-    - urgency_level: string (one of "Normal", "High", "Emergency")
-    - possible_conditions: array of strings (list of possible medical conditions)
-    - recommended_department: string (the appropriate medical department/specialty)
-    - summary: string (comprehensive clinical summary)
-    - confidence_score: float (a value between 0.0 and 1.0 indicating confidence in the assessment)
-    
-    Example format:
-    {
-        "urgency_level": "High",
-        "possible_conditions": [
-            "Congestive Heart Failure",
-            "Pulmonary Edema",
-            "Acute Coronary Syndrome"
-        ],
-        "recommended_department": "Cardiology",
-        "summary": "Based on symptoms and medical history, patient presents with concerning cardiac symptoms requiring urgent evaluation. Shortness of breath with orthopnea in patient with cardiac history suggests possible heart failure exacerbation.",
-        "confidence_score": 0.85
-    }
-    """
-    
+# Reply schema derived from AIPrediction; the provider enforces it, the prompt only adds these rules
+STRUCTURED_OUTPUT = StructuredOutput("guest_booking_prediction", AIPrediction, guidance="""
+- summary is a comprehensive clinical summary
+- confidence_score is a float 0-1
+""")
+
+
+TOKEN_BUDGET = TokenBudget(STRUCTURED_OUTPUT)
+_single_flight = SingleFlight(STRUCTURED_OUTPUT.name)
+
+
+def _format_prompt(user_input: GuestBookingPredictionInput) -> list:
+    """Build the system and patient messages sent to the model for `get_guest_booking_prediction`."""
     # Format optional fields for the prompt
     age_info = f"Age: {user_input.age}" if user_input.age is not None else ""
     gender_info = f"Gender: {user_input.gender}" if user_input.gender is not None else ""
@@ -53,38 +32,48 @@ def get_guest_booking_prediction(user_input: GuestBookingPredictionInput) -> AIP
     else:
         medical_history_info = ""
     
-    formatted_prompt = guest_booking_prediction_prompt.format(
+    formatted_prompt = TOKEN_BUDGET.fit(guest_booking_prediction_prompt, dict(
         symptoms=user_input.symptoms,
         user_description=user_input.user_description,
         age_info=age_info,
         gender_info=gender_info,
         medical_history_info=medical_history_info,
-        format_instructions=format_instructions
-    )
+        format_instructions=STRUCTURED_OUTPUT.format_instructions
+    ), compactors={"user_description": truncate_text})
 
-    response = llm_model.LLM().invoke(formatted_prompt)
+    return formatted_prompt
+
+
+def _parse_response(response) -> AIPrediction:
+    """Parse the model reply for `get_guest_booking_prediction` into AIPrediction."""
+    return STRUCTURED_OUTPUT.parse(response)
+
+
+def get_guest_booking_prediction(user_input: GuestBookingPredictionInput) -> AIPrediction:
+    """
+    Analyze guest symptoms during booking to predict urgency level, possible conditions, 
+    and recommend appropriate department/specialist.
     
-    # Parse the JSON response
-    try:
-        content = response.content.strip()
-        # Remove markdown code blocks if present
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-        
-        data = json.loads(content)
+    Args:
+        user_input: GuestBookingPredictionInput containing symptoms, description, and optional 
+                   patient information
         
-        # Validate and create AIPrediction object
-        if isinstance(data, dict):
-            return AIPrediction(**data)
-        else:
-            raise ValueError(f"Expected JSON object, got {type(data)}")
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to parse JSON response: {str(e)}. Response content: {content[:200]}")
-    except Exception as e:
-        raise ValueError(f"Failed to process guest booking prediction response: {str(e)}")
+    Returns:
+        AIPrediction object with urgency level, possible conditions, recommended department, 
+        summary, and confidence score
+    """
+    response = STRUCTURED_OUTPUT.bind(llm_model.LLM()).invoke(_format_prompt(user_input))
+    return _parse_response(response)
+
+
+async def get_guest_booking_prediction_async(user_input: GuestBookingPredictionInput) -> AIPrediction:
+    """
+    Async variant of `get_guest_booking_prediction` that awaits the model's native async API,
+    so the calling event loop is free while the request is in flight. Identical
+    requests arriving while it is in flight share its model call.
+    """
+    async def compute():
+        response = await STRUCTURED_OUTPUT.bind(llm_model.LLM()).ainvoke(_format_prompt(user_input))
+        return _parse_response(response)
 
+    return await _single_flight.do(_single_flight.make_key(user_input), compute)
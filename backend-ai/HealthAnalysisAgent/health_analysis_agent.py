@@ -1,80 +1,35 @@
 import sys
 import os
-import json
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from Prompts.prompt import comprehensive_health_analysis_prompt
 from Configurations.config import llm_model
+from AgentRuntime.structured_output import StructuredOutput
+from AgentRuntime.single_flight import SingleFlight
+from AgentRuntime.token_budget import TokenBudget
 from PydanticModels.model import HealthAnalysisInput, ComprehensiveHealthAnalysis
 
 
-def get_comprehensive_health_analysis(user_input: HealthAnalysisInput) -> ComprehensiveHealthAnalysis:
-    """
-    Comprehensive AI-powered analysis combining symptoms, vitals, and medical history 
-    to provide possible conditions, recommended doctors, risk factors, care recommendations, 
-    and follow-up plans.
-    
-    Args:
-        user_input: HealthAnalysisInput containing age, gender, symptoms, vitals, and 
-                   optional medical history
-        
-    Returns:
-        ComprehensiveHealthAnalysis object with conditions, recommended doctors, remedies, 
-        urgency, confidence, risk factors, and follow-up recommendations
-    """
-    # Create format instructions for ComprehensiveHealthAnalysis
-    format_instructions = """
-    You must return a JSON object with the following structure:
-    {
-        "conditions": [
-            {
-                "name": "Condition name",
-                "probability": 87,
-                "severity": "severe",
-                "description": "Clinical description"
-            }
-        ],
-        "recommendedDoctors": [
-            {
-                "name": "Dr. Sarah Johnson",
-                "specialty": "Cardiology",
-                "match": 94,
-                "availability": "Available today",
-                "experience": "15 years",
-                "rating": 4.8
-            }
-        ],
-        "remedies": [
-            "Immediate blood pressure control",
-            "Neurological evaluation"
-        ],
-        "urgency": "urgent",
-        "confidence": 89,
-        "riskFactors": [
-            "Uncontrolled hypertension",
-            "Diabetes mellitus"
-        ],
-        "followUpRecommendations": [
-            "Emergency department evaluation within 2 hours",
-            "Blood pressure monitoring every 30 minutes"
-        ]
-    }
-    
-    Important:
-    - urgency must be one of: "routine", "urgent", "emergency"
-    - severity for conditions must be one of: "mild", "moderate", "severe"
-    - probability and confidence are integers 0-100
-    - rating is a float 0-5
-    - match is an integer 0-100
-    """
-    
+# Reply schema derived from ComprehensiveHealthAnalysis; the provider enforces it, the prompt only adds these rules
+STRUCTURED_OUTPUT = StructuredOutput("health_analysis", ComprehensiveHealthAnalysis, guidance="""
+- probability, match and confidence are integers 0-100
+- rating is a float 0-5
+""")
+
+
+TOKEN_BUDGET = TokenBudget(STRUCTURED_OUTPUT)
+_single_flight = SingleFlight(STRUCTURED_OUTPUT.name)
+
+
+def _format_prompt(user_input: HealthAnalysisInput) -> list:
+    """Build the system and patient messages sent to the model for `get_comprehensive_health_analysis`."""
     # Format medical history if provided
     if user_input.medicalHistory and len(user_input.medicalHistory) > 0:
         medical_history_info = f"Medical History: {', '.join(user_input.medicalHistory)}"
     else:
         medical_history_info = "Medical History: None provided"
     
-    formatted_prompt = comprehensive_health_analysis_prompt.format(
+    formatted_prompt = TOKEN_BUDGET.fit(comprehensive_health_analysis_prompt, dict(
         age=user_input.age,
         gender=user_input.gender,
         symptoms=user_input.symptoms,
@@ -83,32 +38,43 @@ def get_comprehensive_health_analysis(user_input: HealthAnalysisInput) -> Compre
         temperature=user_input.vitals.temperature,
         oxygen_sat=user_input.vitals.oxygenSat,
         medical_history_info=medical_history_info,
-        format_instructions=format_instructions
-    )
+        format_instructions=STRUCTURED_OUTPUT.format_instructions
+    ))
 
-    response = llm_model.LLM().invoke(formatted_prompt)
+    return formatted_prompt
+
+
+def _parse_response(response) -> ComprehensiveHealthAnalysis:
+    """Parse the model reply for `get_comprehensive_health_analysis` into ComprehensiveHealthAnalysis."""
+    return STRUCTURED_OUTPUT.parse(response)
+
+
+def get_comprehensive_health_analysis(user_input: HealthAnalysisInput) -> ComprehensiveHealthAnalysis:
+    """
+    Comprehensive AI-powered analysis combining symptoms, vitals, and medical history 
+    to provide possible conditions, recommended doctors, risk factors, care recommendations, 
+    and follow-up plans.
     
-    # Parse the JSON response
-    try:
-        content = response.content.strip()
-        # Remove markdown code blocks if present
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-        
-        data = json.loads(content)
+    Args:
+        user_input: HealthAnalysisInput containing age, gender, symptoms, vitals, and 
+                   optional medical history
         
-        # Validate and create ComprehensiveHealthAnalysis object
-        if isinstance(data, dict):
-            return ComprehensiveHealthAnalysis(**data)
-        else:
-            raise ValueError(f"Expected JSON object, got {type(data)}")
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to parse JSON response: {str(e)}. Response content: {content[:200]}")
-    except Exception as e:
-        raise ValueError(f"Failed to process comprehensive health analysis response: {str(e)}")
+    Returns:
+        ComprehensiveHealthAnalysis object with conditions, recommended doctors, remedies, 
+        urgency, confidence, risk factors, and follow-up recommendations
+    """
+    response = STRUCTURED_OUTPUT.bind(llm_model.LLM()).invoke(_format_prompt(user_input))
+    return _parse_response(response)
+
+
+async def get_comprehensive_health_analysis_async(user_input: HealthAnalysisInput) -> ComprehensiveHealthAnalysis:
+    """
+    Async variant of `get_comprehensive_health_analysis` that awaits the model's native async API,
+    so the calling event loop is free while the request is in flight. Identical
+    requests arriving while it is in flight share its model call.
+    """
+    async def compute():
+        response = await STRUCTURED_OUTPUT.bind(llm_model.LLM()).ainvoke(_format_prompt(user_input))
+        return _parse_response(response)
 
+    return await _single_flight.do(_single_flight.make_key(user_input), compute)
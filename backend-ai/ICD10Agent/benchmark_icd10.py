@@ -0,0 +1,92 @@
+"""
+Compare local ICD-10 index latency with the LLM lookup.
+
+Usage:
+    python -m ICD10Agent.benchmark_icd10            # local index only
+    python -m ICD10Agent.benchmark_icd10 --llm      # also time the model (needs OPENAI_API_KEY)
+"""
+import sys
+import os
+import time
+import argparse
+import statistics
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ICD10Agent.icd10_index import ICD10Index
+from PydanticModels.model import ICD10Input
+
+
+SAMPLE_DIAGNOSES = [
+    "type 2 diabetes without complications",
+    "Type 2 diabetes mellitus without complications",
+    "essential hypertension",
+    "E11.9",
+    "acute bronchitis",
+    "low back pain",
+    "urinary tract infection",
+    "chest pain",
+    "hyperlipidemia",
+    "COVID-19",
+    "anxiety",
+    "migraine without aura, not intractable",
+    "community acquired pneumonia",
+    "type 2 diabetes with diabetic neuropathy",
+    "copd exacerbation",
+    "fracture of hip after fall",
+]
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _summary(samples):
+    return (
+        f"mean {statistics.mean(samples) * 1000:9.3f} ms | "
+        f"p50 {_percentile(samples, 50) * 1000:9.3f} ms | "
+        f"p99 {_percentile(samples, 99) * 1000:9.3f} ms"
+    )
+
+
+def benchmark_local(index: ICD10Index, repeats: int):
+    samples, answered = [], 0
+    for _ in range(repeats):
+        for diagnosis in SAMPLE_DIAGNOSES:
+            started = time.perf_counter()
+            result = index.match(diagnosis)
+            samples.append(time.perf_counter() - started)
+            answered += result is not None
+    return samples, answered / (repeats * len(SAMPLE_DIAGNOSES))
+
+
+def benchmark_llm():
+    # Imported here so the local benchmark runs without API credentials
+    from ICD10Agent.icd10_agent import _format_prompt, _parse_response
+    from Configurations.config import llm_model
+
+    samples = []
+    for diagnosis in SAMPLE_DIAGNOSES:
+        started = time.perf_counter()
+        _parse_response(llm_model.LLM().invoke(_format_prompt(ICD10Input(diagnosis=diagnosis))))
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark local ICD-10 lookups against the LLM.")
+    parser.add_argument("--repeats", type=int, default=200, help="Passes over the sample diagnoses for the local index")
+    parser.add_argument("--llm", action="store_true", help="Also time one LLM call per sample diagnosis")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = ICD10Index.load()
+    print(f"Index load:  {time.perf_counter() - started:.2f} s ({len(index.codes)} codes)")
+
+    local_samples, local_ratio = benchmark_local(index, args.repeats)
+    print(f"Local index: {_summary(local_samples)} | answered locally {local_ratio:.0%}")
+
+    if args.llm:
+        llm_samples = benchmark_llm()
+        print(f"LLM:         {_summary(llm_samples)}")
+        print(f"Speed-up (mean): {statistics.mean(llm_samples) / statistics.mean(local_samples):,.0f}x")
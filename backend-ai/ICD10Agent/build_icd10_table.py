@@ -0,0 +1,72 @@
+"""
+Build the bundled ICD-10-CM code table from the CMS tabular list XML.
+
+Usage:
+    python -m ICD10Agent.build_icd10_table icd10cm-tabular-2026.xml Datasets/icd10cm_codes.csv.gz
+
+The CMS "Code Tables, Tabular and Index" release ships the tabular list as
+`icd10cm-tabular-<year>.xml`. Each output row holds one code from the tabular
+list with its official description, its inclusion terms (used as search
+synonyms), whether it is billable as-is, and the 7th characters it accepts.
+"""
+import sys
+import os
+import csv
+import gzip
+import argparse
+import xml.etree.ElementTree as ET
+
+
+def _notes(element, tag):
+    node = element.find(tag)
+    if node is None:
+        return []
+    return [note.text.strip() for note in node.findall("note") if note.text]
+
+
+def _seventh_chars(element):
+    node = element.find("sevenChrDef")
+    if node is None:
+        return None
+    return "".join(extension.get("char") for extension in node.findall("extension"))
+
+
+def _walk(diag, inherited_seventh, rows):
+    seventh = _seventh_chars(diag) or inherited_seventh
+    children = diag.findall("diag")
+    rows.append({
+        "code": diag.findtext("name").strip(),
+        "description": diag.findtext("desc").strip(),
+        "synonyms": "|".join(_notes(diag, "inclusionTerm")),
+        "billable": int(not children and not seventh),
+        "seventh_chars": seventh or "",
+    })
+    for child in children:
+        _walk(child, seventh, rows)
+
+
+def build_table(xml_path: str, output_path: str) -> int:
+    """Convert the tabular XML into a (optionally gzipped) CSV. Returns the number of codes written."""
+    root = ET.parse(xml_path).getroot()
+    rows = []
+    for chapter in root.iter("chapter"):
+        for section in chapter.findall("section"):
+            for diag in section.findall("diag"):
+                _walk(diag, None, rows)
+
+    opener = gzip.open if output_path.endswith(".gz") else open
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with opener(output_path, "wt", encoding="utf-8", newline="") as handle:
+        writer = csv.DictWriter(handle, fieldnames=["code", "description", "synonyms", "billable", "seventh_chars"])
+        writer.writeheader()
+        writer.writerows(rows)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the bundled ICD-10-CM code table.")
+    parser.add_argument("xml_path", help="CMS ICD-10-CM tabular list XML")
+    parser.add_argument("output_path", nargs="?", default="Datasets/icd10cm_codes.csv.gz")
+    args = parser.parse_args()
+    count = build_table(args.xml_path, args.output_path)
+    print(f"Wrote {count} ICD-10-CM codes to {args.output_path}", file=sys.stderr)
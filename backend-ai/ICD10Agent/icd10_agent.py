@@ -1,14 +1,94 @@
 import sys
 import os
-import json
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from Prompts.prompt import icd10_suggestion_prompt
-from Configurations.config import llm_model
+from Configurations.config import llm_model, settings
+from AgentRuntime.structured_output import StructuredOutput, ParsedReply
+from AgentRuntime.single_flight import SingleFlight
+from AgentRuntime.token_budget import TokenBudget
+from AgentRuntime.response_cache import ResponseCache, Uncached, template_version
+from ICD10Agent.icd10_index import get_icd10_index
 from PydanticModels.model import ICD10Input, ICD10Suggestion
 from typing import List
 
 
+# Reply schema derived from List[ICD10Suggestion]; the provider enforces it, the prompt only adds these rules
+STRUCTURED_OUTPUT = StructuredOutput("icd10_suggestions", List[ICD10Suggestion], guidance="""
+- items holds the code suggestions, best match first
+- desc is the official ICD-10-CM code description
+- confidence is an integer 0-100
+""")
+
+# Bumps automatically whenever the prompt template or response schema change
+PROMPT_VERSION = template_version(icd10_suggestion_prompt.pretty_repr(), STRUCTURED_OUTPUT.version_text)
+
+_cache = ResponseCache("icd10", List[ICD10Suggestion], ttl_seconds=settings.CACHE_TTL_ICD10_SECONDS)
+
+# How lookups were answered, for monitoring
+_lookup_stats = {"local_matches": 0, "llm_escalations": 0, "invalid_llm_codes": 0}
+
+
+TOKEN_BUDGET = TokenBudget(STRUCTURED_OUTPUT)
+_single_flight = SingleFlight(STRUCTURED_OUTPUT.name)
+
+
+def _format_prompt(user_input: ICD10Input) -> list:
+    """Build the system and patient messages sent to the model for `get_icd10_suggestions`."""
+    formatted_prompt = TOKEN_BUDGET.fit(icd10_suggestion_prompt, dict(
+        diagnosis=user_input.diagnosis,
+        format_instructions=STRUCTURED_OUTPUT.format_instructions
+    ))
+
+    return formatted_prompt
+
+
+def _parse_response(response) -> ParsedReply:
+    """Parse the model reply for `get_icd10_suggestions` into List[ICD10Suggestion], and whether it is complete."""
+    return STRUCTURED_OUTPUT.parse_reply(response)
+
+
+def _local_match(user_input: ICD10Input):
+    """Answer from the bundled ICD-10-CM index when the text maps to one code unambiguously."""
+    if not settings.ICD10_LOCAL_LOOKUP:
+        return None
+    suggestions = get_icd10_index().match(user_input.diagnosis)
+    _lookup_stats["local_matches" if suggestions is not None else "llm_escalations"] += 1
+    return suggestions
+
+
+def _validate_suggestions(suggestions: List[ICD10Suggestion], diagnosis: str) -> List[ICD10Suggestion]:
+    """
+    Drop model-suggested codes that do not exist in ICD-10-CM and replace the
+    descriptions of valid ones with the official text. If nothing valid is
+    left, fall back to the index's best text matches.
+    """
+    index = get_icd10_index()
+    validated = []
+    for suggestion in suggestions:
+        official = index.lookup(suggestion.code)
+        if official is None:
+            _lookup_stats["invalid_llm_codes"] += 1
+            continue
+        validated.append(ICD10Suggestion(code=official.code, desc=official.desc, confidence=suggestion.confidence))
+    return validated or index.candidates(diagnosis)
+
+
+def _suggestions(reply: ParsedReply, diagnosis: str):
+    """Validated suggestions of a model reply; a cut-off or repaired reply is returned uncached."""
+    suggestions = _validate_suggestions(reply.value, diagnosis)
+    return suggestions if reply.complete else Uncached(suggestions)
+
+
+def lookup_stats():
+    """Local match / LLM escalation counters for this worker."""
+    return dict(_lookup_stats)
+
+
+def _cache_key(user_input: ICD10Input) -> str:
+    return _cache.make_key(user_input, PROMPT_VERSION, llm_model.model_name)
+
+
 def get_icd10_suggestions(user_input: ICD10Input) -> List[ICD10Suggestion]:
     """
     Suggest appropriate ICD-10 diagnosis codes based on clinical diagnosis text.
@@ -18,59 +98,36 @@ def get_icd10_suggestions(user_input: ICD10Input) -> List[ICD10Suggestion]:
         
     Returns:
         List of ICD10Suggestion objects with code, description, and confidence
+        
+    Unambiguous text (a code, an official description, or a single tight
+    match) is answered from the local ICD-10-CM index. Anything else goes to
+    the model; its codes are validated against the same index. Model answers
+    are cached per canonical input, prompt version and model name.
     """
-    # Create format instructions for a list of ICD10Suggestion
-    format_instructions = """
-    You must return a JSON array of ICD-10 code suggestion objects. Each object should have:
-    - code: string (the ICD-10 code)
-    - desc: string (the official ICD-10 code description)
-    - confidence: integer (0-100, percentage confidence)
-    
-    Example format:
-    [
-        {
-            "code": "E11.40",
-            "desc": "Type 2 diabetes mellitus with diabetic neuropathy, unspecified",
-            "confidence": 95
-        },
-        {
-            "code": "E11.9",
-            "desc": "Type 2 diabetes mellitus without complications",
-            "confidence": 78
-        }
-    ]
+    local = _local_match(user_input)
+    if local is not None:
+        return local
+
+    def compute():
+        response = STRUCTURED_OUTPUT.bind(llm_model.LLM()).invoke(_format_prompt(user_input))
+        return _suggestions(_parse_response(response), user_input.diagnosis)
+
+    return _cache.get_or_compute(_cache_key(user_input), compute)
+
+
+async def get_icd10_suggestions_async(user_input: ICD10Input) -> List[ICD10Suggestion]:
     """
-    
-    formatted_prompt = icd10_suggestion_prompt.format(
-        diagnosis=user_input.diagnosis,
-        format_instructions=format_instructions
-    )
+    Async variant of `get_icd10_suggestions` that awaits the model's native async API,
+    so the calling event loop is free while the request is in flight. Identical
+    requests arriving while it is in flight share its model call.
+    """
+    local = _local_match(user_input)
+    if local is not None:
+        return local
 
-    response = llm_model.LLM().invoke(formatted_prompt)
-    
-    # Parse the JSON response
-    try:
-        content = response.content.strip()
-        # Remove markdown code blocks if present
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-        
-        data = json.loads(content)
-        
-        # Handle both single dict and list of dicts
-        if isinstance(data, dict):
-            return [ICD10Suggestion(**data)]
-        elif isinstance(data, list):
-            return [ICD10Suggestion(**item) for item in data]
-        else:
-            raise ValueError(f"Unexpected response format: {type(data)}")
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to parse JSON response: {str(e)}. Response content: {content[:200]}")
-    except Exception as e:
-        raise ValueError(f"Failed to process ICD-10 suggestion response: {str(e)}")
+    async def compute():
+        response = await STRUCTURED_OUTPUT.bind(llm_model.LLM()).ainvoke(_format_prompt(user_input))
+        return _suggestions(_parse_response(response), user_input.diagnosis)
 
+    key = _cache_key(user_input)
+    return await _cache.aget_or_compute(key, lambda: _single_flight.do(key, compute))
@@ -0,0 +1,317 @@
+import sys
+import os
+import re
+import csv
+import gzip
+import math
+import time
+import bisect
+import threading
+from functools import lru_cache
+from collections import Counter, defaultdict
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from Configurations.config import settings
+from PydanticModels.model import ICD10Suggestion
+from AgentRuntime.lazy_loading import timed_load
+from typing import Dict, List, Optional
+
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Words that carry no meaning for code matching
+STOPWORDS = {"a", "an", "and", "or", "of", "the", "to", "in", "on", "by", "for", "as", "at"}
+
+# Qualifiers an official description may add without changing what the user asked for
+NEUTRAL_TERMS = {"mellitus", "primary", "unspecified", "nos", "site", "not", "specified", "disease", "disorder"}
+
+# Free-text shorthand commonly typed at the front desk
+ABBREVIATIONS = {
+    "t1dm": "type 1 diabetes mellitus",
+    "t2dm": "type 2 diabetes mellitus",
+    "dm": "diabetes mellitus",
+    "htn": "hypertension",
+    "copd": "chronic obstructive pulmonary disease",
+    "chf": "heart failure",
+    "ckd": "chronic kidney disease",
+    "uti": "urinary tract infection",
+    "mi": "myocardial infarction",
+    "gerd": "gastro-esophageal reflux disease",
+    "afib": "atrial fibrillation",
+}
+
+CODE_PATTERN = re.compile(r"^[A-TV-Z][0-9][0-9A-Z](\.?[0-9A-Z]{1,4})?$")
+
+# Misspelt query words whose vocabulary correction is remembered per index
+MAX_CACHED_CORRECTIONS = 4096
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def normalize_code(code: str) -> str:
+    """Upper-case a code and put the dot after the category ("e119" -> "E11.9")."""
+    code = code.strip().upper().replace(" ", "")
+    if "." not in code and len(code) > 3:
+        code = f"{code[:3]}.{code[3:]}"
+    return code
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(tokenize(text))
+
+
+def tokenize(text: str) -> List[str]:
+    words = re.findall(r"[a-z0-9]+", text.lower().replace("-", " "))
+    expanded = []
+    for word in words:
+        expanded.extend(ABBREVIATIONS.get(word, word).split())
+    return [word for word in expanded if word not in STOPWORDS]
+
+
+def _trigrams(word: str):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ICD10Index:
+    """
+    In-memory ICD-10-CM index used to answer clear-cut lookups without the LLM.
+
+    - Codes are kept in a sorted array, so exact lookups and code-prefix
+      searches are a bisect (a flattened prefix trie).
+    - Descriptions and inclusion terms are indexed for BM25 ranking; the
+      per-posting BM25 weights are precomputed so a query is a few NumPy adds.
+    - Query words missing from the vocabulary are corrected to the closest
+      vocabulary word by trigram similarity, which handles common typos when
+      ranking candidates; a local answer needs every word in the vocabulary.
+    - Local answers are always billable codes; a bare category ("Asthma",
+      J45) is only answered when it has a single "unspecified" billable code.
+    """
+
+    def __init__(self, rows: List[dict]):
+        started = time.perf_counter()
+        self.codes = [row["code"] for row in rows]
+        self.descriptions = [row["description"] for row in rows]
+        self.billable = np.array([row["billable"] == "1" for row in rows], dtype=bool)
+        self.seventh_chars = {row["code"]: row["seventh_chars"] for row in rows if row["seventh_chars"]}
+        self._code_index = {code: i for i, code in enumerate(self.codes)}
+
+        order = sorted(range(len(self.codes)), key=lambda i: self.codes[i])
+        self._sorted_codes = [self.codes[i].replace(".", "") for i in order]
+        self._sorted_ids = order
+
+        # Exact text -> code ids (descriptions and inclusion terms)
+        self._exact: Dict[str, List[int]] = defaultdict(list)
+        self._texts = []
+        documents = []
+        for i, row in enumerate(rows):
+            texts = [row["description"]] + [term for term in row["synonyms"].split("|") if term]
+            for text in texts:
+                self._exact[normalize_text(text)].append(i)
+            self._texts.append(" ".join(texts))
+            documents.append(tokenize(self._texts[-1]))
+
+        self._build_bm25(documents)
+        self.build_seconds = time.perf_counter() - started
+
+    def _build_bm25(self, documents: List[List[str]]):
+        n_docs = len(documents)
+        lengths = np.array([len(doc) for doc in documents], dtype=np.float32)
+        avg_length = float(lengths.mean()) if n_docs else 1.0
+        postings = defaultdict(list)
+        for doc_id, doc in enumerate(documents):
+            for term, tf in Counter(doc).items():
+                postings[term].append((doc_id, tf))
+
+        self._postings = {}
+        for term, entries in postings.items():
+            ids = np.fromiter((doc_id for doc_id, _ in entries), dtype=np.int32, count=len(entries))
+            tfs = np.fromiter((tf for _, tf in entries), dtype=np.float32, count=len(entries))
+            idf = math.log(1 + (n_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[ids] / avg_length)
+            self._postings[term] = (ids, (idf * tfs * (BM25_K1 + 1) / (tfs + norm)).astype(np.float32))
+
+        # Bounded: the typos seen over a worker's lifetime are unbounded
+        self._closest_term = lru_cache(maxsize=MAX_CACHED_CORRECTIONS)(self._find_closest_term)
+        self._vocab_trigrams = defaultdict(set)
+        for term in self._postings:
+            for gram in _trigrams(term):
+                self._vocab_trigrams[gram].add(term)
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "ICD10Index":
+        """Load the bundled code table (CSV, optionally gzipped)."""
+        path = path or settings.ICD10_TABLE_PATH
+        if not os.path.isabs(path):
+            path = os.path.join(BASE_DIR, path)
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8", newline="") as handle:
+            return cls(list(csv.DictReader(handle)))
+
+    # ----------------------------
+    # Code lookups
+    # ----------------------------
+    def lookup(self, code: str) -> Optional[ICD10Suggestion]:
+        """Official description for a code, including 7th-character extensions."""
+        code = normalize_code(code)
+        i = self._code_index.get(code)
+        if i is None and len(code.replace(".", "")) == 7:
+            base = code[:-1]
+            if code[-1] in self.seventh_chars.get(base, ""):
+                i = self._code_index.get(base)
+        if i is None:
+            return None
+        return ICD10Suggestion(code=code, desc=self.descriptions[i], confidence=100)
+
+    def is_valid(self, code: str) -> bool:
+        return self.lookup(code) is not None
+
+    def is_billable(self, code: str) -> bool:
+        """Whether a code can be reported as-is: a leaf code, or a leaf code with a valid 7th character."""
+        code = normalize_code(code)
+        i = self._code_index.get(code)
+        if i is not None:
+            return bool(self.billable[i])
+        return self.is_valid(code) and len(self.prefix_search(code[:-1], limit=2)) == 1
+
+    def prefix_search(self, prefix: str, limit: int = 10) -> List[str]:
+        """Codes starting with `prefix`, in code order."""
+        prefix = prefix.strip().upper().replace(".", "")
+        start = bisect.bisect_left(self._sorted_codes, prefix)
+        results = []
+        for position in range(start, len(self._sorted_codes)):
+            if not self._sorted_codes[position].startswith(prefix) or len(results) >= limit:
+                break
+            results.append(self.codes[self._sorted_ids[position]])
+        return results
+
+    # ----------------------------
+    # Text search
+    # ----------------------------
+    def _correct(self, term: str) -> Optional[str]:
+        if term in self._postings:
+            return term
+        return self._closest_term(term)
+
+    def _find_closest_term(self, term: str) -> Optional[str]:
+        grams = _trigrams(term)
+        candidates = Counter()
+        for gram in grams:
+            candidates.update(self._vocab_trigrams.get(gram, ()))
+        best, best_score = None, 0.0
+        for word, shared in candidates.most_common(25):
+            score = shared / len(grams | _trigrams(word))
+            if score > best_score:
+                best, best_score = word, score
+        return best if best_score >= settings.ICD10_FUZZY_MIN_SIMILARITY else None
+
+    def query_terms(self, text: str):
+        """
+        Vocabulary terms for the words of free text.
+
+        Returns:
+            (terms, unresolved): the terms to rank with, and the words that were
+            not in the vocabulary (corrected by trigram similarity, or dropped)
+        """
+        terms, unresolved = [], []
+        for word in tokenize(text):
+            term = self._correct(word)
+            if term != word:
+                unresolved.append(word)
+            if term:
+                terms.append(term)
+        return terms, unresolved
+
+    def search(self, text: str, limit: int = 5):
+        """BM25-ranked (code id, score) hits and the query terms used, for free text."""
+        terms, _ = self.query_terms(text)
+        return self._rank(terms, limit), terms
+
+    def _rank(self, terms: List[str], limit: int):
+        if not terms:
+            return []
+        scores = np.zeros(len(self.codes), dtype=np.float32)
+        for term in terms:
+            ids, weights = self._postings[term]
+            scores[ids] += weights
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+    def match(self, text: str) -> Optional[List[ICD10Suggestion]]:
+        """
+        Answer a diagnosis string locally when the match is unambiguous, else None.
+
+        High-confidence cases: the text is itself a billable code, it equals an
+        official description or inclusion term of a billable code (or of a
+        category with a single billable "unspecified" code), or exactly one of
+        the top BM25 hits is billable, contains every query term and adds only
+        neutral qualifiers ("mellitus", "unspecified", ...). Categories that
+        need a more specific code go to the LLM, and so does any text with a
+        word outside the code vocabulary: a negation or qualifier ("denied",
+        "on lisinopril") must never be dropped or typo-corrected into a
+        confident answer.
+        """
+        candidate = text.strip()
+        if CODE_PATTERN.match(candidate.upper()):
+            found = self.lookup(candidate)
+            if found is not None and self.is_billable(found.code):
+                return [found]
+
+        exact = self._exact.get(normalize_text(text))
+        if exact:
+            ranked = sorted(i for i in set(exact) if self.billable[i])
+            if not ranked:
+                # Only categories were named; answer with their billable "unspecified" code, if any
+                ranked = [child for i in sorted(set(exact)) for child in self._unspecified_children(i)]
+            if ranked:
+                return [self._suggestion(i, 100 - rank) for rank, i in enumerate(ranked[:5])]
+
+        terms, unresolved = self.query_terms(text)
+        if unresolved:
+            return None
+        hits = self._rank(terms, settings.ICD10_LOCAL_CANDIDATES)
+        query_terms = set(terms)
+        tight = []
+        for i, _ in hits:
+            doc_terms = set(tokenize(self._texts[i]))
+            if self.billable[i] and query_terms <= doc_terms and not (doc_terms - query_terms - NEUTRAL_TERMS):
+                tight.append(i)
+        if len(tight) == 1:
+            return [self._suggestion(tight[0], 95)]
+        return None
+
+    def _unspecified_children(self, i: int) -> List[int]:
+        target = f"{self.descriptions[i]}, unspecified".lower()
+        children = (self._code_index[code] for code in self.prefix_search(self.codes[i], limit=100))
+        return [child for child in children
+                if self.billable[child] and self.descriptions[child].lower() == target][:1]
+
+    def candidates(self, text: str, limit: int = 5) -> List[ICD10Suggestion]:
+        """Top BM25 candidates with a confidence scaled from their score."""
+        hits, _ = self.search(text, limit=limit)
+        if not hits:
+            return []
+        top_score = hits[0][1]
+        return [self._suggestion(i, int(50 * score / top_score)) for i, score in hits]
+
+    def _suggestion(self, i: int, confidence: int) -> ICD10Suggestion:
+        return ICD10Suggestion(code=self.codes[i], desc=self.descriptions[i], confidence=confidence)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_icd10_index(trigger: str = "first use") -> ICD10Index:
+    """Process-wide index, loaded on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                with timed_load("icd10_index", trigger):
+                    _index = ICD10Index.load()
+    return _index
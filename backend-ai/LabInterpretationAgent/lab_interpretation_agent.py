@@ -1,74 +1,35 @@
 import sys
 import os
-import json
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from Prompts.prompt import lab_interpretation_prompt
-from Configurations.config import llm_model
+from Configurations.config import llm_model, settings
+from AgentRuntime.structured_output import StructuredOutput
+from AgentRuntime.single_flight import SingleFlight
+from AgentRuntime.token_budget import TokenBudget, compact_lines
 from PydanticModels.model import LabInterpretationInput, LabInterpretation
 
 
-def interpret_lab_results(user_input: LabInterpretationInput) -> LabInterpretation:
-    """
-    AI-assisted interpretation of lab results in clinical context.
-    
-    Args:
-        user_input: LabInterpretationInput containing patient ID, lab results, and 
-                   clinical context
-        
-    Returns:
-        LabInterpretation object with summary, abnormal findings, suggested follow-up, 
-        and confidence
-    """
-    # Create format instructions for LabInterpretation
-    format_instructions = """
-    You must return a JSON object with the following structure:
-    {
-        "summary": "Comprehensive clinical summary of lab findings...",
-        "abnormalFindings": [
-            {
-                "test": "Hemoglobin",
-                "significance": "high",
-                "clinicalImplications": [
-                    "Significant anemia may indicate blood loss or impaired production",
-                    "Correlates with patient's reported fatigue"
-                ],
-                "possibleCauses": [
-                    "Iron deficiency",
-                    "Chronic blood loss",
-                    "Medication-induced anemia"
-                ],
-                "recommendedActions": [
-                    "Check iron studies (ferritin, TIBC)",
-                    "Consider GI workup for occult bleeding",
-                    "Review medications for potential causes"
-                ]
-            }
-        ],
-        "suggestedFollowUp": [
-            {
-                "test": "Iron studies (Ferritin, TIBC, Iron)",
-                "reason": "To determine cause of anemia",
-                "urgency": "within_week"
-            },
-            {
-                "test": "Fecal occult blood test",
-                "reason": "Rule out GI bleeding as cause of anemia",
-                "urgency": "within_24h"
-            }
-        ],
-        "confidence": 0.87
-    }
-    
-    Important:
-    - significance must be one of: "critical", "high", "moderate", "low"
-    - urgency must be one of: "immediate", "within_24h", "within_week", "routine"
-    - confidence is a float 0-1
-    - Only include tests that are actually abnormal in abnormalFindings
-    - Rank abnormal findings by significance (most critical first)
-    - Rank suggested follow-up by urgency (most urgent first)
-    """
-    
+# Reply schema derived from LabInterpretation; the provider enforces it, the prompt only adds these rules
+STRUCTURED_OUTPUT = StructuredOutput("lab_interpretation", LabInterpretation, guidance="""
+- confidence is a float 0-1
+- Only include tests that are actually abnormal in abnormalFindings
+- Rank abnormal findings by significance (most critical first)
+- Rank suggested follow-up by urgency (most urgent first)
+""")
+
+
+# Over budget, repeated results are dropped first, then normal results, so abnormal ones reach the model
+TOKEN_BUDGET = TokenBudget(STRUCTURED_OUTPUT, settings.TOKEN_BUDGET_LAB_INTERPRETATION)
+_single_flight = SingleFlight(STRUCTURED_OUTPUT.name)
+
+
+def _compact_lab_results(lab_results_info: str, max_tokens: int) -> str:
+    return compact_lines(lab_results_info, max_tokens, keep=lambda line: line.endswith("[ABNORMAL]"))
+
+
+def _format_prompt(user_input: LabInterpretationInput) -> list:
+    """Build the system and patient messages sent to the model for `interpret_lab_results`."""
     # Format lab results information
     lab_results_parts = []
     for lab in user_input.labResults:
@@ -86,7 +47,7 @@ def interpret_lab_results(user_input: LabInterpretationInput) -> LabInterpretati
     diagnoses_str = ", ".join(user_input.clinicalContext.currentDiagnoses) if user_input.clinicalContext.currentDiagnoses else "None"
     medications_str = ", ".join(user_input.clinicalContext.medications) if user_input.clinicalContext.medications else "None"
     
-    formatted_prompt = lab_interpretation_prompt.format(
+    formatted_prompt = TOKEN_BUDGET.fit(lab_interpretation_prompt, dict(
         patient_id=user_input.patientId,
         lab_results_info=lab_results_info,
         age=user_input.clinicalContext.age,
@@ -94,32 +55,41 @@ def interpret_lab_results(user_input: LabInterpretationInput) -> LabInterpretati
         symptoms=symptoms_str,
         diagnoses=diagnoses_str,
         medications=medications_str,
-        format_instructions=format_instructions
-    )
+        format_instructions=STRUCTURED_OUTPUT.format_instructions
+    ), compactors={"lab_results_info": _compact_lab_results})
+
+    return formatted_prompt
+
+
+def _parse_response(response) -> LabInterpretation:
+    """Parse the model reply for `interpret_lab_results` into LabInterpretation."""
+    return STRUCTURED_OUTPUT.parse(response)
+
 
-    response = llm_model.LLM().invoke(formatted_prompt)
+def interpret_lab_results(user_input: LabInterpretationInput) -> LabInterpretation:
+    """
+    AI-assisted interpretation of lab results in clinical context.
     
-    # Parse the JSON response
-    try:
-        content = response.content.strip()
-        # Remove markdown code blocks if present
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-        
-        data = json.loads(content)
+    Args:
+        user_input: LabInterpretationInput containing patient ID, lab results, and 
+                   clinical context
         
-        # Validate and create LabInterpretation object
-        if isinstance(data, dict):
-            return LabInterpretation(**data)
-        else:
-            raise ValueError(f"Expected JSON object, got {type(data)}")
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to parse JSON response: {str(e)}. Response content: {content[:200]}")
-    except Exception as e:
-        raise ValueError(f"Failed to process lab result interpretation response: {str(e)}")
+    Returns:
+        LabInterpretation object with summary, abnormal findings, suggested follow-up, 
+        and confidence
+    """
+    response = STRUCTURED_OUTPUT.bind(llm_model.LLM()).invoke(_format_prompt(user_input))
+    return _parse_response(response)
+
+
+async def interpret_lab_results_async(user_input: LabInterpretationInput) -> LabInterpretation:
+    """
+    Async variant of `interpret_lab_results` that awaits the model's native async API,
+    so the calling event loop is free while the request is in flight. Identical
+    requests arriving while it is in flight share its model call.
+    """
+    async def compute():
+        response = await STRUCTURED_OUTPUT.bind(llm_model.LLM()).ainvoke(_format_prompt(user_input))
+        return _parse_response(response)
 
+    return await _single_flight.do(_single_flight.make_key(user_input), compute)
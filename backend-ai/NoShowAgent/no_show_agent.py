@@ -1,85 +1,38 @@
 import sys
 import os
-import json
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from Prompts.prompt import no_show_prediction_prompt
 from Configurations.config import llm_model
+from AgentRuntime.structured_output import StructuredOutput
+from AgentRuntime.single_flight import SingleFlight
+from AgentRuntime.token_budget import TokenBudget
 from PydanticModels.model import NoShowPredictionInput, NoShowPrediction
 
 
-def predict_no_show(user_input: NoShowPredictionInput) -> NoShowPrediction:
-    """
-    Predict likelihood of patient missing scheduled appointment.
-    
-    Args:
-        user_input: NoShowPredictionInput containing patient ID, appointment details, 
-                   patient history, demographics, and engagement data
-        
-    Returns:
-        NoShowPrediction object with probability, risk level, contributing factors, 
-        and recommendations
-    """
-    # Create format instructions for NoShowPrediction
-    format_instructions = """
-    You must return a JSON object with the following structure:
-    {
-        "probability": 45,
-        "riskLevel": "moderate",
-        "contributingFactors": [
-            {
-                "factor": "High historical no-show rate (30%)",
-                "weight": 0.35
-            },
-            {
-                "factor": "Long lead time (45 days)",
-                "weight": 0.25
-            },
-            {
-                "factor": "Limited transportation access",
-                "weight": 0.20
-            },
-            {
-                "factor": "Low engagement with reminders",
-                "weight": 0.20
-            }
-        ],
-        "recommendations": [
-            {
-                "action": "Send reminder 24 hours before appointment",
-                "expectedImpact": 20,
-                "effort": "low"
-            },
-            {
-                "action": "Offer telehealth option",
-                "expectedImpact": 25,
-                "effort": "medium"
-            },
-            {
-                "action": "Reschedule to shorter lead time if possible",
-                "expectedImpact": 15,
-                "effort": "low"
-            }
-        ]
-    }
-    
-    Important:
-    - probability is an integer 0-100
-    - riskLevel must be one of: "low", "moderate", "high"
-    - weight for contributing factors is a float 0-1 (should sum to approximately 1.0)
-    - expectedImpact for recommendations is an integer 0-100
-    - effort must be one of: "low", "medium", "high"
-    - Rank contributing factors by weight (highest first)
-    - Rank recommendations by expected impact (highest first)
-    """
-    
+# Reply schema derived from NoShowPrediction; the provider enforces it, the prompt only adds these rules
+STRUCTURED_OUTPUT = StructuredOutput("no_show_prediction", NoShowPrediction, guidance="""
+- probability is an integer 0-100
+- weight for contributing factors is a float 0-1 (should sum to approximately 1.0)
+- expectedImpact for recommendations is an integer 0-100
+- Rank contributing factors by weight (highest first)
+- Rank recommendations by expected impact (highest first)
+""")
+
+
+TOKEN_BUDGET = TokenBudget(STRUCTURED_OUTPUT)
+_single_flight = SingleFlight(STRUCTURED_OUTPUT.name)
+
+
+def _format_prompt(user_input: NoShowPredictionInput) -> list:
+    """Build the system and patient messages sent to the model for `predict_no_show`."""
     # Calculate historical no-show rate
     historical_no_show_rate = 0
     if user_input.patientHistory.totalAppointments > 0:
         historical_no_show_rate = (user_input.patientHistory.missedAppointments / 
                                    user_input.patientHistory.totalAppointments) * 100
     
-    formatted_prompt = no_show_prediction_prompt.format(
+    formatted_prompt = TOKEN_BUDGET.fit(no_show_prediction_prompt, dict(
         patient_id=user_input.patientId,
         appointment_type=user_input.appointmentDetails.type,
         department=user_input.appointmentDetails.department,
@@ -97,32 +50,41 @@ def predict_no_show(user_input: NoShowPredictionInput) -> NoShowPrediction:
         reminders_sent=user_input.engagement.remindersSent,
         responses_to_reminders=user_input.engagement.responsesToReminders,
         portal_active="Yes" if user_input.engagement.portalActive else "No",
-        format_instructions=format_instructions
-    )
+        format_instructions=STRUCTURED_OUTPUT.format_instructions
+    ))
 
-    response = llm_model.LLM().invoke(formatted_prompt)
+    return formatted_prompt
+
+
+def _parse_response(response) -> NoShowPrediction:
+    """Parse the model reply for `predict_no_show` into NoShowPrediction."""
+    return STRUCTURED_OUTPUT.parse(response)
+
+
+def predict_no_show(user_input: NoShowPredictionInput) -> NoShowPrediction:
+    """
+    Predict likelihood of patient missing scheduled appointment.
     
-    # Parse the JSON response
-    try:
-        content = response.content.strip()
-        # Remove markdown code blocks if present
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-        
-        data = json.loads(content)
+    Args:
+        user_input: NoShowPredictionInput containing patient ID, appointment details, 
+                   patient history, demographics, and engagement data
         
-        # Validate and create NoShowPrediction object
-        if isinstance(data, dict):
-            return NoShowPrediction(**data)
-        else:
-            raise ValueError(f"Expected JSON object, got {type(data)}")
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to parse JSON response: {str(e)}. Response content: {content[:200]}")
-    except Exception as e:
-        raise ValueError(f"Failed to process no-show prediction response: {str(e)}")
+    Returns:
+        NoShowPrediction object with probability, risk level, contributing factors, 
+        and recommendations
+    """
+    response = STRUCTURED_OUTPUT.bind(llm_model.LLM()).invoke(_format_prompt(user_input))
+    return _parse_response(response)
+
+
+async def predict_no_show_async(user_input: NoShowPredictionInput) -> NoShowPrediction:
+    """
+    Async variant of `predict_no_show` that awaits the model's native async API,
+    so the calling event loop is free while the request is in flight. Identical
+    requests arriving while it is in flight share its model call.
+    """
+    async def compute():
+        response = await STRUCTURED_OUTPUT.bind(llm_model.LLM()).ainvoke(_format_prompt(user_input))
+        return _parse_response(response)
 
+    return await _single_flight.do(_single_flight.make_key(user_input), compute)
@@ -1,91 +1,29 @@
 import sys
 import os
-import json
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from Prompts.prompt import prescription_support_prompt
 from Configurations.config import llm_model
+from AgentRuntime.structured_output import StructuredOutput
+from AgentRuntime.single_flight import SingleFlight
+from AgentRuntime.token_budget import TokenBudget
 from PydanticModels.model import PrescriptionSupportInput, PrescriptionRecommendation
 
 
-def get_prescription_recommendations(user_input: PrescriptionSupportInput) -> PrescriptionRecommendation:
-    """
-    AI-powered recommendations for optimal medication selection based on diagnosis, 
-    patient factors, and evidence-based guidelines.
-    
-    Args:
-        user_input: PrescriptionSupportInput containing diagnosis, patient factors, 
-                   and optional preferences
-        
-    Returns:
-        PrescriptionRecommendation object with primary recommendations, alternatives, 
-        contraindications, warnings, and drug interactions
-    """
-    # Create format instructions for PrescriptionRecommendation
-    format_instructions = """
-    You must return a JSON object with the following structure:
-    {
-        "primaryRecommendations": [
-            {
-                "medication": "Amoxicillin",
-                "dose": "500 mg",
-                "frequency": "three times daily",
-                "duration": "7-10 days",
-                "route": "oral",
-                "rationale": "First-line treatment for community-acquired pneumonia per IDSA guidelines",
-                "evidenceLevel": "A",
-                "cost": "low",
-                "sideEffects": [
-                    "Diarrhea",
-                    "Nausea",
-                    "Rash"
-                ],
-                "monitoring": [
-                    "Monitor for allergic reactions",
-                    "Assess response to treatment"
-                ]
-            }
-        ],
-        "alternatives": [
-            {
-                "medication": "Azithromycin",
-                "whenToConsider": "If patient has penicillin allergy",
-                "advantages": [
-                    "Once daily dosing",
-                    "Shorter duration (5 days)"
-                ],
-                "disadvantages": [
-                    "Higher cost",
-                    "QT prolongation risk"
-                ]
-            }
-        ],
-        "contraindications": [
-            "Penicillin (if allergic)",
-            "Fluoroquinolones (if <18 years)"
-        ],
-        "warnings": [
-            "Adjust dose for renal impairment",
-            "Monitor liver function with prolonged use"
-        ],
-        "drugInteractions": [
-            {
-                "interaction": "Amoxicillin may reduce effectiveness of oral contraceptives",
-                "severity": "moderate",
-                "management": "Advise additional contraceptive method during treatment"
-            }
-        ]
-    }
-    
-    Important:
-    - evidenceLevel must be one of: "A", "B", "C"
-    - cost must be one of: "low", "medium", "high"
-    - severity for drug interactions must be one of: "low", "moderate", "high"
-    - Rank primary recommendations by evidence level and appropriateness (best first)
-    - Rank alternatives by when to consider (most common scenarios first)
-    - Rank drug interactions by severity (most severe first)
-    """
-    
+# Reply schema derived from PrescriptionRecommendation; the provider enforces it, the prompt only adds these rules
+STRUCTURED_OUTPUT = StructuredOutput("prescription_recommendation", PrescriptionRecommendation, guidance="""
+- Rank primary recommendations by evidence level and appropriateness (best first)
+- Rank alternatives by when to consider (most common scenarios first)
+- Rank drug interactions by severity (most severe first)
+""")
+
+
+TOKEN_BUDGET = TokenBudget(STRUCTURED_OUTPUT)
+_single_flight = SingleFlight(STRUCTURED_OUTPUT.name)
+
+
+def _format_prompt(user_input: PrescriptionSupportInput) -> list:
+    """Build the system and patient messages sent to the model for `get_prescription_recommendations`."""
     # Format optional patient factors
     weight_info = f"Weight: {user_input.patientFactors.weight} kg" if user_input.patientFactors.weight is not None else ""
     
@@ -118,7 +56,7 @@ def get_prescription_recommendations(user_input: PrescriptionSupportInput) -> Pr
     
     preferences_info = "\n".join(preferences_parts) if preferences_parts else "No specific preferences"
     
-    formatted_prompt = prescription_support_prompt.format(
+    formatted_prompt = TOKEN_BUDGET.fit(prescription_support_prompt, dict(
         diagnosis=user_input.diagnosis,
         age=user_input.patientFactors.age,
         weight_info=weight_info,
@@ -129,32 +67,42 @@ def get_prescription_recommendations(user_input: PrescriptionSupportInput) -> Pr
         comorbidities=comorbidities_str,
         pregnancy_info=pregnancy_info,
         preferences_info=preferences_info,
-        format_instructions=format_instructions
-    )
+        format_instructions=STRUCTURED_OUTPUT.format_instructions
+    ))
 
-    response = llm_model.LLM().invoke(formatted_prompt)
+    return formatted_prompt
+
+
+def _parse_response(response) -> PrescriptionRecommendation:
+    """Parse the model reply for `get_prescription_recommendations` into PrescriptionRecommendation."""
+    return STRUCTURED_OUTPUT.parse(response)
+
+
+def get_prescription_recommendations(user_input: PrescriptionSupportInput) -> PrescriptionRecommendation:
+    """
+    AI-powered recommendations for optimal medication selection based on diagnosis, 
+    patient factors, and evidence-based guidelines.
     
-    # Parse the JSON response
-    try:
-        content = response.content.strip()
-        # Remove markdown code blocks if present
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-        
-        data = json.loads(content)
+    Args:
+        user_input: PrescriptionSupportInput containing diagnosis, patient factors, 
+                   and optional preferences
         
-        # Validate and create PrescriptionRecommendation object
-        if isinstance(data, dict):
-            return PrescriptionRecommendation(**data)
-        else:
-            raise ValueError(f"Expected JSON object, got {type(data)}")
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to parse JSON response: {str(e)}. Response content: {content[:200]}")
-    except Exception as e:
-        raise ValueError(f"Failed to process prescription recommendation response: {str(e)}")
+    Returns:
+        PrescriptionRecommendation object with primary recommendations, alternatives, 
+        contraindications, warnings, and drug interactions
+    """
+    response = STRUCTURED_OUTPUT.bind(llm_model.LLM()).invoke(_format_prompt(user_input))
+    return _parse_response(response)
+
+
+async def get_prescription_recommendations_async(user_input: PrescriptionSupportInput) -> PrescriptionRecommendation:
+    """
+    Async variant of `get_prescription_recommendations` that awaits the model's native async API,
+    so the calling event loop is free while the request is in flight. Identical
+    requests arriving while it is in flight share its model call.
+    """
+    async def compute():
+        response = await STRUCTURED_OUTPUT.bind(llm_model.LLM()).ainvoke(_format_prompt(user_input))
+        return _parse_response(response)
 
+    return await _single_flight.do(_single_flight.make_key(user_input), compute)
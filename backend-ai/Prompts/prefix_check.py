@@ -0,0 +1,121 @@
+"""
+Check that every agent's prompt starts with a static, cacheable prefix.
+
+Provider prompt caching only pays off when requests to an agent share their
+leading tokens. For each agent this renders the messages for two different
+generated inputs and fails when:
+- the first message is not a system message, or it differs between the inputs
+- the system template uses a variable other than {format_instructions}
+- the patient message does not change with the input
+
+It also prints the prefix size in tokens (counted like the token budgets):
+the system message plus, in json_schema mode, the response schema the
+provider puts ahead of the messages. Providers only cache prefixes of 1024
+tokens or more.
+
+Usage:
+    python -m Prompts.prefix_check
+"""
+import sys
+import os
+import json
+import importlib
+from typing import List, Literal, Union, get_args, get_origin, get_type_hints
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pydantic import BaseModel
+from Configurations.config import settings
+from AgentRuntime.prompt_usage import MIN_CACHEABLE_PREFIX_TOKENS
+from AgentRuntime.token_budget import count_tokens
+
+
+AGENT_MODULES = [
+    "BookingAgent.book_agent",
+    "DiagnosisAgent.diagnosis_agent",
+    "SummarizationAgent.summarization_agent",
+    "ICD10Agent.icd10_agent",
+    "DrugInteractionAgent.drug_interaction_agent",
+    "GuestBookingAgent.guest_booking_agent",
+    "HealthAnalysisAgent.health_analysis_agent",
+    "VitalsAnomalyAgent.vitals_anomaly_agent",
+    "AdherenceAgent.adherence_agent",
+    "LabInterpretationAgent.lab_interpretation_agent",
+    "ReadmissionAgent.readmission_agent",
+    "PrescriptionAgent.prescription_agent",
+    "NoShowAgent.no_show_agent",
+    "ImagingAgent.imaging_agent",
+]
+
+# Only per-agent constants may be filled into the system message
+STATIC_VARIABLES = {"format_instructions"}
+
+
+def sample_value(annotation, variant: int):
+    """A value of `annotation` that differs between variant 0 and 1 (variant 1 leaves optionals empty)."""
+    origin = get_origin(annotation)
+    if origin is Literal:
+        choices = get_args(annotation)
+        return choices[variant % len(choices)]
+    if origin is Union:
+        args = get_args(annotation)
+        if variant and type(None) in args:
+            return None
+        return sample_value(next(arg for arg in args if arg is not type(None)), variant)
+    if origin in (list, List):
+        return [sample_value(get_args(annotation)[0], variant) for _ in range(variant + 1)]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return {name: sample_value(field.annotation, variant) for name, field in annotation.model_fields.items()}
+    return {str: f"sample text {variant}", int: 3 + variant, float: 1.5 + variant, bool: variant == 0}[annotation]
+
+
+def check_agent(module_name: str) -> dict:
+    """
+    Render one agent's messages for two inputs and check its prefix.
+
+    Returns:
+        Dict with the agent name, prefix and suffix tokens and a list of problems (empty when it passes)
+    """
+    agent = importlib.import_module(module_name)
+    input_type = get_type_hints(agent._format_prompt)["user_input"]
+    first, second = (
+        agent._format_prompt(input_type.model_validate(sample_value(input_type, variant)))
+        for variant in (0, 1)
+    )
+    prompt = next(
+        value for name, value in vars(agent).items()
+        if name.endswith("_prompt") and hasattr(value, "messages")
+    )
+
+    problems = []
+    system_variables = set(prompt.messages[0].input_variables) if len(prompt.messages) > 1 else set()
+    if first[0].type != "system":
+        problems.append(f"first message is {first[0].type!r}, not the static system message")
+    elif first[0].content != second[0].content:
+        problems.append("system message changes with the input")
+    if system_variables - STATIC_VARIABLES:
+        problems.append(f"system template uses request variables {sorted(system_variables - STATIC_VARIABLES)}")
+    if first[-1].content == second[-1].content:
+        problems.append("patient message does not change with the input")
+
+    prefix_tokens = count_tokens(first[0].content)
+    if settings.LLM_STRUCTURED_OUTPUT == "json_schema":
+        prefix_tokens += count_tokens(json.dumps(agent.STRUCTURED_OUTPUT.schema))
+    return {
+        "agent": agent.STRUCTURED_OUTPUT.name,
+        "prefix_tokens": prefix_tokens,
+        "suffix_tokens": count_tokens("".join(message.content for message in first[1:])),
+        "problems": problems,
+    }
+
+
+if __name__ == "__main__":
+    print(f"{'agent':<30} {'prefix tok':>11} {'suffix tok':>11} {'cacheable':>10}  problems")
+    failed = 0
+    for module_name in AGENT_MODULES:
+        result = check_agent(module_name)
+        failed += bool(result["problems"])
+        cacheable = "yes" if result["prefix_tokens"] >= MIN_CACHEABLE_PREFIX_TOKENS else "no"
+        print(f"{result['agent']:<30} {result['prefix_tokens']:>11} {result['suffix_tokens']:>11} {cacheable:>10}  "
+              f"{'; '.join(result['problems']) or '-'}")
+    print(f"{len(AGENT_MODULES) - failed}/{len(AGENT_MODULES)} agents have a stable prefix")
+    sys.exit(1 if failed else 0)
@@ -1,9 +1,16 @@
-from langchain_core.prompts import PromptTemplate
+from langchain_core.prompts import ChatPromptTemplate
+
+
+# Each template is a system message holding only static text (role, rules, response
+# format) followed by a user message carrying the per-request patient data. Providers
+# cache the longest previously seen prompt prefix, so with nothing request-specific
+# ahead of the user message every call to an agent starts with the same cached prefix.
+# Keep patient variables out of the system messages (checked by Prompts/prefix_check.py).
 
 
 # Prompt Template
-appointment_prompt = PromptTemplate.from_template(
-    """
+appointment_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
     You are a medical triage assistant that helps users understand where 
     to go in a hospital.
 
@@ -15,17 +22,18 @@ appointment_prompt = PromptTemplate.from_template(
     - confidence_score (a float between 0 and 1 indicating confidence in the assessment)
     Respond **strictly** in the JSON structure required by this schema:
     {format_instructions}
-
+    """),
+    ("human", """
     User Symptoms:
     {symptoms}
     Description:
     {description}
-    """
-)
+    """),
+])
 
 # Diagnosis Prompt Template
-diagnosis_prompt = PromptTemplate.from_template(
-    """
+diagnosis_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
     You are a medical diagnosis assistant that analyzes patient symptoms and provides 
     possible diagnoses with ICD-10 codes.
 
@@ -42,20 +50,20 @@ diagnosis_prompt = PromptTemplate.from_template(
     - Confidence scores should reflect the likelihood based on the symptoms provided
     - Return at least 2-3 possible diagnoses if applicable
     - Ensure all ICD-10 codes are valid format (e.g., A00.0, J11.1, G43.909)
-    - Return ONLY valid JSON, no markdown code blocks, no additional text
 
-    {format_instructions}
+    Return your response as a JSON object whose "items" array holds the diagnosis objects.
 
+    {format_instructions}
+    """),
+    ("human", """
     Patient Symptoms:
     {symptoms}
-
-    Return your response as a JSON array of diagnosis objects.
-    """
-)
+    """),
+])
 
 # Clinical Notes Summarization Prompt Template
-notes_summarization_prompt = PromptTemplate.from_template(
-    """
+notes_summarization_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
     You are a medical documentation specialist that transforms raw clinical notes into 
     structured, formatted medical documentation following standard medical record formats.
 
@@ -75,20 +83,20 @@ notes_summarization_prompt = PromptTemplate.from_template(
     - Use appropriate medical sections (Chief Complaint, HPI, Vitals, Assessment, Plan, etc.)
     - Preserve all important clinical details
     - Format with clear section headers and line breaks for readability
-    - Return ONLY valid JSON, no markdown code blocks, no additional text
 
-    {format_instructions}
+    Return your response as a JSON object with "summary" (string) and "confidence" (float 0-1).
 
+    {format_instructions}
+    """),
+    ("human", """
     Raw Clinical Notes:
     {notes}
-
-    Return your response as a JSON object with "summary" (string) and "confidence" (float 0-1).
-    """
-)
+    """),
+])
 
 # ICD-10 Code Suggestion Prompt Template
-icd10_suggestion_prompt = PromptTemplate.from_template(
-    """
+icd10_suggestion_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
     You are a medical coding specialist that suggests appropriate ICD-10 diagnosis codes 
     based on clinical diagnosis descriptions.
 
@@ -106,20 +114,20 @@ icd10_suggestion_prompt = PromptTemplate.from_template(
     - Provide 2-5 code suggestions when multiple codes are relevant
     - Ensure all ICD-10 codes are in valid format (e.g., E11.40, J11.1, G43.909)
     - Include the official code description exactly as it appears in ICD-10-CM
-    - Return ONLY valid JSON, no markdown code blocks, no additional text
 
-    {format_instructions}
+    Return your response as a JSON object whose "items" array holds the ICD-10 code suggestion objects.
 
+    {format_instructions}
+    """),
+    ("human", """
     Clinical Diagnosis:
     {diagnosis}
-
-    Return your response as a JSON array of ICD-10 code suggestion objects.
-    """
-)
+    """),
+])
 
 # Drug Interaction Checker Prompt Template
-drug_interaction_prompt = PromptTemplate.from_template(
-    """
+drug_interaction_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
     You are a clinical pharmacist and drug interaction specialist that checks for potential 
     drug interactions when multiple medications are prescribed.
 
@@ -142,21 +150,21 @@ drug_interaction_prompt = PromptTemplate.from_template(
     - Use accurate, evidence-based drug interaction knowledge
     - Prioritize interactions by severity (most severe first)
     - Provide specific, actionable recommendations when available
-    - If no interactions are found, return an empty array
-    - Return ONLY valid JSON, no markdown code blocks, no additional text
+    - If no interactions are found, return an empty "items" array
 
-    {format_instructions}
+    Return your response as a JSON object whose "items" array holds the drug interaction objects.
 
+    {format_instructions}
+    """),
+    ("human", """
     Medications:
     {drugs}
-
-    Return your response as a JSON array of drug interaction objects.
-    """
-)
+    """),
+])
 
 # Guest Booking AI Prediction Prompt Template
-guest_booking_prediction_prompt = PromptTemplate.from_template(
-    """
+guest_booking_prediction_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
     You are a medical triage and prediction assistant that analyzes guest symptoms during 
     booking to predict urgency level, possible conditions, and recommend appropriate 
     department/specialist.
@@ -184,22 +192,22 @@ guest_booking_prediction_prompt = PromptTemplate.from_template(
     - Provide evidence-based possible conditions ranked by likelihood
     - Be specific in department recommendations based on symptoms and history
     - Write a detailed summary that explains the clinical reasoning
-    - Return ONLY valid JSON, no markdown code blocks, no additional text
 
     {format_instructions}
-
+    """),
+    ("human", """
     Patient Information:
     Symptoms: {symptoms}
     Description: {user_description}
     {age_info}
     {gender_info}
     {medical_history_info}
-    """
-)
+    """),
+])
 
 # Comprehensive Health Analysis Prompt Template
-comprehensive_health_analysis_prompt = PromptTemplate.from_template(
-    """
+comprehensive_health_analysis_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
     You are an advanced AI medical analysis engine that provides comprehensive health analysis 
     by combining symptoms, vitals, and medical history to provide detailed clinical insights.
 
@@ -243,10 +251,12 @@ comprehensive_health_analysis_prompt = PromptTemplate.from_template(
     - Rank doctors by match score (highest first)
     - Provide actionable remedies and follow-up recommendations
     - Be specific and evidence-based in all assessments
-    - Return ONLY valid JSON, no markdown code blocks, no additional text
 
-    {format_instructions}
+    Return your response as a JSON object matching the comprehensive health analysis schema.
 
+    {format_instructions}
+    """),
+    ("human", """
     Patient Information:
     Age: {age}
     Gender: {gender}
@@ -257,14 +267,12 @@ comprehensive_health_analysis_prompt = PromptTemplate.from_template(
       - Temperature: {temperature}
       - Oxygen Saturation: {oxygen_sat}
     {medical_history_info}
-
-    Return your response as a JSON object matching the comprehensive health analysis schema.
-    """
-)
+    """),
+])
 
 # Vital Signs Anomaly Detection Prompt Template
-vitals_anomaly_detection_prompt = PromptTemplate.from_template(
-    """
+vitals_anomaly_detection_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
     You are a critical care monitoring system that performs real-time analysis of patient vital 
     signs to detect anomalies and trigger appropriate alerts for patient safety.
 
@@ -316,7 +324,6 @@ vitals_anomaly_detection_prompt = PromptTemplate.from_template(
     - Critical vitals (e.g., SpO2 <90%, severe hypotension) should trigger emergency alerts
     - Consider medication effects (e.g., beta-blockers lower HR, antihypertensives lower BP)
     - Provide specific, actionable recommendations
-    - Return ONLY valid JSON, no markdown code blocks, no additional text
 
     Standard Normal Ranges (use if no baseline):
     - Heart Rate: Adult 60-100 bpm, Pediatric varies by age
@@ -325,8 +332,11 @@ vitals_anomaly_detection_prompt = PromptTemplate.from_template(
     - Oxygen Saturation: ≥95% normal, <90% critical
     - Respiratory Rate: Adult 12-20/min, Pediatric varies by age
 
-    {format_instructions}
+    Return your response as a JSON object matching the vital signs anomaly detection schema.
 
+    {format_instructions}
+    """),
+    ("human", """
     Patient ID: {patient_id}
     Timestamp: {timestamp}
     
@@ -338,14 +348,12 @@ vitals_anomaly_detection_prompt = PromptTemplate.from_template(
     Conditions: {conditions}
     Medications: {medications}
     {baseline_info}
-
-    Return your response as a JSON object matching the vital signs anomaly detection schema.
-    """
-)
+    """),
+])
 
 # Medication Adherence Prediction Prompt Template
-medication_adherence_prompt = PromptTemplate.from_template(
-    """
+medication_adherence_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
     You are a medication adherence prediction specialist that analyzes patient demographics, 
     prescription complexity, and adherence history to predict medication adherence risk and 
     recommend interventions.
@@ -392,10 +400,12 @@ medication_adherence_prompt = PromptTemplate.from_template(
     - Interventions: Provide evidence-based, actionable strategies
       * Prioritize high-impact, feasible interventions
       * Consider patient-specific barriers (cost, complexity, support)
-    - Return ONLY valid JSON, no markdown code blocks, no additional text
 
-    {format_instructions}
+    Return your response as a JSON object matching the adherence prediction schema.
 
+    {format_instructions}
+    """),
+    ("human", """
     Patient ID: {patient_id}
     
     Demographics:
@@ -415,14 +425,12 @@ medication_adherence_prompt = PromptTemplate.from_template(
     Previous Adherence Rate: {previous_adherence}
     Missed Appointments: {missed_appointments}
     Has Support: {has_support}
-
-    Return your response as a JSON object matching the adherence prediction schema.
-    """
-)
+    """),
+])
 
 # Lab Result Interpretation Prompt Template
-lab_interpretation_prompt = PromptTemplate.from_template(
-    """
+lab_interpretation_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
     You are a clinical pathologist and lab result interpretation specialist that provides 
     AI-assisted interpretation of lab results in clinical context.
 
@@ -469,10 +477,12 @@ lab_interpretation_prompt = PromptTemplate.from_template(
     - Consider drug interactions and medication effects on lab values
     - Provide evidence-based interpretations
     - Be specific in recommended actions
-    - Return ONLY valid JSON, no markdown code blocks, no additional text
 
-    {format_instructions}
+    Return your response as a JSON object matching the lab interpretation schema.
 
+    {format_instructions}
+    """),
+    ("human", """
     Patient ID: {patient_id}
     
     Lab Results:
@@ -484,14 +494,12 @@ lab_interpretation_prompt = PromptTemplate.from_template(
     Symptoms: {symptoms}
     Current Diagnoses: {diagnoses}
     Medications: {medications}
-
-    Return your response as a JSON object matching the lab interpretation schema.
-    """
-)
+    """),
+])
 
 # Readmission Risk Prediction Prompt Template
-readmission_risk_prompt = PromptTemplate.from_template(
-    """
+readmission_risk_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
     You are a healthcare analytics specialist that predicts patient readmission risk within 
     30 days of discharge to help prevent avoidable readmissions and improve patient outcomes.
 
@@ -556,10 +564,12 @@ readmission_risk_prompt = PromptTemplate.from_template(
     - Rank interventions by priority and expected impact (highest first)
     - Focus on modifiable risk factors for interventions
     - Provide specific, actionable interventions
-    - Return ONLY valid JSON, no markdown code blocks, no additional text
 
-    {format_instructions}
+    Return your response as a JSON object matching the readmission risk prediction schema.
 
+    {format_instructions}
+    """),
+    ("human", """
     Patient ID: {patient_id}
     
     Demographics:
@@ -580,14 +590,12 @@ readmission_risk_prompt = PromptTemplate.from_template(
     Follow-up Scheduled: {follow_up_scheduled}
     Home Health Ordered: {home_health_ordered}
     Patient Education Provided: {patient_education_provided}
-
-    Return your response as a JSON object matching the readmission risk prediction schema.
-    """
-)
+    """),
+])
 
 # Clinical Decision Support for Prescriptions Prompt Template
-prescription_support_prompt = PromptTemplate.from_template(
-    """
+prescription_support_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
     You are a clinical pharmacist and evidence-based medicine specialist that provides 
     AI-powered recommendations for optimal medication selection based on diagnosis, patient 
     factors, and evidence-based guidelines.
@@ -655,10 +663,12 @@ prescription_support_prompt = PromptTemplate.from_template(
       * Identify all drug interactions
       * Consider contraindications
       * Provide appropriate monitoring recommendations
-    - Return ONLY valid JSON, no markdown code blocks, no additional text
 
-    {format_instructions}
+    Return your response as a JSON object matching the prescription recommendation schema.
 
+    {format_instructions}
+    """),
+    ("human", """
     Diagnosis: {diagnosis}
     
     Patient Factors:
@@ -673,14 +683,12 @@ prescription_support_prompt = PromptTemplate.from_template(
     
     Preferences:
     {preferences_info}
-
-    Return your response as a JSON object matching the prescription recommendation schema.
-    """
-)
+    """),
+])
 
 # Appointment No-Show Prediction Prompt Template
-no_show_prediction_prompt = PromptTemplate.from_template(
-    """
+no_show_prediction_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
     You are a healthcare operations analytics specialist that predicts patient appointment 
     no-show likelihood to help optimize scheduling and reduce missed appointments.
 
@@ -743,10 +751,12 @@ no_show_prediction_prompt = PromptTemplate.from_template(
     - Rank recommendations by expected impact and effort (high impact, low effort first)
     - Provide specific, actionable recommendations
     - Consider cost-effectiveness of interventions
-    - Return ONLY valid JSON, no markdown code blocks, no additional text
 
-    {format_instructions}
+    Return your response as a JSON object matching the no-show prediction schema.
 
+    {format_instructions}
+    """),
+    ("human", """
     Patient ID: {patient_id}
     
     Appointment Details:
@@ -772,16 +782,14 @@ no_show_prediction_prompt = PromptTemplate.from_template(
     Reminders Sent: {reminders_sent}
     Responses to Reminders: {responses_to_reminders}
     Portal Active: {portal_active}
-
-    Return your response as a JSON object matching the no-show prediction schema.
-    """
-)
+    """),
+])
 
 # Medical Imaging Analysis Prompt Template
 # NOTE: Full implementation requires vision-capable AI model (e.g., GPT-4 Vision, specialized medical imaging AI)
 # This prompt template is designed for future enhancement with proper vision model integration
-imaging_analysis_prompt = PromptTemplate.from_template(
-    """
+imaging_analysis_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
     You are a radiologist and medical imaging analysis specialist that provides AI-assisted 
     analysis of medical images (X-rays, CT scans, MRI, Ultrasound).
 
@@ -797,7 +805,7 @@ imaging_analysis_prompt = PromptTemplate.from_template(
          * "moderate": Notable abnormality requiring attention
          * "severe": Significant abnormality requiring immediate attention
        - confidence: Float 0-1 indicating confidence in this finding
-       - coordinates: Optional bounding box coordinates {x, y, width, height} if location 
+       - coordinates: Optional bounding box coordinates {{x, y, width, height}} if location 
                      can be specified (normalized 0-1 coordinates)
 
     2. IMPRESSION: Comprehensive radiological impression summarizing all findings in standard 
@@ -840,7 +848,6 @@ imaging_analysis_prompt = PromptTemplate.from_template(
     - Critical Findings:
       * Identify findings requiring immediate attention
       * Examples: pneumothorax, acute stroke, acute fracture, acute appendicitis
-    - Return ONLY valid JSON, no markdown code blocks, no additional text
 
     NOTE: This is a text-based analysis. Full implementation requires:
     - Vision-capable AI model (GPT-4 Vision, specialized medical imaging AI)
@@ -848,8 +855,11 @@ imaging_analysis_prompt = PromptTemplate.from_template(
     - Regulatory approval for medical imaging AI
     - Integration with PACS (Picture Archiving and Communication System)
 
-    {format_instructions}
+    Return your response as a JSON object matching the imaging analysis schema.
 
+    {format_instructions}
+    """),
+    ("human", """
     Image Type: {image_type}
     Image URL: {image_url}
     Body Part: {body_part}
@@ -857,7 +867,5 @@ imaging_analysis_prompt = PromptTemplate.from_template(
     Patient Age: {patient_age}
     Patient Gender: {patient_gender}
     {prior_findings_info}
-
-    Return your response as a JSON object matching the imaging analysis schema.
-    """
-)
\ No newline at end of file
+    """),
+])
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Literal, Optional, Union
 from datetime import datetime
 from uuid import UUID
@@ -413,4 +413,34 @@ class ImagingAnalysis(BaseModel):
     recommendations: List[str]
     comparison: Optional[str] = None  # If prior images available
     criticalFindings: bool
-    radiologistReviewRequired: bool
\ No newline at end of file
+    radiologistReviewRequired: bool
+
+# Vitals ML Prediction Models
+class VitalsReading(BaseModel):
+    # NaN / Infinity never reach the models; binary WS frames are checked the same way
+    model_config = ConfigDict(allow_inf_nan=False)
+
+    heart_rate: float
+    resp_rate: float
+    blood_pressure_systolic: float
+    blood_pressure_diastolic: float
+    spo2: float
+    temperature_c: float
+    glucose_mgdl: float
+
+class VitalsPredictionConfidence(BaseModel):
+    label_status: float  # 0-100
+    probable_condition: float  # 0-100
+
+class VitalsPrediction(BaseModel):
+    label_status: str
+    probable_condition: str
+    confidence: VitalsPredictionConfidence
+
+class VitalsBatchPrediction(BaseModel):
+    count: int
+    predictions: List[VitalsPrediction]
+
+# Vitals model registry
+class ModelActivationInput(BaseModel):
+    version: str
@@ -1,13 +1,42 @@
 import sys
 import os
-import json
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from Prompts.prompt import notes_summarization_prompt
-from Configurations.config import llm_model
+from Configurations.config import llm_model, settings
+from AgentRuntime.structured_output import StructuredOutput
+from AgentRuntime.single_flight import SingleFlight
+from AgentRuntime.token_budget import TokenBudget, truncate_text
 from PydanticModels.model import NotesSummarizationInput, SummarizedNotes
 
 
+# Reply schema derived from SummarizedNotes; the provider enforces it, the prompt only adds these rules
+STRUCTURED_OUTPUT = StructuredOutput("summarized_notes", SummarizedNotes, guidance="""
+- summary is the structured medical summary, sections separated by line breaks
+- confidence is a float 0-1
+""")
+
+
+# Notes are free text of any length: oversized notes lose their middle, keeping the opening and the plan
+TOKEN_BUDGET = TokenBudget(STRUCTURED_OUTPUT, settings.TOKEN_BUDGET_SUMMARIZATION)
+_single_flight = SingleFlight(STRUCTURED_OUTPUT.name)
+
+
+def _format_prompt(user_input: NotesSummarizationInput) -> list:
+    """Build the system and patient messages sent to the model for `summarize_notes`."""
+    formatted_prompt = TOKEN_BUDGET.fit(notes_summarization_prompt, dict(
+        notes=user_input.notes,
+        format_instructions=STRUCTURED_OUTPUT.format_instructions
+    ), compactors={"notes": truncate_text})
+
+    return formatted_prompt
+
+
+def _parse_response(response) -> SummarizedNotes:
+    """Parse the model reply for `summarize_notes` into SummarizedNotes."""
+    return STRUCTURED_OUTPUT.parse(response)
+
+
 def summarize_notes(user_input: NotesSummarizationInput) -> SummarizedNotes:
     """
     Transform raw clinical notes into structured, formatted medical documentation.
@@ -18,47 +47,18 @@ def summarize_notes(user_input: NotesSummarizationInput) -> SummarizedNotes:
     Returns:
         SummarizedNotes object with structured summary and confidence score
     """
-    # Create format instructions for SummarizedNotes
-    format_instructions = """
-    You must return a JSON object with:
-    - summary: string (the structured medical summary in standard medical format)
-    - confidence: float (a value between 0.0 and 1.0 indicating confidence in the summarization)
-    
-    Example format:
-    {
-        "summary": "Chief Complaint: Chest pain radiating to left arm\\n\\nHPI: Patient reports acute chest pain onset 2 hours prior to presentation. Pain radiates to left arm. Positive history of hypertension.\\n\\nVitals: BP 165/98, HR 92\\n\\nAssessment: Rule out acute coronary syndrome\\n\\nPlan: EKG, Troponin levels, Cardiology consult",
-        "confidence": 0.91
-    }
-    """
-    
-    formatted_prompt = notes_summarization_prompt.format(
-        notes=user_input.notes,
-        format_instructions=format_instructions
-    )
+    response = STRUCTURED_OUTPUT.bind(llm_model.LLM()).invoke(_format_prompt(user_input))
+    return _parse_response(response)
 
-    response = llm_model.LLM().invoke(formatted_prompt)
-    
-    # Parse the JSON response
-    try:
-        content = response.content.strip()
-        # Remove markdown code blocks if present
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-        
-        data = json.loads(content)
-        
-        # Validate and create SummarizedNotes object
-        if isinstance(data, dict):
-            return SummarizedNotes(**data)
-        else:
-            raise ValueError(f"Expected JSON object, got {type(data)}")
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to parse JSON response: {str(e)}. Response content: {content[:200]}")
-    except Exception as e:
-        raise ValueError(f"Failed to process summarization response: {str(e)}")
 
+async def summarize_notes_async(user_input: NotesSummarizationInput) -> SummarizedNotes:
+    """
+    Async variant of `summarize_notes` that awaits the model's native async API,
+    so the calling event loop is free while the request is in flight. Identical
+    requests arriving while it is in flight share its model call.
+    """
+    async def compute():
+        response = await STRUCTURED_OUTPUT.bind(llm_model.LLM()).ainvoke(_format_prompt(user_input))
+        return _parse_response(response)
+
+    return await _single_flight.do(_single_flight.make_key(user_input), compute)
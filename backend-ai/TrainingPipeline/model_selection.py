@@ -0,0 +1,195 @@
+"""
+Compare candidate vitals models on accuracy, per-row latency and size.
+
+The labels are threshold rules over a few vitals, so much smaller models
+than the default 100 unbounded trees may be just as accurate. Every
+candidate is fitted on the same training split and measured the way it
+would be served:
+
+- accuracy: test-set accuracy and macro F1 of both outputs
+- latency: median single-reading VitalsPredictor.predict call, and per-row
+  time in a 10k-row batch; tree models run on the compiled flat ensemble
+  (what serving uses), the others through sklearn
+- size: bytes of the artifact serving loads (flat model for tree models,
+  pickle otherwise), plus the pickle size
+
+Candidates no other candidate beats on all three (accuracy, latency and
+size) are marked as Pareto-optimal. With --promote, the fastest candidate
+whose accuracy on both outputs meets --accuracy-floor is registered as a
+new model registry version (activated with --activate).
+
+Usage:
+    python -m TrainingPipeline.model_selection
+    python -m TrainingPipeline.model_selection --data Datasets/vitals_1m.parquet --max-rows 200000
+    python -m TrainingPipeline.model_selection --promote --accuracy-floor 0.99 --activate
+"""
+import sys
+import os
+import json
+import time
+import argparse
+import tempfile
+import statistics
+from datetime import datetime, timezone
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.multioutput import MultiOutputClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+from TrainingPipeline.train import load_xy, split, _score
+from Vitals.inference import VitalsPredictor, FEATURE_NAMES
+from Vitals.flat_forest import export_flat_model, load_flat_model, supports_flat_export
+from Vitals.model_registry import ModelRegistry
+
+
+# Candidate name -> estimator factory (seed -> unfitted classifier for one output)
+CANDIDATES = {
+    "forest 100 (current)": lambda seed: RandomForestClassifier(n_estimators=100, random_state=seed),
+    "forest 50, depth 12": lambda seed: RandomForestClassifier(n_estimators=50, max_depth=12, random_state=seed),
+    "forest 20, depth 8": lambda seed: RandomForestClassifier(n_estimators=20, max_depth=8, random_state=seed),
+    "forest 10, depth 6": lambda seed: RandomForestClassifier(n_estimators=10, max_depth=6, random_state=seed),
+    "decision tree": lambda seed: DecisionTreeClassifier(random_state=seed),
+    "decision tree, depth 8": lambda seed: DecisionTreeClassifier(max_depth=8, random_state=seed),
+    "gradient boosting": lambda seed: HistGradientBoostingClassifier(random_state=seed),
+    "logistic regression": lambda seed: LogisticRegression(max_iter=2000, random_state=seed),
+}
+
+
+def _median_seconds(function, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def evaluate_candidate(name, clf, scaler, le_status, le_condition, X_test, y_test, workdir, repeats) -> dict:
+    """Accuracy, serving latency and artifact size of one fitted candidate."""
+    pickle_path = os.path.join(workdir, f"{len(os.listdir(workdir))}.pkl")
+    joblib.dump(clf, pickle_path)
+    result = {
+        "name": name,
+        **{key: round(value, 4) for key, value in _score(y_test, clf.predict(scaler.transform(X_test))).items()},
+        "pickle_bytes": os.path.getsize(pickle_path),
+        "flat_bytes": None,
+    }
+    if supports_flat_export(clf):
+        flat_path = pickle_path[:-4] + ".joblib"
+        export_flat_model(clf, scaler, le_status, le_condition, flat_path)
+        result["flat_bytes"] = os.path.getsize(flat_path)
+        predictor = VitalsPredictor.from_flat(load_flat_model(flat_path, mmap_mode="r"))
+    else:
+        predictor = VitalsPredictor.from_sklearn(clf, scaler, le_status, le_condition)
+    result["backend"] = predictor.backend
+    result["serving_bytes"] = result["flat_bytes"] or result["pickle_bytes"]
+
+    raw = X_test.to_numpy(dtype=np.float64)
+    batch = np.resize(raw, (10000, len(FEATURE_NAMES)))
+    result["single_row_ms"] = round(_median_seconds(lambda: predictor.predict(raw[:1]), repeats) * 1000, 4)
+    result["batch_row_us"] = round(_median_seconds(lambda: predictor.predict(batch), 3) / len(batch) * 1e6, 3)
+    return result
+
+
+def mark_pareto(results: list):
+    """Flag candidates not dominated on (score up, single-row latency down, serving size down)."""
+    for result in results:
+        result["pareto"] = not any(
+            other["score"] >= result["score"]
+            and other["single_row_ms"] <= result["single_row_ms"]
+            and other["serving_bytes"] <= result["serving_bytes"]
+            and (other["score"], other["single_row_ms"], other["serving_bytes"])
+            != (result["score"], result["single_row_ms"], result["serving_bytes"])
+            for other in results
+        )
+
+
+def choose(results: list, accuracy_floor: float) -> dict | None:
+    """Fastest single-row candidate whose status and condition accuracy both meet the floor."""
+    eligible = [
+        result for result in results
+        if min(result["status_accuracy"], result["condition_accuracy"]) >= accuracy_floor
+    ]
+    return min(eligible, key=lambda r: (r["single_row_ms"], r["serving_bytes"])) if eligible else None
+
+
+def print_report(results: list, chosen: dict | None, accuracy_floor: float):
+    print(f"{'candidate':<24} {'status acc':>10} {'cond acc':>9} {'score':>7} {'1 row ms':>9} "
+          f"{'batch us/row':>12} {'serving KB':>11} {'pickle KB':>10} {'backend':>8}")
+    for r in sorted(results, key=lambda r: r["single_row_ms"]):
+        flags = ("  pareto" if r["pareto"] else "") + ("  <- chosen" if chosen is r else "")
+        print(f"{r['name']:<24} {r['status_accuracy']:>10.4f} {r['condition_accuracy']:>9.4f} {r['score']:>7.4f} "
+              f"{r['single_row_ms']:>9.3f} {r['batch_row_us']:>12.2f} {r['serving_bytes'] / 1024:>11.0f} "
+              f"{r['pickle_bytes'] / 1024:>10.0f} {r['backend']:>8}{flags}")
+    if chosen is None:
+        print(f"\nNo candidate reaches accuracy {accuracy_floor} on both outputs")
+    else:
+        print(f"\nFastest candidate with accuracy >= {accuracy_floor} on both outputs: {chosen['name']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accuracy vs latency vs size report for candidate vitals models.")
+    parser.add_argument("--data", default="Datasets/vitals.csv", help="Dataset file (.csv, .parquet or .feather)")
+    parser.add_argument("--max-rows", type=int, default=None, help="Stratified sample of the dataset to use")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeats", type=int, default=200, help="Single-row calls timed per candidate")
+    parser.add_argument("--accuracy-floor", type=float, default=0.97,
+                        help="Minimum test accuracy of both outputs for the chosen model")
+    parser.add_argument("--promote", action="store_true", help="Register the chosen model as a new registry version")
+    parser.add_argument("--activate", action="store_true", help="With --promote: make it the active version")
+    parser.add_argument("--version", default=datetime.now().strftime("v%Y%m%d-%H%M%S"))
+    parser.add_argument("--registry", default=None, help="Registry directory (default: settings.VITALS_REGISTRY_DIR)")
+    parser.add_argument("--report", default=None, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    X, y, le_status, le_condition = load_xy(args.data)
+    if args.max_rows and len(X) > args.max_rows:
+        X, _, y, _ = split(X, y, 1 - args.max_rows / len(X), args.seed)
+    X_train, X_test, y_train, y_test = split(X, y, args.test_size, args.seed)
+    scaler = StandardScaler().fit(X_train)
+    X_train_scaled = scaler.transform(X_train)
+
+    fitted, results = {}, []
+    with tempfile.TemporaryDirectory(prefix="vitals-candidates-") as workdir:
+        for name, factory in CANDIDATES.items():
+            started = time.perf_counter()
+            clf = MultiOutputClassifier(factory(args.seed)).fit(X_train_scaled, y_train)
+            fit_seconds = time.perf_counter() - started
+            result = evaluate_candidate(name, clf, scaler, le_status, le_condition, X_test, y_test, workdir, args.repeats)
+            result["fit_seconds"] = round(fit_seconds, 3)
+            fitted[name] = clf
+            results.append(result)
+            print(f"Evaluated {name} ({fit_seconds:.1f} s fit)", file=sys.stderr)
+
+    mark_pareto(results)
+    chosen = choose(results, args.accuracy_floor)
+    print_report(results, chosen, args.accuracy_floor)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "arguments": vars(args),
+        "dataset": {"path": args.data, "rows": int(len(X)), "train_rows": int(len(X_train)), "test_rows": int(len(X_test))},
+        "candidates": results,
+        "chosen": chosen["name"] if chosen else None,
+    }
+    # Written before promoting, so a run that registers nothing still leaves its report
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+            handle.write("\n")
+    if args.promote:
+        if chosen is None:
+            sys.exit(1)
+        metrics = {"test_rows": int(len(y_test)), **{
+            key: chosen[key] for key in ("status_accuracy", "status_macro_f1", "condition_accuracy", "condition_macro_f1")
+        }}
+        ModelRegistry(args.registry).register(
+            args.version, fitted[chosen["name"]], scaler, le_status, le_condition,
+            metrics=metrics, features=FEATURE_NAMES, activate=args.activate, report=report,
+        )
+        print(f"Registered {chosen['name']} as model version {args.version}" + (" (active)" if args.activate else ""))
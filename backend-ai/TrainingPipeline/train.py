@@ -0,0 +1,281 @@
+"""
+Train the vitals model and register it as a new model registry version.
+
+Steps (each timed in the report):
+1. Load the dataset (CSV, Parquet or Feather; see DataGenerator/dataset_io.py)
+2. Stratified train/test split
+3. Cross-validated search over forest size and depth. Every (candidate,
+   fold) fit is a job on a process pool, each fitting a single-threaded
+   forest; on large datasets the search runs on a stratified sample of
+   the training set (--search-rows)
+4. Final fit of the best candidate on the whole training set, with the
+   forest's trees built in parallel (--n-jobs)
+5. Test-set evaluation, then registration of the bundle (pickles, flat
+   model and training_report.json) with Vitals.model_registry
+
+Everything random is seeded (--seed), so the same data and arguments give
+the same model. With --time-budget, search jobs still queued when the
+budget is spent are cancelled and the best fully evaluated candidate wins;
+--max-samples caps the rows each tree is grown on, which bounds the final
+fit on very large datasets.
+
+Usage:
+    python -m TrainingPipeline.train
+    python -m TrainingPipeline.train --data Datasets/vitals_10m.parquet --search-rows 200000 --max-samples 500000 --time-budget 900
+    python -m TrainingPipeline.train --n-estimators 50,100 --max-depth 8,none --activate
+"""
+import sys
+import os
+import json
+import time
+import argparse
+import platform
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, classification_report, f1_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.multioutput import MultiOutputClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from DataGenerator.dataset_io import read_dataset
+from Vitals.inference import FEATURE_NAMES
+from Vitals.model_registry import ModelRegistry
+
+
+TARGETS = ["label_status", "probable_condition"]
+
+# Search data of a process-pool worker, set once by the pool initializer
+_search_data = None
+
+
+def _init_search_worker(features, targets, folds):
+    global _search_data
+    _search_data = (features, targets, folds)
+
+
+def _fit_forest(params: dict, seed: int, n_jobs: int = 1) -> MultiOutputClassifier:
+    return MultiOutputClassifier(RandomForestClassifier(**params, random_state=seed, n_jobs=n_jobs))
+
+
+def _score(targets: np.ndarray, predicted: np.ndarray) -> dict:
+    """Accuracy and macro F1 per output; "score" (the search objective) is their mean over both outputs."""
+    scores = {}
+    for column, name in enumerate(("status", "condition")):
+        scores[f"{name}_accuracy"] = float(accuracy_score(targets[:, column], predicted[:, column]))
+        scores[f"{name}_macro_f1"] = float(f1_score(targets[:, column], predicted[:, column], average="macro"))
+    scores["score"] = float(np.mean(list(scores.values())))
+    return scores
+
+
+def _evaluate_fold(params: dict, fold: int, seed: int) -> dict:
+    """Fit one candidate on one CV fold (in a pool worker). Trees do not need scaled features."""
+    features, targets, folds = _search_data
+    train_index, validation_index = folds[fold]
+    started = time.perf_counter()
+    clf = _fit_forest(params, seed).fit(features[train_index], targets[train_index])
+    fit_seconds = time.perf_counter() - started
+    scores = _score(targets[validation_index], clf.predict(features[validation_index]))
+    return {**scores, "fit_seconds": fit_seconds}
+
+
+def parse_grid(values: str, allow_none: bool = False) -> list:
+    """"50,100,none" -> [50, 100, None]."""
+    grid = []
+    for value in values.split(","):
+        value = value.strip().lower()
+        grid.append(None if allow_none and value == "none" else int(value))
+    return grid
+
+
+def search(features, targets, candidates, cv: int, workers: int, seed: int, deadline: float | None) -> list:
+    """
+    Cross-validate every candidate on a process pool.
+
+    Returns:
+        One result per candidate (params, per-fold scores, mean/std score and fit time),
+        with "complete" False for candidates whose folds were cancelled by the deadline
+    """
+    folds = list(StratifiedKFold(n_splits=cv, shuffle=True, random_state=seed).split(features, targets[:, 0]))
+    results = [{"params": params, "folds": []} for params in candidates]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_search_worker,
+                             initargs=(features, targets, folds)) as pool:
+        pending = {
+            pool.submit(_evaluate_fold, params, fold, seed): index
+            for index, params in enumerate(candidates) for fold in range(cv)
+        }
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # Budget spent: drop queued jobs, keep what already finished
+                for future in pending:
+                    future.cancel()
+                break
+            for future in done:
+                results[pending.pop(future)]["folds"].append(future.result())
+
+    for result in results:
+        fold_scores = [fold["score"] for fold in result["folds"]]
+        result["complete"] = len(fold_scores) == cv
+        result["mean_score"] = float(np.mean(fold_scores)) if fold_scores else None
+        result["std_score"] = float(np.std(fold_scores)) if fold_scores else None
+        result["fit_seconds"] = float(sum(fold["fit_seconds"] for fold in result["folds"]))
+    return results
+
+
+def load_xy(path: str):
+    """
+    Features and encoded targets of a dataset file.
+
+    Returns:
+        (X DataFrame of FEATURE_NAMES, y array of shape (n, 2) with the encoded
+        label_status and probable_condition, le_status, le_condition)
+    """
+    df = read_dataset(path, columns=FEATURE_NAMES + TARGETS)
+    le_status, le_condition = LabelEncoder(), LabelEncoder()
+    y = np.column_stack([
+        le_status.fit_transform(np.asarray(df["label_status"], dtype=str)),
+        le_condition.fit_transform(np.asarray(df["probable_condition"], dtype=str)),
+    ])
+    return df[FEATURE_NAMES], y, le_status, le_condition
+
+
+def split(X, y, test_size: float, seed: int):
+    """Seeded train/test split, stratified on label_status."""
+    return train_test_split(X, y, test_size=test_size, random_state=seed, stratify=y[:, 0])
+
+
+def _model_size(params: dict) -> tuple:
+    """Sort key preferring fewer, shallower trees."""
+    return (params["n_estimators"], params["max_depth"] if params["max_depth"] is not None else float("inf"))
+
+
+def best_candidate(results: list) -> dict:
+    """Highest mean CV score; ties (within 1e-4) go to the smaller forest."""
+    complete = [result for result in results if result["complete"]]
+    if not complete:
+        raise RuntimeError("No candidate finished cross-validation within the time budget")
+    top = max(result["mean_score"] for result in complete)
+    return min((r for r in complete if r["mean_score"] >= top - 1e-4), key=lambda r: _model_size(r["params"]))
+
+
+def train(args) -> dict:
+    """Run the pipeline and register the model; returns the training report."""
+    started = time.perf_counter()
+    deadline = started + args.time_budget if args.time_budget else None
+    timings = {}
+
+    def lap(name, since):
+        timings[name] = round(time.perf_counter() - since, 3)
+        return time.perf_counter()
+
+    # 1. Load
+    step = time.perf_counter()
+    X, y, le_status, le_condition = load_xy(args.data)
+    step = lap("load_seconds", step)
+
+    # 2. Split
+    X_train, X_test, y_train, y_test = split(X, y, args.test_size, args.seed)
+    scaler = StandardScaler().fit(X_train)
+    step = lap("split_seconds", step)
+
+    # 3. Search (on a stratified sample for large training sets)
+    search_X, search_y = X_train.to_numpy(dtype=np.float32), y_train
+    if args.search_rows and len(search_X) > args.search_rows:
+        search_X, _, search_y, _ = train_test_split(
+            search_X, search_y, train_size=args.search_rows, random_state=args.seed, stratify=search_y[:, 0]
+        )
+    candidates = [
+        {"n_estimators": n_estimators, "max_depth": max_depth, "max_samples": args.max_samples}
+        for n_estimators in args.n_estimators for max_depth in args.max_depth
+    ]
+    results = search(search_X, search_y, candidates, args.cv, args.search_workers, args.seed, deadline)
+    best = best_candidate(results)
+    step = lap("search_seconds", step)
+
+    # 4. Final fit on the whole training set
+    clf = _fit_forest(best["params"], args.seed, n_jobs=args.n_jobs).fit(scaler.transform(X_train), y_train)
+    step = lap("final_fit_seconds", step)
+
+    # 5. Evaluate
+    y_pred = clf.predict(scaler.transform(X_test))
+    test_scores = _score(y_test, y_pred)
+    reports = {
+        "label_status": classification_report(y_test[:, 0], y_pred[:, 0], target_names=le_status.classes_, output_dict=True),
+        "probable_condition": classification_report(y_test[:, 1], y_pred[:, 1], target_names=le_condition.classes_, output_dict=True),
+    }
+    step = lap("evaluate_seconds", step)
+
+    # Served single-threaded: the saved forests must not start a thread pool per call
+    for forest in clf.estimators_:
+        forest.set_params(n_jobs=None)
+    metrics = {"test_rows": int(len(y_test)), **{k: round(v, 4) for k, v in test_scores.items() if k != "score"}}
+    report = {
+        "version": args.version,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "arguments": {key: value for key, value in vars(args).items()},
+        "dataset": {"path": args.data, "rows": int(len(X)), "train_rows": int(len(X_train)),
+                    "test_rows": int(len(X_test)), "search_rows": int(len(search_X))},
+        "environment": {"python": platform.python_version(), "sklearn": sklearn.__version__,
+                        "cpu_count": os.cpu_count()},
+        "search": {"best_params": best["params"], "cv": args.cv, "candidates": results},
+        "test": {"metrics": metrics, "classification_reports": reports},
+        "timings": timings,
+    }
+    if deadline is not None:
+        report["time_budget"] = {"seconds": args.time_budget,
+                                 "candidates_skipped": sum(not r["complete"] for r in results)}
+    registry = ModelRegistry(args.registry)
+    registry.register(args.version, clf, scaler, le_status, le_condition, metrics=metrics,
+                      features=FEATURE_NAMES, activate=args.activate, report=report)
+    timings["register_seconds"] = round(time.perf_counter() - step, 3)
+    timings["total_seconds"] = round(time.perf_counter() - started, 3)
+    # The bundle's copy was written before registration finished; keep the full timings in the returned report
+    return report
+
+
+def print_report(report: dict):
+    """Human-readable summary for CI logs."""
+    print(f"Model version {report['version']} ({report['dataset']['rows']} rows from {report['dataset']['path']})")
+    print(f"\n{'n_estimators':>12} {'max_depth':>9} {'cv score':>9} {'std':>7} {'fit s':>7}")
+    for result in sorted(report["search"]["candidates"], key=lambda r: -(r["mean_score"] or 0)):
+        params = result["params"]
+        score = f"{result['mean_score']:.4f}" if result["mean_score"] is not None else "-"
+        std = f"{result['std_score']:.4f}" if result["std_score"] is not None else "-"
+        marker = "  <- best" if params == report["search"]["best_params"] else ("" if result["complete"] else "  (cut by time budget)")
+        print(f"{params['n_estimators']:>12} {str(params['max_depth']):>9} {score:>9} {std:>7} {result['fit_seconds']:>7.1f}{marker}")
+    print("\nTest metrics: " + ", ".join(f"{key}={value}" for key, value in report["test"]["metrics"].items()))
+    print("Timings: " + ", ".join(f"{key}={value}" for key, value in report["timings"].items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the vitals model and register it in the model registry.")
+    parser.add_argument("--data", default="Datasets/vitals.csv", help="Dataset file (.csv, .parquet or .feather)")
+    parser.add_argument("--version", default=datetime.now().strftime("v%Y%m%d-%H%M%S"), help="Registry version name")
+    parser.add_argument("--activate", action="store_true", help="Make the new version the active one")
+    parser.add_argument("--registry", default=None, help="Registry directory (default: settings.VITALS_REGISTRY_DIR)")
+    parser.add_argument("--n-estimators", type=parse_grid, default=[50, 100, 200], help="Comma-separated forest sizes")
+    parser.add_argument("--max-depth", type=lambda value: parse_grid(value, allow_none=True), default=[8, 16, None],
+                        help="Comma-separated depths; 'none' for unlimited")
+    parser.add_argument("--cv", type=int, default=3, help="Cross-validation folds")
+    parser.add_argument("--search-rows", type=int, default=200_000, help="Training rows sampled for the search (0: all)")
+    parser.add_argument("--search-workers", type=int, default=os.cpu_count(), help="Processes for the search")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Threads building the final forest")
+    parser.add_argument("--max-samples", type=lambda value: float(value) if "." in value else int(value), default=None,
+                        help="Rows (int) or fraction (float) bootstrapped per tree; bounds fit time on large datasets")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--time-budget", type=float, default=None, help="Seconds; cancels search jobs still queued after it")
+    parser.add_argument("--report", default=None, help="Also write the JSON report here (e.g. a CI artifact)")
+    args = parser.parse_args()
+
+    report = train(args)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+            handle.write("\n")
@@ -0,0 +1,77 @@
+"""
+Check the compiled flat ensemble against sklearn and time both.
+
+Parity is checked on the bundled dataset and on random readings spanning
+(and exceeding) the physiological ranges; the script exits with status 1 on
+any label mismatch. Timings cover single-row calls (the /ws/predict hot
+path) and a 10k-row batch.
+
+Usage:
+    python -m Vitals.benchmark_flat_forest
+    python -m Vitals.benchmark_flat_forest --random-rows 100000 --repeats 500
+    python -m Vitals.benchmark_flat_forest --version v2
+"""
+import sys
+import os
+import time
+import argparse
+import statistics
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import joblib
+import numpy as np
+import pandas as pd
+from Vitals.model_registry import ModelRegistry
+from Vitals.inference import VitalsPredictor, FEATURE_NAMES
+from Vitals.flat_forest import load_flat_model, check_parity
+
+
+# Uniform sampling ranges per feature, wider than the training data
+RANDOM_RANGES = [(30, 200), (5, 45), (70, 220), (40, 140), (70, 100), (33, 42), (40, 400)]
+
+
+def _timed(function, repeats: int):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parity check and microbenchmark for the flat vitals ensemble.")
+    parser.add_argument("--random-rows", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=200, help="Single-row calls timed per backend")
+    parser.add_argument("--version", help="Registry version (default: the active one)")
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    version = args.version or registry.active_version()
+    clf = joblib.load(registry.bundle_path(version, "model"))
+    scaler = joblib.load(registry.bundle_path(version, "scaler"))
+    le_status = joblib.load(registry.bundle_path(version, "status_encoder"))
+    le_condition = joblib.load(registry.bundle_path(version, "condition_encoder"))
+    arrays = load_flat_model(registry.bundle_path(version, "flat_model"))
+    print(f"Model version {version}")
+
+    dataset = pd.read_csv("Datasets/vitals.csv")[FEATURE_NAMES].to_numpy(dtype=np.float64)
+    rng = np.random.default_rng(42)
+    random_readings = np.column_stack([rng.uniform(low, high, args.random_rows) for low, high in RANDOM_RANGES])
+
+    failed = False
+    for name, readings in (("dataset", dataset), ("random", random_readings)):
+        report = check_parity(clf, arrays, readings)
+        print(f"Parity ({name}): {report}")
+        failed |= report["status_label_mismatches"] > 0 or report["condition_label_mismatches"] > 0
+
+    sklearn_predictor = VitalsPredictor.from_sklearn(clf, scaler, le_status, le_condition)
+    flat_predictor = VitalsPredictor.from_flat(arrays)
+    batch = random_readings[:10000]
+    print(f"{'backend':<8} {'single row (median)':>20} {'10k rows':>10}")
+    for predictor in (sklearn_predictor, flat_predictor):
+        single = _timed(lambda: predictor.predict(dataset[:1]), args.repeats)
+        bulk = _timed(lambda: predictor.predict(batch), 3)
+        print(f"{predictor.backend:<8} {single * 1000:>17.3f} ms {bulk:>8.3f} s")
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,122 @@
+"""
+Measure what folding the StandardScaler into the model saves per reading.
+
+Times one reading and a 10k-row batch through each serving path:
+
+- sklearn + DataFrame: the original per-reading path (build a DataFrame,
+  scaler.transform, then the forests)
+- sklearn: scaler applied with NumPy, then the forests
+- flat, scaled: the flat ensemble with thresholds in scaled units (rescale and
+  float32 cast per call)
+- flat, folded: the exported flat ensemble, thresholds in raw units
+
+and the two transforms folding removes on their own.
+
+Parity of the folded ensemble is also checked on readings placed exactly on,
+and one ulp either side of, every folded threshold; the script exits with
+status 1 on any label mismatch.
+
+Usage:
+    python -m Vitals.benchmark_scaler_folding
+    python -m Vitals.benchmark_scaler_folding --version v2 --repeats 500
+"""
+import sys
+import os
+import argparse
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import joblib
+import numpy as np
+import pandas as pd
+from Vitals.model_registry import ModelRegistry
+from Vitals.inference import VitalsPredictor, FEATURE_NAMES
+from Vitals.flat_forest import FlatEnsemble, load_flat_model, check_parity, _flatten_forests
+from Vitals.benchmark_flat_forest import RANDOM_RANGES, _timed
+
+
+def boundary_readings(arrays: dict, base: np.ndarray) -> np.ndarray:
+    """`base` with one feature set to each split threshold, and to its neighbouring floats."""
+    feature = np.asarray(arrays["feature"])
+    threshold = np.asarray(arrays["threshold"])
+    split = np.asarray(arrays["children"])[0::2] != np.arange(len(feature))
+    feature, threshold = feature[split], threshold[split]
+    readings = np.tile(base, (3 * len(feature), 1))
+    rows = np.arange(len(feature))
+    for block, values in enumerate((np.nextafter(threshold, -np.inf), threshold, np.nextafter(threshold, np.inf))):
+        readings[rows + block * len(feature), feature] = values
+    return readings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-row latency saved by folding the scaler into the vitals model.")
+    parser.add_argument("--repeats", type=int, default=100, help="Single-row calls timed per path and round (median)")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--version", help="Registry version (default: the active one)")
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    version = args.version or registry.active_version()
+    clf = joblib.load(registry.bundle_path(version, "model"))
+    scaler = joblib.load(registry.bundle_path(version, "scaler"))
+    le_status = joblib.load(registry.bundle_path(version, "status_encoder"))
+    le_condition = joblib.load(registry.bundle_path(version, "condition_encoder"))
+    arrays = load_flat_model(registry.bundle_path(version, "flat_model"))
+    print(f"Model version {version}")
+
+    dataset = pd.read_csv("Datasets/vitals.csv")[FEATURE_NAMES].to_numpy(dtype=np.float64)
+    report = check_parity(clf, arrays, boundary_readings(arrays, dataset[:1]))
+    print(f"Parity (on folded thresholds): {report}")
+    failed = report["status_label_mismatches"] > 0 or report["condition_label_mismatches"] > 0
+
+    # The same ensemble with thresholds left in scaled units
+    scaled_ensemble = FlatEnsemble({**arrays, **_flatten_forests(clf.estimators_)})
+    sklearn_predictor = VitalsPredictor.from_sklearn(clf, scaler, le_status, le_condition)
+    folded_predictor = VitalsPredictor.from_flat(arrays)
+    scaled_predictor = VitalsPredictor(
+        lambda scaled: scaled_ensemble.predict_proba(scaled.astype(np.float32)),
+        arrays["scaler_mean"], arrays["scaler_scale"],
+        folded_predictor._status_labels, folded_predictor._condition_labels,
+        backend="flat",
+    )
+
+    def dataframe_path(features):
+        frame = pd.DataFrame(features, columns=FEATURE_NAMES)
+        return clf.predict_proba(scaler.transform(frame))
+
+    rng = np.random.default_rng(42)
+    batch = np.column_stack([rng.uniform(low, high, 10000) for low, high in RANDOM_RANGES])
+    one = dataset[:1]
+    paths = [
+        ("sklearn + DataFrame", dataframe_path),
+        ("sklearn", sklearn_predictor.predict),
+        ("flat, scaled", scaled_predictor.predict),
+        ("flat, folded", folded_predictor.predict),
+    ]
+
+    # Paths are timed in interleaved rounds and the best round is kept, so
+    # background noise does not land on one path only
+    best = {name: [float("inf"), float("inf")] for name, _ in paths}
+    for _ in range(args.rounds):
+        for name, predict in paths:
+            best[name][0] = min(best[name][0], _timed(lambda: predict(one), args.repeats))
+            best[name][1] = min(best[name][1], _timed(lambda: predict(batch), 1) / len(batch))
+
+    print(f"{'path':<20} {'single row':>14} {'10k rows, per row':>18}")
+    for name, (single, per_row) in best.items():
+        print(f"{name:<20} {single * 1e6:>11.1f} us {per_row * 1e6:>15.2f} us")
+    timings = best
+
+    # The per-call work folding removes, on its own
+    transforms = [
+        ("DataFrame + scaler.transform", lambda: scaler.transform(pd.DataFrame(one, columns=FEATURE_NAMES))),
+        ("NumPy rescale + float32 cast", lambda: scaled_predictor.scale(one).astype(np.float32)),
+    ]
+    for name, transform in transforms:
+        print(f"{name:<30} {min(_timed(transform, args.repeats * 10) for _ in range(args.rounds)) * 1e6:>8.1f} us per reading")
+
+    saved_single = timings["flat, scaled"][0] - timings["flat, folded"][0]
+    saved_row = timings["flat, scaled"][1] - timings["flat, folded"][1]
+    print(f"Folding saves {saved_single * 1e6:.1f} us per single-reading call and {saved_row * 1e6:.2f} us "
+          f"per row in batches ({saved_single / timings['flat, scaled'][0]:.0%} / {saved_row / timings['flat, scaled'][1]:.0%})")
+
+    sys.exit(1 if failed else 0)
@@ -1,46 +1,363 @@
-from fastapi import WebSocket
-import joblib, time, random, asyncio
-import pandas as pd
+from fastapi import WebSocket, WebSocketDisconnect
+import os, time, random, asyncio, threading
+import numpy as np
+from operator import attrgetter
+from pydantic import TypeAdapter, ValidationError
+from typing import List
 from Configurations.config import settings
+from PydanticModels.model import VitalsReading
+from Vitals.inference import VitalsPredictor, VitalsPredictions, FEATURE_NAMES
+from Vitals.scheduler import InferenceScheduler
+from Vitals.executor import InferenceExecutor
+from Vitals.model_registry import ModelRegistry, rss_kb
+from Vitals.rule_engine import RuleEngine, RuleRouter
+from AgentRuntime.lazy_loading import timed_load
 
 
 # ----------------------------
 # Load trained model & objects
 # ----------------------------
-# Paths to saved model & preprocessing
-if settings.DEPLOYMENT == "local":
-    model_path = r"C:\Users\TechWatt\Desktop\techwatt\backend-ai\Models\multioutput_model.pkl"
-    scaler_path = r"C:\Users\TechWatt\Desktop\techwatt\backend-ai\Models\scaler.pkl"
-    status_encoder_path = r"C:\Users\TechWatt\Desktop\techwatt\backend-ai\Models\label_encoder_status.pkl"
-    condition_encoder_path = r"C:\Users\TechWatt\Desktop\techwatt\backend-ai\Models\label_encoder_condition.pkl"
-
-else:
-    model_path = "Models/multioutput_model.pkl"
-    scaler_path = "Models/scaler.pkl"
-    status_encoder_path = "Models/label_encoder_status.pkl"
-    condition_encoder_path = "Models/label_encoder_condition.pkl"
-
-
-# Load the trained model and preprocessing objects
-clf = joblib.load(model_path)
-scaler = joblib.load(scaler_path)
-le_status = joblib.load(status_encoder_path)
-le_condition = joblib.load(condition_encoder_path)
-
-# Feature names used during training
-FEATURE_NAMES = [
-    "heart_rate",
-    "resp_rate",
-    "blood_pressure_systolic",
-    "blood_pressure_diastolic",
-    "spo2",
-    "temperature_c",
-    "glucose_mgdl"
-]
+# Model bundles are versioned in the registry (Models/registry); manifest.json names the active one
+registry = ModelRegistry()
+
+# The active model is loaded on first use, so importing this module (and
+# starting the app) does not pay for it. Afterwards each worker re-reads the
+# manifest at most every VITALS_REGISTRY_POLL_SECONDS and swaps in a newly
+# activated version; until the new one has loaded, the old one keeps serving.
+_predictor = None
+_predictor_version = None
+_predictor_lock = threading.Lock()
+_next_check = 0.0
+_version_stats = {}   # version -> load time, memory and error of each load in this worker
+
+# Typical resting reading in FEATURE_NAMES order
+_PROBE_READING = [80, 16, 120, 80, 98, 36.8, 95]
+
+
+def get_predictor(trigger: str = "first use") -> VitalsPredictor:
+    """
+    Predictor for the active model version, loading or swapping it when needed.
+
+    Also used to load the model in process-pool inference workers.
+    """
+    global _next_check
+    if _predictor is not None and time.monotonic() < _next_check:
+        return _predictor
+    if _predictor is None:
+        with _predictor_lock:
+            if _predictor is None:
+                _refresh(trigger)
+    elif _predictor_lock.acquire(blocking=False):
+        # One thread checks the manifest; the others carry on with the current model
+        try:
+            _refresh("manifest poll")
+        finally:
+            _predictor_lock.release()
+    return _predictor
+
+
+def activate_version(version: str, trigger: str = "admin activate") -> dict:
+    """
+    Load `version` in this worker, then make it the active version for every worker.
+
+    The manifest is only written once the bundle's checksums match and it has
+    loaded and scored a probe reading here, so a broken version never becomes
+    active and this worker keeps serving the previous one.
+
+    Returns:
+        This worker's model stats
+
+    Raises:
+        UnknownModelVersion, FileNotFoundError, ModelBundleError: From ModelRegistry.verify
+        Exception: Whatever loading or probing the bundle raised
+    """
+    global _predictor, _predictor_version, _next_check
+    loaded = []
+    with _predictor_lock:
+        registry.activate(version, preload=lambda name: loaded.append(_load_version(name, trigger)))
+        _next_check = time.monotonic() + settings.VITALS_REGISTRY_POLL_SECONDS
+        _predictor, _predictor_version = loaded[0], version
+    return model_versions_stats()
+
+
+def _refresh(trigger: str):
+    """Load the active version if it is not the one being served (caller holds _predictor_lock)."""
+    global _predictor, _predictor_version, _next_check
+    _next_check = time.monotonic() + settings.VITALS_REGISTRY_POLL_SECONDS
+    try:
+        version = registry.active_version()
+    except (OSError, ValueError) as e:
+        if _predictor is None:
+            raise
+        print(f"Could not read the model manifest, keeping version {_predictor_version}: {e}")
+        return
+    if version == _predictor_version:
+        return
+    try:
+        predictor = _load_version(version, trigger)
+    except Exception as e:
+        if _predictor is None:
+            raise
+        print(f"Could not load model version {version}, keeping version {_predictor_version}: {e}")
+        return
+    # A single reference swap: in-flight batches finish on the predictor they started with
+    _predictor, _predictor_version = predictor, version
+
+
+def _load_version(version: str, trigger: str) -> VitalsPredictor:
+    """Load a version and score a probe reading with it, recording its load stats (or error)."""
+    stats = {"trigger": trigger, "format": settings.VITALS_MODEL_FORMAT}
+    rss_before = rss_kb()
+    started = time.perf_counter()
+    try:
+        with timed_load(f"vitals_model:{version}", trigger):
+            predictor = registry.load(version, settings.VITALS_MODEL_FORMAT)
+            # Score one reading so a broken bundle is rejected before it is swapped in
+            predictor.predict(np.asarray([_PROBE_READING], dtype=np.float64))
+    except Exception as e:
+        stats["error"] = f"{type(e).__name__}: {e}"
+        _version_stats[version] = stats
+        raise
+
+    rss_after = rss_kb()
+    stats.update({
+        "backend": predictor.backend,
+        "load_seconds": round(time.perf_counter() - started, 4),
+        "rss_delta_mb": round((rss_after - rss_before) / 1024, 1) if rss_before is not None else None,
+        "rss_after_mb": round(rss_after / 1024, 1) if rss_after is not None else None,
+        "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    })
+    _version_stats[version] = stats
+    return predictor
+
+
+def model_versions_stats() -> dict:
+    """Version served by this worker and load stats of every version it has loaded."""
+    return {
+        "serving_version": _predictor_version,
+        "pid": os.getpid(),
+        "versions": {version: dict(stats) for version, stats in _version_stats.items()},
+    }
+
+
+# Inference runs here, never on the event loop
+executor = InferenceExecutor(
+    get_predictor,
+    mode=settings.VITALS_INFERENCE_EXECUTOR,
+    workers=settings.VITALS_INFERENCE_WORKERS,
+    max_pending=settings.VITALS_INFERENCE_MAX_PENDING,
+)
+
+# Shared by all /ws/predict sockets of this worker
+scheduler = InferenceScheduler(
+    executor,
+    window_ms=settings.VITALS_BATCH_WINDOW_MS,
+    max_batch=settings.VITALS_BATCH_MAX_ROWS,
+)
+
+# Threshold rules in front of the model (settings.VITALS_RULES_MODE); the ruleset is checked at import
+rule_router = RuleRouter(
+    RuleEngine.from_file(settings.VITALS_RULES_PATH) if settings.VITALS_RULES_MODE != "off" else None,
+    mode=settings.VITALS_RULES_MODE,
+    audit_rate=settings.VITALS_RULES_AUDIT_RATE,
+)
+
+_readings_adapter = TypeAdapter(List[VitalsReading])
+_reading_values = attrgetter(*FEATURE_NAMES)
+
+
+def max_readings(body: bytes) -> int:
+    """
+    Upper bound on the readings in a batch body (JSON array or NDJSON), without parsing it.
+
+    Readings are flat JSON objects, so each one opens exactly one "{".
+    """
+    return body.count(b"{")
+
+
+def parse_readings(body: bytes, ndjson: bool = False) -> np.ndarray:
+    """
+    Validate a batch of readings and pack them into a float matrix.
+
+    Args:
+        body: A JSON array of reading objects, or one JSON object per line (NDJSON)
+        ndjson: Whether `body` is NDJSON
+
+    Returns:
+        Array of shape (n_readings, len(FEATURE_NAMES)) in training column order
+
+    Raises:
+        pydantic.ValidationError: If any reading is malformed
+    """
+    if ndjson:
+        # Join the lines into one array so the whole batch is validated in a single call
+        lines = [line for line in body.splitlines() if line.strip()]
+        body = b"[" + b",".join(lines) + b"]"
+    readings = _readings_adapter.validate_json(body)
+    return np.array([_reading_values(reading) for reading in readings], dtype=np.float64).reshape(-1, len(FEATURE_NAMES))
+
+
+async def _model_predict(features: np.ndarray) -> VitalsPredictions:
+    if settings.VITALS_MICRO_BATCHING:
+        return await scheduler.submit(features)
+    return await executor.run(features)
+
+
+async def predict_async(features: np.ndarray, model_predict=None) -> VitalsPredictions:
+    """
+    Score readings without blocking the event loop.
+
+    The rule router decides which readings the threshold rules label and which
+    go to the model; rule evaluation is a few vectorized comparisons, cheap
+    enough to stay on the event loop.
+
+    Args:
+        features: Array of shape (n_readings, len(FEATURE_NAMES))
+        model_predict: Async callable for the readings the model scores; defaults to
+            the micro-batching scheduler (or the executor when batching is off)
+
+    Returns:
+        VitalsPredictions for the readings
+    """
+    return await rule_router.predict(features, model_predict or _model_predict)
+
+
+# Binary frames carry readings as little-endian float32 values in FEATURE_NAMES order
+BINARY_READING_DTYPE = np.dtype("<f4")
+BINARY_READING_SIZE = BINARY_READING_DTYPE.itemsize * len(FEATURE_NAMES)
+
+# Counters for every /ws/predict socket in this worker
+_stream_stats = {
+    "open_sockets": 0,
+    "frames_received": 0,
+    "readings_scored": 0,
+    "frames_rejected": 0,
+    "frames_dropped": 0,
+}
+
+
+def decode_frame(message: dict) -> np.ndarray:
+    """
+    Decode one WebSocket frame into a float matrix of readings.
+
+    Args:
+        message: Raw ASGI receive message; text frames hold a JSON reading object or
+            array of readings, binary frames hold packed float32 readings
+
+    Returns:
+        Array of shape (n_readings, len(FEATURE_NAMES))
+
+    Raises:
+        ValueError: If the frame is malformed or holds too many readings
+    """
+    if message.get("bytes") is not None:
+        data = message["bytes"]
+        if not data or len(data) % BINARY_READING_SIZE:
+            raise ValueError(f"Binary frames must hold a multiple of {BINARY_READING_SIZE} bytes "
+                             f"({len(FEATURE_NAMES)} little-endian float32 values per reading)")
+        features = np.frombuffer(data, dtype=BINARY_READING_DTYPE).reshape(-1, len(FEATURE_NAMES)).astype(np.float64)
+        if not np.isfinite(features).all():
+            raise ValueError("Binary readings must be finite numbers")
+    else:
+        text = (message.get("text") or "").strip()
+        if text.startswith("{"):
+            text = f"[{text}]"
+        try:
+            features = parse_readings(text.encode("utf-8"))
+        except ValidationError as e:
+            raise ValueError(f"Invalid reading: {e.errors(include_url=False)[0]['msg']}")
+        if len(features) == 0:
+            raise ValueError("Frame holds no readings")
+
+    if len(features) > settings.VITALS_WS_MAX_READINGS_PER_FRAME:
+        raise ValueError(f"Frame holds {len(features)} readings; the limit is {settings.VITALS_WS_MAX_READINGS_PER_FRAME}")
+    return features
+
+
+async def _receive_frames(websocket: WebSocket, queue: asyncio.Queue):
+    """Read frames from the client into the socket's bounded queue until it disconnects."""
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            _stream_stats["frames_received"] += 1
+            try:
+                item = decode_frame(message)
+            except ValueError as e:
+                _stream_stats["frames_rejected"] += 1
+                item = str(e)
+
+            if queue.full() and settings.VITALS_WS_DROP_OLDEST:
+                # Live monitoring prefers fresh readings over a growing backlog
+                queue.get_nowait()
+                _stream_stats["frames_dropped"] += 1
+            # Otherwise wait for room: we stop reading, so the client is slowed down by TCP flow control
+            await queue.put(item)
+    finally:
+        # Tell the sender to stop; replies to a gone client cannot be delivered anyway
+        while queue.full():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+
+def _reading_message(timestamp: str, values: list, prediction: dict) -> dict:
+    return {
+        "timestamp": timestamp,
+        "data": dict(zip(FEATURE_NAMES, values)),
+        "prediction": prediction,
+    }
 
 
 async def sensor_data_stream(websocket: WebSocket):
-    """Continuously send random patient vitals and ML predictions."""
+    """
+    Score readings pushed by a bedside device and stream predictions back.
+
+    Each frame gets one reply: a prediction message for a single reading, a JSON
+    array of them for a multi-reading frame, or {"error": ...} for a bad frame.
+    Frames wait in a bounded per-socket queue; when the client reads replies
+    slower than it sends readings, sends block, the queue fills and the socket
+    stops being read, so memory per socket stays bounded.
+    """
+    await websocket.accept()
+    _stream_stats["open_sockets"] += 1
+    queue = asyncio.Queue(maxsize=settings.VITALS_WS_QUEUE_SIZE)
+    reader = asyncio.create_task(_receive_frames(websocket, queue))
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            if isinstance(item, str):
+                await websocket.send_json({"error": item})
+                continue
+
+            predictions = (await predict_async(item)).to_records()
+            _stream_stats["readings_scored"] += len(predictions)
+            timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+            messages = [
+                _reading_message(timestamp, values, prediction)
+                for values, prediction in zip(np.round(item, 2).tolist(), predictions)
+            ]
+            await websocket.send_json(messages[0] if len(messages) == 1 else messages)
+
+    except (WebSocketDisconnect, asyncio.CancelledError):
+        pass
+    except Exception as e:
+        print(f"Unexpected error in sensor_data_stream: {e}")
+        await websocket.close()
+    finally:
+        reader.cancel()
+        _stream_stats["open_sockets"] -= 1
+
+
+def stream_stats() -> dict:
+    """Counters for the /ws/predict sockets of this worker."""
+    return dict(_stream_stats)
+
+
+async def simulated_data_stream(websocket: WebSocket):
+    """Continuously send random patient vitals and ML predictions (demo mode)."""
     await websocket.accept()
     try:
         while True:
@@ -55,32 +372,15 @@ async def sensor_data_stream(websocket: WebSocket):
                 "glucose_mgdl": random.randint(60, 200),
             }
 
-            # Convert to DataFrame with correct feature names
-            new_data_df = pd.DataFrame([new_data], columns=FEATURE_NAMES)
-
-            # Scale features
-            new_data_scaled = scaler.transform(new_data_df)
-
-            # Predict both label_status & probable_condition
-            pred = clf.predict(new_data_scaled)
-            
-            # Decode predictions
-            status_pred = le_status.inverse_transform([pred[0][0]])[0]
-            condition_pred = le_condition.inverse_transform([pred[0][1]])[0]
-           
+            # One forest evaluation gives both labels and their confidences
+            features = np.array([[new_data[name] for name in FEATURE_NAMES]], dtype=np.float64)
+            prediction = (await predict_async(features)).to_records()[0]
 
             # Build message
             message = {
                 "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
                 "data": new_data,
-                "prediction": {
-                    "label_status": status_pred,
-                    "probable_condition": condition_pred,
-                    "confidence": {
-                        "label_status": round(max(clf.predict_proba(new_data_scaled)[0][0]), 2) * 100,
-                        "probable_condition": round(max(clf.predict_proba(new_data_scaled)[1][0]), 2) * 100
-                    }
-                }
+                "prediction": prediction
             }
 
             # Send prediction to client
@@ -92,6 +392,6 @@ async def sensor_data_stream(websocket: WebSocket):
     except asyncio.CancelledError:
         await websocket.close()
     except Exception as e:
-        print(f"Unexpected error in sensor_data_stream: {e}")
+        print(f"Unexpected error in simulated_data_stream: {e}")
         await websocket.close()
 
@@ -0,0 +1,128 @@
+import sys
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from Vitals.inference import VitalsPredictions
+
+
+# Predictor loader of a process-pool worker, set by the pool initializer
+_worker_loader = None
+
+
+def _init_worker(loader):
+    global _worker_loader
+    _worker_loader = loader
+    loader()
+
+
+def _predict_with(loader, features: np.ndarray) -> VitalsPredictions:
+    # Runs on a pool thread: the first model load, registry polls and hot swaps happen here, not on the loop
+    return loader().predict(features)
+
+
+def _worker_predict(features: np.ndarray) -> VitalsPredictions:
+    # The loader is asked on every job so workers pick up a newly activated model version
+    return _worker_loader().predict(features)
+
+
+class InferenceExecutor:
+    """
+    Runs vitals inference outside the event loop.
+
+    - "thread" mode scores on a small thread pool. The tree traversal in
+      sklearn runs without the GIL, so the loop keeps serving sockets and
+      HTTP requests while a batch is being scored.
+    - "process" mode scores in worker processes that each load the model
+      (via `loader`, which must be picklable and cheap once loaded, since it
+      is called for every job); use it for models heavy enough that even the
+      GIL-holding parts of inference matter.
+
+    At most `max_pending` jobs are queued or running; further callers wait
+    for a slot, so a burst of readings backs up as awaiting coroutines
+    instead of an unbounded executor queue.
+    """
+
+    def __init__(self, loader, mode: str = "thread", workers: int = 2, max_pending: int = 8):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown inference executor mode: {mode}")
+        self._loader = loader
+        self.mode = mode
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pool = None
+        self._semaphore = None
+        self._semaphore_loop = None
+
+        self.in_flight = 0
+        self.completed = 0
+        self.run_seconds = 0.0
+        self.slot_wait_seconds = 0.0
+
+    def _executor(self):
+        if self._pool is None:
+            if self.mode == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_init_worker, initargs=(self._loader,)
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="vitals-inference")
+        return self._pool
+
+    def slots(self) -> asyncio.Semaphore:
+        """Bounded-queue semaphore for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def acquire(self):
+        """Wait for a free slot; pair with `release` when the job is finished."""
+        started = time.perf_counter()
+        await self.slots().acquire()
+        self.slot_wait_seconds += time.perf_counter() - started
+
+    def release(self):
+        self._semaphore.release()
+
+    async def predict(self, features: np.ndarray) -> VitalsPredictions:
+        """Score `features` on the executor; the caller must hold a slot."""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        self.in_flight += 1
+        try:
+            if self.mode == "process":
+                return await loop.run_in_executor(self._executor(), _worker_predict, features)
+            return await loop.run_in_executor(self._executor(), _predict_with, self._loader, features)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.run_seconds += time.perf_counter() - started
+
+    async def run(self, features: np.ndarray) -> VitalsPredictions:
+        """Wait for a slot, then score `features` on the executor."""
+        await self.acquire()
+        try:
+            return await self.predict(features)
+        finally:
+            self.release()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "avg_run_ms": round(self.run_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+            "total_slot_wait_ms": round(self.slot_wait_seconds * 1000, 3),
+        }
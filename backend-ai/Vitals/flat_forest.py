@@ -0,0 +1,290 @@
+"""
+Flat-array export of the vitals model for memory-mapped loading.
+
+sklearn's tree objects copy their node arrays into private memory when they
+are unpickled, so every worker ends up with its own copy of the forest. This
+module compiles the trees of both outputs (and the scaler and label lookups)
+into one set of contiguous NumPy arrays in an uncompressed joblib file;
+the scaler is folded into the split thresholds, so the ensemble reads raw
+vitals directly and serving does no per-request rescaling;
+`joblib.load(path, mmap_mode="r")` maps them straight from the page cache, so
+all workers on a host share one copy, and serving the model does not import
+sklearn at all. `FlatEnsemble` walks the trees of both outputs in a single
+vectorized pass.
+
+New registry versions are exported automatically by ModelRegistry.register;
+the CLI re-exports an existing bundle after a format change (a bundle's
+flat model is derived from its pickles, so this does not change its
+predictions). Live workers memory-map the bundle's current flat model, so
+the re-export is registered as a new version copying the bundle
+(ModelRegistry.derive); activating it hot-swaps workers onto the new file.
+Until then, a bundle whose flat model has an older format is served from
+its pickles.
+
+Usage:
+    python -m Vitals.flat_forest                        # active version -> <version>-flat<format>
+    python -m Vitals.flat_forest --version v1 --new-version v1.1 --activate
+    python -m Vitals.flat_forest --version v1 --output other.joblib
+"""
+import sys
+import os
+import argparse
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import joblib
+import numpy as np
+
+
+FLAT_MODEL_FORMAT_VERSION = 3
+OUTPUTS = ("status", "condition")
+
+
+class FlatModelFormatError(ValueError):
+    """A flat model file was exported in a format this code does not read."""
+
+
+def _fold_scaler(thresholds: np.ndarray, features: np.ndarray, mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """
+    Thresholds in raw units equivalent to sklearn's split test on scaled features.
+
+    sklearn sends a reading left when float32((x - mean) / scale) <= threshold.
+    That test is monotone in x, so it is equivalent to x <= r for the largest
+    float64 r that passes it. The float32 rounding puts the boundary at the
+    midpoint above the largest float32 <= threshold; r starts at that midpoint
+    mapped back to raw units and is nudged by single ulps onto the boundary,
+    so the folded ensemble takes exactly the same paths as the original.
+    """
+    mean, scale = mean[features], scale[features]
+
+    def goes_left(raw):
+        return ((raw - mean) / scale).astype(np.float32) <= thresholds
+
+    below = thresholds.astype(np.float32)
+    below = np.where(below > thresholds, np.nextafter(below, np.float32(-np.inf)), below)
+    midpoint = (below.astype(np.float64) + np.nextafter(below, np.float32(np.inf)).astype(np.float64)) / 2
+    raw = midpoint * scale + mean
+    for _ in range(64):
+        too_high = ~goes_left(raw)
+        step_up = ~too_high & goes_left(np.nextafter(raw, np.inf))
+        if not (too_high.any() or step_up.any()):
+            return raw
+        raw = np.where(too_high, np.nextafter(raw, -np.inf), np.where(step_up, np.nextafter(raw, np.inf), raw))
+    raise ValueError("Could not fold the scaler into the split thresholds")
+
+
+def _trees(estimator) -> list:
+    """Decision trees of a forest, or the estimator itself if it is a single tree."""
+    return estimator.estimators_ if hasattr(estimator, "estimators_") else [estimator]
+
+
+def supports_flat_export(clf) -> bool:
+    """Whether every output of a MultiOutputClassifier is a tree ensemble (or tree) that can be compiled."""
+    from sklearn.tree import DecisionTreeClassifier
+    from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier
+
+    return all(
+        isinstance(estimator, (RandomForestClassifier, ExtraTreesClassifier, DecisionTreeClassifier))
+        for estimator in getattr(clf, "estimators_", [])
+    ) and len(getattr(clf, "estimators_", [])) == len(OUTPUTS)
+
+
+def _flatten_forests(forests, scaler=None) -> dict:
+    """
+    Concatenate every tree of the fitted forests into global node arrays.
+
+    Children are interleaved as children[2 * node + went_right]. Leaves point
+    to themselves (with feature 0), so a traversal can take the same step for
+    every node without branching on leaves. Leaf class fractions are padded
+    to the widest output so all nodes share one value matrix. With `scaler`,
+    thresholds are converted to raw feature units.
+    """
+    n_columns = max(len(forest.classes_) for forest in forests)
+    features, thresholds, children, values, roots, depths = [], [], [], [], [], []
+    offset = 0
+    for forest in forests:
+        for estimator in _trees(forest):
+            tree = estimator.tree_
+            ids = np.arange(offset, offset + tree.node_count, dtype=np.int32)
+            leaf = tree.children_left < 0
+            roots.append(offset)
+            depths.append(tree.max_depth)
+            feature = np.where(leaf, 0, tree.feature).astype(np.int32)
+            threshold = tree.threshold.astype(np.float64)
+            if scaler is not None:
+                threshold = np.where(leaf, threshold, _fold_scaler(
+                    threshold, feature, np.asarray(scaler.mean_, dtype=np.float64), np.asarray(scaler.scale_, dtype=np.float64)))
+            features.append(feature)
+            thresholds.append(threshold)
+            pairs = np.empty((tree.node_count, 2), dtype=np.int32)
+            pairs[:, 0] = np.where(leaf, ids, tree.children_left + offset)
+            pairs[:, 1] = np.where(leaf, ids, tree.children_right + offset)
+            children.append(pairs.ravel())
+            value = np.zeros((tree.node_count, n_columns), dtype=np.float64)
+            fractions = tree.value[:, 0, :]
+            value[:, :fractions.shape[1]] = fractions / fractions.sum(axis=1, keepdims=True)
+            values.append(value)
+            offset += tree.node_count
+    return {
+        "feature": np.concatenate(features),
+        "threshold": np.concatenate(thresholds),
+        "children": np.concatenate(children),
+        "value": np.concatenate(values),
+        "roots": np.array(roots, dtype=np.int32),
+        "max_depth": np.int32(max(depths)),
+    }
+
+
+def export_flat_model(clf, scaler, le_status, le_condition, path: str) -> dict:
+    """
+    Write the model (with the scaler folded into its thresholds) and label lookups as flat arrays.
+
+    Args:
+        clf: Fitted MultiOutputClassifier of random forests, extra-trees or single decision
+            trees (status, condition); see supports_flat_export
+        scaler: Fitted StandardScaler
+        le_status / le_condition: Fitted LabelEncoders for the two outputs
+        path: Output file; written uncompressed so it can be memory-mapped
+
+    Returns:
+        Dict with the tree and node counts of the compiled ensemble
+    """
+    encoders = {"status": le_status, "condition": le_condition}
+    arrays = {
+        "format_version": np.int32(FLAT_MODEL_FORMAT_VERSION),
+        # Kept for reference and parity checks; serving does not rescale
+        "scaler_mean": np.asarray(scaler.mean_, dtype=np.float64),
+        "scaler_scale": np.asarray(scaler.scale_, dtype=np.float64),
+    }
+    arrays.update(_flatten_forests(clf.estimators_, scaler))
+    first_tree = 0
+    for name, forest in zip(OUTPUTS, clf.estimators_):
+        # Trees [first, last) of the ensemble belong to this output
+        n_trees = len(_trees(forest))
+        arrays[f"{name}_trees"] = np.array([first_tree, first_tree + n_trees], dtype=np.int32)
+        first_tree += n_trees
+        # Probability column -> label string; fixed-width unicode so it can be mapped too
+        labels = encoders[name].classes_[forest.classes_.astype(int)]
+        arrays[f"{name}_labels"] = np.asarray(labels, dtype=str)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    joblib.dump(arrays, path, compress=0)
+    return {"trees": int(len(arrays["roots"])), "nodes": int(len(arrays["feature"]))}
+
+
+class FlatEnsemble:
+    """
+    Vectorized traversal of the compiled ensemble, both outputs at once.
+
+    Every (row, tree) pair advances one level per step with a handful of
+    array gathers; pairs that reach a leaf are retired so later, deeper
+    levels only touch the paths still descending.
+    """
+
+    def __init__(self, arrays: dict):
+        self.feature = np.asarray(arrays["feature"])
+        self.threshold = np.asarray(arrays["threshold"])
+        self.children = np.asarray(arrays["children"])
+        self.value = np.asarray(arrays["value"])
+        self.roots = np.asarray(arrays["roots"])
+        self.max_depth = int(arrays["max_depth"])
+        self.n_trees = len(self.roots)
+        self._is_leaf = self.children[0::2] == np.arange(len(self.feature), dtype=np.int32)
+        self.labels = {name: np.asarray(arrays[f"{name}_labels"]) for name in OUTPUTS}
+        # (tree slice, class count) per output
+        self.outputs = [
+            (slice(*(int(i) for i in arrays[f"{name}_trees"])), len(self.labels[name]))
+            for name in OUTPUTS
+        ]
+
+    def leaves(self, features: np.ndarray) -> np.ndarray:
+        """Leaf node id reached in every tree for raw float64 readings, shape (n_rows, n_trees)."""
+        n_rows, n_features = features.shape
+        flat_features = np.ascontiguousarray(features, dtype=np.float64).ravel()
+        # A root that is already a leaf (max_depth 0) is its own answer
+        leaves = np.tile(self.roots, n_rows)
+        node = leaves.copy()
+        position = np.arange(n_rows * self.n_trees)
+        row_offset = (position // self.n_trees) * n_features
+        for _ in range(self.max_depth):
+            went_right = flat_features[row_offset + self.feature[node]] > self.threshold[node]
+            node = self.children[2 * node + went_right]
+            done = self._is_leaf[node]
+            if done.any():
+                leaves[position[done]] = node[done]
+                descending = ~done
+                node, position, row_offset = node[descending], position[descending], row_offset[descending]
+                if not len(node):
+                    break
+        return leaves.reshape(n_rows, self.n_trees)
+
+    def predict_proba(self, features: np.ndarray) -> list:
+        """Per-output class probabilities of raw readings, as MultiOutputClassifier.predict_proba on scaled ones."""
+        leaves = self.leaves(features)
+        return [
+            self.value[leaves[:, trees]].mean(axis=1)[:, :n_classes]
+            for trees, n_classes in self.outputs
+        ]
+
+
+def check_parity(clf, arrays: dict, features: np.ndarray) -> dict:
+    """
+    Compare the compiled ensemble with the sklearn model on raw readings.
+
+    The sklearn model sees the readings scaled with the exported scaler
+    statistics (exactly as StandardScaler.transform does); the ensemble sees
+    them raw.
+
+    Returns:
+        Dict with the number of rows checked, label mismatches per output and the
+        largest absolute probability difference
+    """
+    features = np.asarray(features, dtype=np.float64)
+    scaled = (features - np.asarray(arrays["scaler_mean"])) / np.asarray(arrays["scaler_scale"])
+    expected = clf.predict_proba(scaled)
+    actual = FlatEnsemble(arrays).predict_proba(features)
+    report = {"rows": len(features), "max_abs_proba_diff": 0.0}
+    for name, want, got in zip(OUTPUTS, expected, actual):
+        report[f"{name}_label_mismatches"] = int((want.argmax(axis=1) != got.argmax(axis=1)).sum())
+        report["max_abs_proba_diff"] = max(report["max_abs_proba_diff"], float(np.abs(want - got).max()))
+    return report
+
+
+def load_flat_model(path: str, mmap_mode: str | None = "r") -> dict:
+    """
+    Load an exported flat model; with mmap_mode="r" the arrays are shared through the page cache.
+
+    Raises:
+        FlatModelFormatError: If the file was exported in another format version
+    """
+    arrays = joblib.load(path, mmap_mode=mmap_mode)
+    version = int(arrays.get("format_version", -1))
+    if version != FLAT_MODEL_FORMAT_VERSION:
+        raise FlatModelFormatError(f"Unsupported flat model format {version} in {path}")
+    return arrays
+
+
+if __name__ == "__main__":
+    from Vitals.model_registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description="Export a registered vitals model as memory-mappable flat arrays.")
+    parser.add_argument("--version", help="Registry version (default: the active one)")
+    parser.add_argument("--new-version", help=f"Version to register the re-export as (default: <version>-flat{FLAT_MODEL_FORMAT_VERSION})")
+    parser.add_argument("--activate", action="store_true", help="Make the new version the active one")
+    parser.add_argument("--output", help="Write a standalone file instead of registering a new version")
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    version = args.version or registry.active_version()
+    bundle = [joblib.load(registry.bundle_path(version, artifact))
+              for artifact in ("model", "scaler", "status_encoder", "condition_encoder")]
+
+    if args.output:
+        summary = export_flat_model(*bundle, args.output)
+        print(f"Wrote {args.output} ({os.path.getsize(args.output) / 1024:.0f} KB; "
+              f"{summary['trees']} trees, {summary['nodes']} nodes)")
+    else:
+        new_version = args.new_version or f"{version}-flat{FLAT_MODEL_FORMAT_VERSION}"
+        entry = registry.derive(version, new_version, {"flat_model": lambda path: export_flat_model(*bundle, path)},
+                                activate=args.activate)
+        print(f"Registered {new_version} from {version} ({entry['files']['flat_model']['bytes'] / 1024:.0f} KB flat model)"
+              + ("; now active" if args.activate else f"; activate it with POST /admin/models/activate"))
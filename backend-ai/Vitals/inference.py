@@ -0,0 +1,164 @@
+import sys
+import os
+import threading
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from typing import List, NamedTuple
+
+
+# Feature names used during training, in column order
+FEATURE_NAMES = [
+    "heart_rate",
+    "resp_rate",
+    "blood_pressure_systolic",
+    "blood_pressure_diastolic",
+    "spo2",
+    "temperature_c",
+    "glucose_mgdl"
+]
+
+
+class VitalsPredictions(NamedTuple):
+    """Labels and confidences (0-100) for a batch of readings, one entry per row."""
+    label_status: np.ndarray
+    probable_condition: np.ndarray
+    status_confidence: np.ndarray
+    condition_confidence: np.ndarray
+
+    def to_records(self) -> List[dict]:
+        """Per-reading prediction dicts in the shape the API returns."""
+        return [
+            {
+                "label_status": status,
+                "probable_condition": condition,
+                "confidence": {"label_status": status_conf, "probable_condition": condition_conf},
+            }
+            for status, condition, status_conf, condition_conf in zip(
+                self.label_status.tolist(),
+                self.probable_condition.tolist(),
+                self.status_confidence.tolist(),
+                self.condition_confidence.tolist(),
+            )
+        ]
+
+
+class VitalsPredictor:
+    """
+    Single-pass inference over the multi-output vitals model.
+
+    `MultiOutputClassifier.predict` runs every tree once per output and each
+    `predict_proba` call runs them again. Here the forests are evaluated once
+    through `predict_proba`; labels come from the argmax of those
+    probabilities (exactly what `RandomForestClassifier.predict` does) via
+    lookup arrays that map probability columns straight to label strings, so
+    no `inverse_transform` call is needed per reading.
+
+    Build it with `from_sklearn` (pickled estimators) or `from_flat` (the
+    memory-mapped flat-array export in Vitals/flat_forest.py). The flat
+    export has the scaler folded into its thresholds, so it takes raw
+    readings; pass mean=None and scale=None for such a model.
+
+    The flat traversal is fastest for single readings and micro-batches, but
+    its cost grows linearly with rows while sklearn's compiled tree walk has
+    a large fixed cost and a small per-row one; `use_for_large_batches` hands
+    batches above a size to another predictor (the sklearn one).
+    """
+
+    def __init__(self, predict_proba, mean, scale, status_labels, condition_labels, backend: str):
+        self._predict_proba = predict_proba
+        self._mean = None if mean is None else np.asarray(mean, dtype=np.float64)
+        self._scale = None if scale is None else np.asarray(scale, dtype=np.float64)
+        self._status_labels = np.asarray(status_labels)
+        self._condition_labels = np.asarray(condition_labels)
+        self.backend = backend
+        self._large_batch_loader = None
+        self._large_batch_min_rows = 0
+        self._large_batch_predictor = None
+        self._large_batch_lock = threading.Lock()
+
+    @classmethod
+    def from_sklearn(cls, clf, scaler, le_status, le_condition) -> "VitalsPredictor":
+        status_estimator, condition_estimator = clf.estimators_
+        # Probability column -> encoded class -> label string, resolved once
+        return cls(
+            clf.predict_proba,
+            scaler.mean_,
+            scaler.scale_,
+            le_status.classes_[status_estimator.classes_.astype(int)],
+            le_condition.classes_[condition_estimator.classes_.astype(int)],
+            backend="sklearn",
+        )
+
+    @classmethod
+    def from_flat(cls, arrays: dict) -> "VitalsPredictor":
+        from Vitals.flat_forest import FlatEnsemble
+
+        ensemble = FlatEnsemble(arrays)
+        # The scaler is folded into the thresholds: raw readings go straight to the trees
+        return cls(
+            ensemble.predict_proba,
+            None,
+            None,
+            ensemble.labels["status"],
+            ensemble.labels["condition"],
+            backend="flat",
+        )
+
+    def use_for_large_batches(self, load, min_rows: int) -> "VitalsPredictor":
+        """
+        Score batches of `min_rows` or more readings with the predictor `load()` returns.
+
+        It is loaded on the first such batch, so workers that never see one
+        do not pay for it. Returns self.
+        """
+        self._large_batch_loader, self._large_batch_min_rows = load, min_rows
+        return self
+
+    def _for_batch(self, n_rows: int) -> "VitalsPredictor":
+        if not self._large_batch_min_rows or n_rows < self._large_batch_min_rows:
+            return self
+        if self._large_batch_predictor is None:
+            with self._large_batch_lock:
+                if self._large_batch_predictor is None:
+                    self._large_batch_predictor = self._large_batch_loader()
+        return self._large_batch_predictor
+
+    def scale(self, features: np.ndarray) -> np.ndarray:
+        """StandardScaler.transform without the per-call DataFrame and feature-name checks (no-op for folded models)."""
+        if self._mean is None:
+            return features
+        return (features - self._mean) / self._scale
+
+    def predict(self, features: np.ndarray) -> VitalsPredictions:
+        """
+        Predict status and condition for a batch of readings.
+
+        Args:
+            features: Array of shape (n_readings, len(FEATURE_NAMES)), unscaled
+
+        Returns:
+            VitalsPredictions with labels and confidences for every row
+        """
+        features = np.asarray(features, dtype=np.float64).reshape(-1, len(FEATURE_NAMES))
+        predictor = self._for_batch(len(features))
+        if predictor is not self:
+            return predictor.predict(features)
+        status_proba, condition_proba = self._predict_proba(self.scale(features))
+        return self._decode(status_proba, condition_proba)
+
+    def _decode(self, status_proba: np.ndarray, condition_proba: np.ndarray) -> VitalsPredictions:
+        status_idx = status_proba.argmax(axis=1)
+        condition_idx = condition_proba.argmax(axis=1)
+        rows = np.arange(len(status_idx))
+        return VitalsPredictions(
+            label_status=self._status_labels[status_idx],
+            probable_condition=self._condition_labels[condition_idx],
+            status_confidence=np.round(status_proba[rows, status_idx], 2) * 100,
+            condition_confidence=np.round(condition_proba[rows, condition_idx], 2) * 100,
+        )
+
+    def predict_one(self, reading: dict) -> dict:
+        """Prediction dict for a single reading given as {feature name: value}."""
+        features = np.array([[reading[name] for name in FEATURE_NAMES]], dtype=np.float64)
+        return self.predict(features).to_records()[0]
@@ -0,0 +1,89 @@
+"""
+Measure per-worker memory for the pickled and the memory-mapped vitals model.
+
+Starts N worker processes per format (as hypercorn would), has each load the
+model and score one reading, and reports each worker's RSS and PSS. PSS
+(proportional set size) splits pages shared between processes among them,
+so it shows what memory mapping the flat export actually saves per worker.
+
+Usage:
+    python -m Vitals.measure_memory               # 4 workers per format
+    python -m Vitals.measure_memory --workers 8
+"""
+import sys
+import os
+import argparse
+import multiprocessing
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def _memory_kb() -> dict:
+    """Current RSS and PSS of this process in KB (Linux /proc)."""
+    usage = {}
+    with open("/proc/self/status") as handle:
+        for line in handle:
+            if line.startswith("VmRSS:"):
+                usage["rss"] = int(line.split()[1])
+    try:
+        with open("/proc/self/smaps_rollup") as handle:
+            for line in handle:
+                if line.startswith("Pss:"):
+                    usage["pss"] = int(line.split()[1])
+    except FileNotFoundError:
+        usage["pss"] = None
+    return usage
+
+
+def _worker(model_format: str, ready, results):
+    os.environ["VITALS_MODEL_FORMAT"] = model_format
+    import numpy as np
+    from Vitals.body_vitals import get_predictor
+    from Vitals.inference import FEATURE_NAMES
+
+    before = _memory_kb()
+    predictor = get_predictor()
+    predictor.predict(np.array([[80, 16, 120, 80, 98, 36.8, 95]], dtype=np.float64).reshape(1, len(FEATURE_NAMES)))
+    # Measure once every worker holds its model, so shared pages are split between them
+    ready.wait()
+    after = _memory_kb()
+    results.put({
+        "format": model_format,
+        "backend": predictor.backend,
+        "sklearn_imported": "sklearn" in sys.modules,
+        "before": before,
+        "after": after,
+    })
+    ready.wait()
+
+
+def measure(model_format: str, workers: int) -> list:
+    context = multiprocessing.get_context("spawn")
+    ready = context.Barrier(workers)
+    results = context.Queue()
+    processes = [context.Process(target=_worker, args=(model_format, ready, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return samples
+
+
+def _mean(samples, stage, key):
+    values = [sample[stage][key] for sample in samples if sample[stage][key] is not None]
+    return sum(values) / len(values) / 1024 if values else float("nan")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-worker memory of the vitals model formats.")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'format':<8} {'backend':<8} {'sklearn':<8} {'RSS before':>11} {'RSS after':>10} {'PSS after':>10}  (MB per worker, {args.workers} workers)")
+    for model_format in ("pickle", "flat"):
+        samples = measure(model_format, args.workers)
+        print(
+            f"{model_format:<8} {samples[0]['backend']:<8} {str(samples[0]['sklearn_imported']):<8} "
+            f"{_mean(samples, 'before', 'rss'):>11.1f} {_mean(samples, 'after', 'rss'):>10.1f} "
+            f"{_mean(samples, 'after', 'pss'):>10.1f}"
+        )
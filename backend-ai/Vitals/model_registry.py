@@ -0,0 +1,335 @@
+"""
+Versioned registry of vitals model bundles.
+
+Layout (under settings.VITALS_REGISTRY_DIR):
+
+    manifest.json            {"active": "<version>", "versions": {"<version>": {...}}}
+    <version>/
+        multioutput_model.pkl
+        scaler.pkl
+        label_encoder_status.pkl
+        label_encoder_condition.pkl
+        vitals_flat_model.joblib (tree models only; others are served from the pickles)
+        training_report.json     (optional; written by the TrainingPipeline scripts)
+
+Each manifest entry records the bundle's feature list, evaluation metrics,
+creation time, sklearn version and per-file size and SHA-256. Bundle
+directories are never modified after registration (workers memory-map
+their flat models); a re-exported flat model is registered as a new
+version derived from the old one, and switching versions only rewrites
+manifest.json, atomically (write to a temp file, then os.replace),
+so every worker sees either the old or the new active version.
+"""
+import sys
+import os
+import re
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from datetime import datetime, timezone
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Configurations.config import settings
+from Vitals.inference import VitalsPredictor, FEATURE_NAMES
+
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+MANIFEST_NAME = "manifest.json"
+
+BUNDLE_FILES = {
+    "model": "multioutput_model.pkl",
+    "scaler": "scaler.pkl",
+    "status_encoder": "label_encoder_status.pkl",
+    "condition_encoder": "label_encoder_condition.pkl",
+    "flat_model": "vitals_flat_model.joblib",
+}
+
+# Artifacts a bundle may lack
+OPTIONAL_FILES = {"flat_model"}
+
+REPORT_FILE = "training_report.json"
+
+VERSION_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+
+
+class UnknownModelVersion(KeyError):
+    pass
+
+
+class ModelBundleError(ValueError):
+    """A bundle's files do not match the sizes and checksums recorded in the manifest."""
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """Reads and updates the model registry directory."""
+
+    def __init__(self, root: str | None = None):
+        root = root or settings.VITALS_REGISTRY_DIR
+        self.root = root if os.path.isabs(root) else os.path.join(BASE_DIR, root)
+        self._manifest_path = os.path.join(self.root, MANIFEST_NAME)
+        self._cached = None
+        self._cached_mtime = None
+        self._lock = threading.Lock()
+
+    # ----------------------------
+    # Manifest
+    # ----------------------------
+    def manifest(self) -> dict:
+        """Current manifest, re-read only when the file changed."""
+        mtime = os.stat(self._manifest_path).st_mtime_ns
+        if self._cached is None or mtime != self._cached_mtime:
+            with open(self._manifest_path, encoding="utf-8") as handle:
+                self._cached = json.load(handle)
+            self._cached_mtime = mtime
+        return self._cached
+
+    def _write_manifest(self, manifest: dict):
+        fd, temp_path = tempfile.mkstemp(prefix=".manifest-", suffix=".json", dir=self.root)
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(manifest, handle, indent=2, sort_keys=True)
+            handle.write("\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, self._manifest_path)
+
+    def versions(self) -> dict:
+        return self.manifest()["versions"]
+
+    def active_version(self) -> str:
+        return self.manifest()["active"]
+
+    def bundle_path(self, version: str, artifact: str) -> str:
+        """Path of one artifact (a BUNDLE_FILES key) of a registered version."""
+        if version not in self.versions():
+            raise UnknownModelVersion(version)
+        return os.path.join(self.root, version, BUNDLE_FILES[artifact])
+
+    # ----------------------------
+    # Updates
+    # ----------------------------
+    def register(self, version: str, clf, scaler, le_status, le_condition,
+                 metrics: dict | None = None, features: list | None = None, activate: bool = False,
+                 report: dict | None = None) -> dict:
+        """
+        Save a trained model as a new immutable bundle.
+
+        Args:
+            version: New version name (letters, digits, ".", "_", "-")
+            clf / scaler / le_status / le_condition: Fitted training objects
+            metrics: Evaluation metrics to record in the manifest
+            features: Feature columns in training order (defaults to FEATURE_NAMES)
+            activate: Make the new version the active one
+            report: Training report saved in the bundle as training_report.json
+
+        Returns:
+            The bundle's manifest entry
+        """
+        import joblib
+        import sklearn
+        from Vitals.flat_forest import export_flat_model, supports_flat_export
+
+        def write_files(staging_dir: str):
+            joblib.dump(clf, os.path.join(staging_dir, BUNDLE_FILES["model"]))
+            joblib.dump(scaler, os.path.join(staging_dir, BUNDLE_FILES["scaler"]))
+            joblib.dump(le_status, os.path.join(staging_dir, BUNDLE_FILES["status_encoder"]))
+            joblib.dump(le_condition, os.path.join(staging_dir, BUNDLE_FILES["condition_encoder"]))
+            if supports_flat_export(clf):
+                export_flat_model(clf, scaler, le_status, le_condition,
+                                  os.path.join(staging_dir, BUNDLE_FILES["flat_model"]))
+            if report is not None:
+                with open(os.path.join(staging_dir, REPORT_FILE), "w", encoding="utf-8") as handle:
+                    json.dump(report, handle, indent=2)
+                    handle.write("\n")
+
+        entry = {
+            "sklearn_version": sklearn.__version__,
+            "features": list(features or FEATURE_NAMES),
+            "metrics": metrics or {},
+        }
+        return self._add_bundle(version, write_files, entry, activate)
+
+    def derive(self, source: str, version: str, writers: dict, activate: bool = False) -> dict:
+        """
+        Register a copy of bundle `source` with some artifacts rewritten, as a new version.
+
+        Used to re-export a bundle's flat model: the source bundle may be
+        memory-mapped by live workers, so it is never rewritten in place.
+
+        Args:
+            source: Registered version to copy
+            version: New version name
+            writers: BUNDLE_FILES key -> function(path) writing that artifact of the new bundle
+            activate: Make the new version the active one
+
+        Returns:
+            The new bundle's manifest entry
+        """
+        source_entry = self.versions().get(source)
+        if source_entry is None:
+            raise UnknownModelVersion(source)
+        unknown = set(writers) - set(BUNDLE_FILES)
+        if unknown:
+            raise ValueError(f"Unknown bundle artifacts: {', '.join(sorted(unknown))}")
+        source_dir = os.path.join(self.root, source)
+
+        def write_files(staging_dir: str):
+            for artifact, name in [*BUNDLE_FILES.items(), ("training_report", REPORT_FILE)]:
+                path = os.path.join(staging_dir, name)
+                if artifact in writers:
+                    writers[artifact](path)
+                elif os.path.exists(os.path.join(source_dir, name)):
+                    shutil.copy2(os.path.join(source_dir, name), path)
+
+        entry = {key: value for key, value in source_entry.items() if key not in ("created_at", "files")}
+        entry["derived_from"] = source
+        return self._add_bundle(version, write_files, entry, activate)
+
+    def _add_bundle(self, version: str, write_files, entry: dict, activate: bool) -> dict:
+        """Build a bundle with `write_files(staging_dir)`, rename it into place and add it to the manifest."""
+        if not VERSION_PATTERN.match(version):
+            raise ValueError(f"Invalid model version name: {version!r}")
+        os.makedirs(self.root, exist_ok=True)
+        final_dir = os.path.join(self.root, version)
+        if os.path.exists(final_dir):
+            raise ValueError(f"Model version {version} already exists")
+
+        # Build the bundle in a temp dir and rename it into place in one step
+        staging_dir = tempfile.mkdtemp(prefix=f".{version}-", dir=self.root)
+        try:
+            write_files(staging_dir)
+            entry = {
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                **entry,
+                "files": self._describe_files(staging_dir),
+            }
+            os.chmod(staging_dir, 0o755)
+            os.rename(staging_dir, final_dir)
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+        with self._lock:
+            manifest = self._load_or_create_manifest()
+            manifest["versions"][version] = entry
+            if activate or not manifest.get("active"):
+                manifest["active"] = version
+            self._write_manifest(manifest)
+        return entry
+
+    def verify(self, version: str) -> dict:
+        """
+        Check that a bundle's files exist and match their recorded size and SHA-256.
+
+        Returns:
+            The bundle's manifest entry
+
+        Raises:
+            UnknownModelVersion: If the version is not registered
+            FileNotFoundError: If a required file is missing
+            ModelBundleError: If a file differs from what the manifest recorded
+        """
+        entry = self.versions().get(version)
+        if entry is None:
+            raise UnknownModelVersion(version)
+        for artifact, name in BUNDLE_FILES.items():
+            if artifact not in OPTIONAL_FILES and not os.path.exists(os.path.join(self.root, version, name)):
+                raise FileNotFoundError(f"Model version {version} is missing {name}")
+        for details in entry.get("files", {}).values():
+            path = os.path.join(self.root, version, details["name"])
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Model version {version} is missing {details['name']}")
+            if os.path.getsize(path) != details["bytes"] or _sha256(path) != details["sha256"]:
+                raise ModelBundleError(f"Model version {version}: {details['name']} does not match its recorded checksum")
+        return entry
+
+    def activate(self, version: str, preload=None) -> dict:
+        """
+        Make `version` the active model for every worker; returns its manifest entry.
+
+        The bundle is verified first, and `preload(version)` (e.g. loading it
+        in this worker) runs before the manifest is written; if either fails,
+        the active version does not change.
+        """
+        with self._lock:
+            entry = self.verify(version)
+            if preload is not None:
+                preload(version)
+            manifest = dict(self.manifest())
+            manifest["active"] = version
+            self._write_manifest(manifest)
+        return entry
+
+    def _load_or_create_manifest(self) -> dict:
+        if os.path.exists(self._manifest_path):
+            return json.loads(json.dumps(self.manifest()))
+        return {"active": None, "versions": {}}
+
+    @staticmethod
+    def _describe_files(directory: str) -> dict:
+        files = {}
+        for artifact, name in [*BUNDLE_FILES.items(), ("training_report", REPORT_FILE)]:
+            path = os.path.join(directory, name)
+            if (artifact == "training_report" or artifact in OPTIONAL_FILES) and not os.path.exists(path):
+                continue
+            files[artifact] = {"name": name, "bytes": os.path.getsize(path), "sha256": _sha256(path)}
+        return files
+
+    # ----------------------------
+    # Loading
+    # ----------------------------
+    def load(self, version: str, model_format: str = "flat") -> VitalsPredictor:
+        """
+        Build a predictor from a registered bundle.
+
+        "flat" memory-maps the compiled trees; "pickle" unpickles the sklearn
+        model. Bundles without a flat model (non-tree models) always load the pickle,
+        and so do bundles whose flat model predates the current format (re-export
+        those with `python -m Vitals.flat_forest`).
+        A flat predictor hands batches of settings.VITALS_FLAT_MAX_ROWS readings
+        or more to the pickled model, loaded on the first such batch.
+        """
+        if model_format == "flat" and os.path.exists(self.bundle_path(version, "flat_model")):
+            from Vitals.flat_forest import load_flat_model, FlatModelFormatError
+
+            try:
+                arrays = load_flat_model(self.bundle_path(version, "flat_model"), mmap_mode="r")
+            except FlatModelFormatError as e:
+                print(f"Serving model version {version} from its pickles: {e}")
+            else:
+                predictor = VitalsPredictor.from_flat(arrays)
+                if settings.VITALS_FLAT_MAX_ROWS:
+                    predictor.use_for_large_batches(lambda: self.load(version, "pickle"), settings.VITALS_FLAT_MAX_ROWS)
+                return predictor
+
+        import joblib
+
+        return VitalsPredictor.from_sklearn(
+            joblib.load(self.bundle_path(version, "model")),
+            joblib.load(self.bundle_path(version, "scaler")),
+            joblib.load(self.bundle_path(version, "status_encoder")),
+            joblib.load(self.bundle_path(version, "condition_encoder")),
+        )
+
+
+def rss_kb() -> int | None:
+    """Resident set size of this process in KB (Linux only; None elsewhere)."""
+    try:
+        with open("/proc/self/status") as handle:
+            for line in handle:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except FileNotFoundError:
+        return None
+    return None
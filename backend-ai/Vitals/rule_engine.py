@@ -0,0 +1,347 @@
+"""
+Vectorized threshold rules for vitals status, and routing between rules and model.
+
+The training labels are not learned from data: DataGenerator labels every
+reading with fixed Normal/Warning/Critical thresholds. `RuleEngine`
+evaluates those thresholds (loaded from a ruleset file, by default
+Vitals/vitals_rules.json) on a whole (n_readings, len(FEATURE_NAMES))
+matrix with a few NumPy comparisons, so scoring needs no model at all.
+
+`RuleRouter` decides per batch what scores each reading
+(settings.VITALS_RULES_MODE):
+
+- "off": the model scores everything (rules are not loaded)
+- "shadow": the model scores everything; rules are evaluated alongside and
+  compared with it
+- "hybrid": rules label readings that are clear of every threshold; readings
+  closer than a rule's margin to a threshold are ambiguous and go to the model
+- "rules": rules label every finite reading; the model is never loaded
+  unless audits are enabled or a reading is undecidable (see below)
+
+Readings with a NaN or infinite vital are never labelled by rules (NaN is
+inside every range, so it would pass as the first status); the model scores
+them in every mode but "off".
+
+Rule-decided readings report 100% confidence. In "hybrid" and "rules" mode
+a random VITALS_RULES_AUDIT_RATE share of rule-decided readings is also
+sent to the model in the background (the reply does not wait for it), so
+agreement between rules and model is tracked in every mode.
+
+Usage (offline agreement report on a labelled dataset):
+    python -m Vitals.rule_engine --data Datasets/vitals.csv
+    python -m Vitals.rule_engine --data Datasets/vitals_1m.parquet --version v1 --rules my_rules.json
+"""
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from Vitals.inference import VitalsPredictions, FEATURE_NAMES
+
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+RULE_MODES = ("off", "shadow", "hybrid", "rules")
+
+# Audit jobs allowed in flight at once; further audits are skipped, not queued
+MAX_PENDING_AUDITS = 4
+
+
+class RuleEngine:
+    """
+    Normal/Warning/Critical thresholds evaluated on batches of readings.
+
+    Every status after the first in `statuses` has a [low, high] range per
+    vital (null for an open end); a reading gets the most severe status whose
+    range any of its vitals falls outside of, and the first status when none
+    does. Values and thresholds are compared as float32, the precision of
+    binary /ws/predict frames, so 36.1 sent as float32 is not below 36.1.
+    """
+
+    def __init__(self, ruleset: dict, source: str = "<dict>"):
+        self.source = source
+        self.statuses = list(ruleset["statuses"])
+        if len(self.statuses) < 2:
+            raise ValueError(f"{source}: a ruleset needs at least two statuses")
+        missing = [status for status in self.statuses if status not in ruleset["conditions"]]
+        if missing:
+            raise ValueError(f"{source}: no condition for status {', '.join(missing)}")
+        self._status_labels = np.array(self.statuses)
+        self._condition_labels = np.array([ruleset["conditions"][status] for status in self.statuses])
+
+        levels = len(self.statuses) - 1
+        lows = np.full((levels, len(FEATURE_NAMES)), -np.inf, dtype=np.float32)
+        highs = np.full((levels, len(FEATURE_NAMES)), np.inf, dtype=np.float32)
+        margins = np.zeros(len(FEATURE_NAMES), dtype=np.float32)
+        for name, rule in ruleset["rules"].items():
+            if name not in FEATURE_NAMES:
+                raise ValueError(f"{source}: unknown vital {name!r}; expected one of {', '.join(FEATURE_NAMES)}")
+            column = FEATURE_NAMES.index(name)
+            unknown = set(rule) - set(self.statuses[1:]) - {"margin"}
+            if unknown:
+                raise ValueError(f"{source}: {name} has thresholds for unknown status {', '.join(sorted(unknown))}")
+            for level, status in enumerate(self.statuses[1:]):
+                low, high = rule.get(status, (None, None))
+                if low is not None:
+                    lows[level, column] = low
+                if high is not None:
+                    highs[level, column] = high
+            margins[column] = rule.get("margin", 0)
+        self._lows, self._highs, self._margins = lows, highs, margins
+        # Finite thresholds per vital, for the ambiguity test
+        self._boundaries = np.concatenate((lows, highs))
+
+    @classmethod
+    def from_file(cls, path: str) -> "RuleEngine":
+        """Load a ruleset JSON file (relative paths are resolved against the backend-ai directory)."""
+        path = path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+        with open(path, encoding="utf-8") as handle:
+            ruleset = json.load(handle)
+        try:
+            return cls(ruleset, source=path)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"{path}: malformed ruleset ({type(e).__name__}: {e})") from e
+
+    def decidable(self, features: np.ndarray) -> np.ndarray:
+        """Boolean mask of readings rules can label: every vital is a finite number."""
+        values = np.asarray(features, dtype=np.float32).reshape(-1, len(FEATURE_NAMES))
+        return np.isfinite(values).all(axis=1)
+
+    def status_codes(self, features: np.ndarray) -> np.ndarray:
+        """
+        Index into `statuses` for every reading.
+
+        Raises:
+            ValueError: If any reading is not `decidable`
+        """
+        values = np.asarray(features, dtype=np.float32).reshape(-1, len(FEATURE_NAMES))
+        if not np.isfinite(values).all():
+            raise ValueError("Rules cannot label readings with NaN or infinite vitals")
+        codes = np.zeros(len(values), dtype=np.int8)
+        for level in range(len(self._lows)):
+            outside = ((values < self._lows[level]) | (values > self._highs[level])).any(axis=1)
+            codes[outside] = level + 1
+        return codes
+
+    def ambiguous(self, features: np.ndarray) -> np.ndarray:
+        """Boolean mask of readings with any vital closer than its rule's margin to a threshold (margin 0: never)."""
+        values = np.asarray(features, dtype=np.float32).reshape(-1, len(FEATURE_NAMES))
+        distance = np.abs(values[:, None, :] - self._boundaries[None, :, :])
+        return (distance < self._margins).any(axis=(1, 2))
+
+    def predict(self, features: np.ndarray) -> VitalsPredictions:
+        """Rule labels for a batch of readings, as VitalsPredictions with 100% confidence."""
+        codes = self.status_codes(features)
+        confidence = np.full(len(codes), 100.0)
+        return VitalsPredictions(
+            label_status=self._status_labels[codes],
+            probable_condition=self._condition_labels[codes],
+            status_confidence=confidence,
+            condition_confidence=confidence.copy(),
+        )
+
+
+def _take(predictions: VitalsPredictions, rows: np.ndarray) -> VitalsPredictions:
+    return VitalsPredictions(*(field[rows] for field in predictions))
+
+
+def _scatter(size: int, parts: list) -> VitalsPredictions:
+    """Predictions for `size` readings from (rows, predictions) parts covering them all; later parts win."""
+    merged = []
+    for index in range(len(VitalsPredictions._fields)):
+        field = np.empty(size, dtype=np.result_type(*(predictions[index] for _, predictions in parts)))
+        for rows, predictions in parts:
+            field[rows] = predictions[index]
+        merged.append(field)
+    return VitalsPredictions(*merged)
+
+
+class RuleRouter:
+    """Scores batches with rules, model or both per `mode`, and tracks rule/model agreement."""
+
+    def __init__(self, engine: RuleEngine | None, mode: str = "off", audit_rate: float = 0.0, seed: int | None = None):
+        if mode not in RULE_MODES:
+            raise ValueError(f"Unknown rules mode {mode!r}; use one of {', '.join(RULE_MODES)}")
+        if mode != "off" and engine is None:
+            raise ValueError(f"Rules mode {mode!r} needs a ruleset")
+        self.engine = engine
+        self.mode = mode
+        self.audit_rate = audit_rate
+        self._rng = np.random.default_rng(seed)
+        self._audits = set()
+        self._stats = {
+            "readings": 0,
+            "rule_scored": 0,
+            "model_scored": 0,
+            "ambiguous": 0,
+            "undecidable": 0,
+            "audits_run": 0,
+            "audits_skipped": 0,
+            "audit_errors": 0,
+            "compared": 0,
+            "status_agreed": 0,
+            "condition_agreed": 0,
+        }
+        # (rule status, model status) -> readings
+        self._confusion = {}
+
+    async def predict(self, features: np.ndarray, model_predict) -> VitalsPredictions:
+        """
+        Score a batch of readings.
+
+        Args:
+            features: Array of shape (n_readings, len(FEATURE_NAMES)), unscaled
+            model_predict: Async callable scoring a feature matrix with the model
+
+        Returns:
+            VitalsPredictions for every reading, in input order
+        """
+        self._stats["readings"] += len(features)
+        if self.mode == "off":
+            self._stats["model_scored"] += len(features)
+            return await model_predict(features)
+
+        decidable = self.engine.decidable(features)
+        if self.mode == "shadow":
+            predictions = await model_predict(features)
+            self._stats["model_scored"] += len(features)
+            self._stats["undecidable"] += int((~decidable).sum())
+            rows = np.flatnonzero(decidable)
+            self._compare(self.engine.predict(features[rows]), _take(predictions, rows))
+            return predictions
+        if decidable.all():
+            return await self._route(features, model_predict)
+
+        # NaN / infinite vitals would pass every threshold: the model scores those readings
+        rows, undecidable = np.flatnonzero(decidable), np.flatnonzero(~decidable)
+        self._stats["undecidable"] += len(undecidable)
+        self._stats["model_scored"] += len(undecidable)
+        parts = [(undecidable, await model_predict(features[undecidable]))]
+        if len(rows):
+            parts.append((rows, await self._route(features[rows], model_predict)))
+        return _scatter(len(features), parts)
+
+    async def _route(self, features: np.ndarray, model_predict) -> VitalsPredictions:
+        """Hybrid / rules mode scoring of readings that are all `decidable`."""
+        rules = self.engine.predict(features)
+        if self.mode == "hybrid":
+            to_model = np.flatnonzero(self.engine.ambiguous(features))
+            self._stats["ambiguous"] += len(to_model)
+        else:
+            to_model = np.empty(0, dtype=np.intp)
+        self._stats["rule_scored"] += len(features) - len(to_model)
+        self._audit(features, rules, to_model, model_predict)
+        if len(to_model) == 0:
+            return rules
+
+        model = await model_predict(features[to_model])
+        self._stats["model_scored"] += len(to_model)
+        self._compare(_take(rules, to_model), model)
+        return _scatter(len(features), [(np.arange(len(features)), rules), (to_model, model)])
+
+    def _audit(self, features: np.ndarray, rules: VitalsPredictions, to_model: np.ndarray, model_predict):
+        """Send a random sample of the rule-decided readings to the model in the background."""
+        if self.audit_rate <= 0:
+            return
+        sampled = self._rng.random(len(features)) < self.audit_rate
+        sampled[to_model] = False
+        rows = np.flatnonzero(sampled)
+        if len(rows) == 0:
+            return
+        if len(self._audits) >= MAX_PENDING_AUDITS:
+            self._stats["audits_skipped"] += len(rows)
+            return
+
+        async def audit():
+            try:
+                self._compare(_take(rules, rows), await model_predict(features[rows]))
+                self._stats["audits_run"] += len(rows)
+            except Exception as e:
+                self._stats["audit_errors"] += 1
+                print(f"Rules audit failed: {e}")
+
+        task = asyncio.get_running_loop().create_task(audit())
+        # Keep a reference until it finishes so the task is not garbage-collected
+        self._audits.add(task)
+        task.add_done_callback(self._audits.discard)
+
+    def _compare(self, rules: VitalsPredictions, model: VitalsPredictions):
+        self._stats["compared"] += len(rules.label_status)
+        self._stats["status_agreed"] += int((rules.label_status == model.label_status).sum())
+        self._stats["condition_agreed"] += int((rules.probable_condition == model.probable_condition).sum())
+        pairs, counts = np.unique(np.stack((rules.label_status, model.label_status.astype(str))), axis=1, return_counts=True)
+        for (rule_status, model_status), count in zip(pairs.T.tolist(), counts.tolist()):
+            key = (rule_status, model_status)
+            self._confusion[key] = self._confusion.get(key, 0) + count
+
+    def stats(self) -> dict:
+        """Routing counters and rule/model agreement since worker start."""
+        stats = dict(self._stats)
+        compared = stats["compared"]
+        confusion = {}
+        for (rule_status, model_status), count in sorted(self._confusion.items()):
+            confusion.setdefault(rule_status, {})[model_status] = count
+        return {
+            "mode": self.mode,
+            "ruleset": self.engine.source if self.engine else None,
+            "audit_rate": self.audit_rate,
+            **stats,
+            "rule_share": round(stats["rule_scored"] / stats["readings"], 4) if stats["readings"] else None,
+            "status_agreement": round(stats["status_agreed"] / compared, 4) if compared else None,
+            "condition_agreement": round(stats["condition_agreed"] / compared, 4) if compared else None,
+            "status_confusion": confusion,   # rule status -> model status -> readings
+        }
+
+
+def _best_of(function, repeats: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+if __name__ == "__main__":
+    from DataGenerator.dataset_io import read_dataset
+    from Vitals.model_registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description="Agreement of the vitals rules with dataset labels and the model.")
+    parser.add_argument("--data", default="Datasets/vitals.csv", help="Labelled dataset (.csv, .parquet or .feather)")
+    parser.add_argument("--rules", default="Vitals/vitals_rules.json", help="Ruleset file")
+    parser.add_argument("--version", default=None, help="Model registry version (default: the active one)")
+    parser.add_argument("--format", default="flat", choices=["flat", "pickle"])
+    args = parser.parse_args()
+
+    engine = RuleEngine.from_file(args.rules)
+    registry = ModelRegistry()
+    version = args.version or registry.active_version()
+    predictor = registry.load(version, args.format)
+    frame = read_dataset(args.data, FEATURE_NAMES + ["label_status", "probable_condition"])
+    features = frame[FEATURE_NAMES].to_numpy(dtype=np.float64)
+    labels = frame["label_status"].astype(str).to_numpy()
+
+    rules = engine.predict(features)
+    model = predictor.predict(features)
+    ambiguous = engine.ambiguous(features)
+    print(f"{len(features)} readings from {args.data}; ruleset {engine.source}; model version {version} ({predictor.backend})")
+    print(f"Rules vs dataset labels:  status {np.mean(rules.label_status == labels):.4%}, "
+          f"condition {np.mean(rules.probable_condition == frame['probable_condition'].astype(str).to_numpy()):.4%}")
+    print(f"Model vs dataset labels:  status {np.mean(model.label_status == labels):.4%}")
+    print(f"Rules vs model:           status {np.mean(rules.label_status == model.label_status):.4%}, "
+          f"condition {np.mean(rules.probable_condition == model.probable_condition):.4%}")
+    print(f"Ambiguous (hybrid mode sends to the model): {ambiguous.mean():.2%}; "
+          f"model accuracy on them {np.mean(model.label_status[ambiguous] == labels[ambiguous]):.4%}"
+          if ambiguous.any() else "No ambiguous readings")
+
+    rules_seconds = _best_of(lambda: engine.predict(features))
+    model_seconds = _best_of(lambda: predictor.predict(features))
+    single = features[:1]
+    print(f"Per reading, batch of {len(features)}: rules {rules_seconds / len(features) * 1e6:.2f} us, "
+          f"model {model_seconds / len(features) * 1e6:.2f} us")
+    print(f"Single reading: rules {_best_of(lambda: engine.predict(single), 200) * 1e6:.1f} us, "
+          f"model {_best_of(lambda: predictor.predict(single), 200) * 1e6:.1f} us")
@@ -0,0 +1,155 @@
+import sys
+import os
+import time
+import asyncio
+from collections import Counter, deque
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from Vitals.inference import VitalsPredictions
+
+
+def _batch_bucket(rows: int) -> int:
+    """Power-of-two histogram bucket (upper bound) for a batch of `rows` readings."""
+    return 1 << max(rows - 1, 0).bit_length()
+
+
+class InferenceScheduler:
+    """
+    Micro-batches vitals inference across all sockets of a worker.
+
+    Callers `await submit(features)`. The first pending request opens a
+    collection window of `window_ms`; everything submitted during the window
+    (or until `max_batch` rows are waiting) is stacked into one matrix, scored
+    with a single call on the inference executor, and each caller gets back
+    its own rows. With N monitors reporting every second this replaces N
+    small forest evaluations with a few large ones, at the cost of up to
+    `window_ms` of added latency. While the executor has no free slot,
+    readings keep accumulating, so batches grow under load.
+    """
+
+    def __init__(self, executor, window_ms: float, max_batch: int):
+        self._executor = executor
+        self.window_seconds = window_ms / 1000
+        self.max_batch = max_batch
+        self._loop = None
+        self._task = None
+        self._pending = deque()
+        self._pending_rows = 0
+
+        self.batches = 0
+        self.rows = 0
+        self.requests = 0
+        self.wait_seconds = 0.0
+        self.predict_seconds = 0.0
+        self.histogram = Counter()
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task is not None and not self._task.done():
+            return
+        # First use, or a new event loop (e.g. after a reload); bind to the current one
+        self._loop = loop
+        self._pending.clear()
+        self._pending_rows = 0
+        self._has_work = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._task = loop.create_task(self._run())
+        self._dispatches = set()
+
+    async def submit(self, features: np.ndarray) -> VitalsPredictions:
+        """Queue readings for the next batch and wait for their predictions."""
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._pending.append((features, future, time.perf_counter()))
+        self._pending_rows += len(features)
+        self._has_work.set()
+        if self._pending_rows >= self.max_batch:
+            self._batch_full.set()
+        return await future
+
+    def _take_batch(self):
+        batch, rows = [], 0
+        while self._pending and (not batch or rows + len(self._pending[0][0]) <= self.max_batch):
+            item = self._pending.popleft()
+            batch.append(item)
+            rows += len(item[0])
+        self._pending_rows -= rows
+        if self._pending_rows < self.max_batch:
+            self._batch_full.clear()
+        if not self._pending:
+            self._has_work.clear()
+        return batch, rows
+
+    async def _run(self):
+        while True:
+            await self._has_work.wait()
+            if self._pending_rows < self.max_batch:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.window_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            await self._executor.acquire()
+            batch, rows = self._take_batch()
+            if not batch:
+                self._executor.release()
+                continue
+            task = self._loop.create_task(self._dispatch(batch, rows))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch, rows: int):
+        started = time.perf_counter()
+        try:
+            features = batch[0][0] if len(batch) == 1 else np.vstack([item[0] for item in batch])
+            predictions = await self._executor.predict(features)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._executor.release()
+        finished = time.perf_counter()
+
+        offset = 0
+        for item_features, future, submitted in batch:
+            end = offset + len(item_features)
+            if not future.done():
+                future.set_result(VitalsPredictions(*(field[offset:end] for field in predictions)))
+            offset = end
+            self.wait_seconds += started - submitted
+
+        self.batches += 1
+        self.rows += rows
+        self.requests += len(batch)
+        self.predict_seconds += finished - started
+        self.histogram[_batch_bucket(rows)] += 1
+
+    async def aclose(self):
+        """Stop the batching task (pending callers are cancelled)."""
+        if self._task is not None:
+            self._task.cancel()
+            for task in list(self._dispatches):
+                task.cancel()
+            for _, future, _ in self._pending:
+                future.cancel()
+            self._pending.clear()
+            self._pending_rows = 0
+            self._task = None
+
+    def stats(self) -> dict:
+        """Batch counts, sizes and timings, with a power-of-two batch-size histogram."""
+        return {
+            "window_ms": self.window_seconds * 1000,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "requests": self.requests,
+            "rows": self.rows,
+            "pending_rows": self._pending_rows,
+            "avg_batch_rows": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "avg_requests_per_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "avg_queue_wait_ms": round(self.wait_seconds / self.requests * 1000, 3) if self.requests else 0.0,
+            "avg_predict_ms": round(self.predict_seconds / self.batches * 1000, 3) if self.batches else 0.0,
+            "batch_size_histogram": {f"<={bucket}": count for bucket, count in sorted(self.histogram.items())},
+        }
@@ -1,86 +1,30 @@
 import sys
 import os
-import json
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from Prompts.prompt import vitals_anomaly_detection_prompt
 from Configurations.config import llm_model
+from AgentRuntime.structured_output import StructuredOutput
+from AgentRuntime.single_flight import SingleFlight
+from AgentRuntime.token_budget import TokenBudget
 from PydanticModels.model import VitalsAnomalyInput, VitalsAnomalyDetection
 
 
-def detect_vitals_anomalies(user_input: VitalsAnomalyInput) -> VitalsAnomalyDetection:
-    """
-    Real-time monitoring of patient vital signs to detect anomalies and trigger alerts.
-    
-    Args:
-        user_input: VitalsAnomalyInput containing patient ID, timestamp, vitals, and 
-                   patient context
-        
-    Returns:
-        VitalsAnomalyDetection object with anomaly status, severity, anomalies, 
-        recommendations, alert level, and confidence
-    """
-    # Create format instructions for VitalsAnomalyDetection
-    format_instructions = """
-    You must return a JSON object with the following structure:
-    {
-        "isAnomaly": true,
-        "severity": "high",
-        "anomalies": [
-            {
-                "vitalSign": "oxygenSaturation",
-                "currentValue": 88,
-                "expectedRange": {
-                    "min": 95,
-                    "max": 100
-                },
-                "deviationScore": 0.87,
-                "trendDirection": "worsening"
-            },
-            {
-                "vitalSign": "bloodPressureSystolic",
-                "currentValue": 165,
-                "expectedRange": {
-                    "min": 120,
-                    "max": 130
-                },
-                "deviationScore": 0.70,
-                "trendDirection": "worsening"
-            },
-            {
-                "vitalSign": "bloodPressureDiastolic",
-                "currentValue": 105,
-                "expectedRange": {
-                    "min": 80,
-                    "max": 85
-                },
-                "deviationScore": 0.80,
-                "trendDirection": "worsening"
-            }
-        ],
-        "recommendations": [
-            "Administer supplemental oxygen",
-            "Check airway patency",
-            "Consider arterial blood gas analysis"
-        ],
-        "alertLevel": "notify_doctor",
-        "confidence": 0.94
-    }
-    
-    CRITICAL FORMATTING RULES:
-    - currentValue must be a NUMBER (float or int), NEVER a string like "165/105"
-    - For blood pressure, create TWO separate anomalies:
-      * One with vitalSign: "bloodPressureSystolic" and currentValue as the systolic number (e.g., 165)
-      * One with vitalSign: "bloodPressureDiastolic" and currentValue as the diastolic number (e.g., 105)
-    - expectedRange.min and expectedRange.max must be NUMBERS, not strings
-    - severity must be one of: "low", "medium", "high", "critical"
-    - alertLevel must be one of: "none", "monitor", "notify_nurse", "notify_doctor", "emergency"
-    - trendDirection must be one of: "stable", "improving", "worsening"
-    - deviationScore is a float 0-1
-    - confidence is a float 0-1
-    - If no anomalies detected, isAnomaly should be false and anomalies array should be empty
-    """
-    
+# Reply schema derived from VitalsAnomalyDetection; the provider enforces it, the prompt only adds these rules
+STRUCTURED_OUTPUT = StructuredOutput("vitals_anomaly_detection", VitalsAnomalyDetection, guidance="""
+- For blood pressure, report two anomalies: vitalSign "bloodPressureSystolic" with the systolic value
+  and vitalSign "bloodPressureDiastolic" with the diastolic value
+- deviationScore and confidence are floats 0-1
+- If no anomalies are detected, isAnomaly is false and anomalies is empty
+""")
+
+
+TOKEN_BUDGET = TokenBudget(STRUCTURED_OUTPUT)
+_single_flight = SingleFlight(STRUCTURED_OUTPUT.name)
+
+
+def _format_prompt(user_input: VitalsAnomalyInput) -> list:
+    """Build the system and patient messages sent to the model for `detect_vitals_anomalies`."""
     # Format vitals information
     vitals_parts = []
     if user_input.vitals.heartRate is not None:
@@ -110,7 +54,7 @@ def detect_vitals_anomalies(user_input: VitalsAnomalyInput) -> VitalsAnomalyDete
     
     baseline_info = "\n".join(baseline_parts) if baseline_parts else "  - No baseline data available (using standard ranges)"
     
-    formatted_prompt = vitals_anomaly_detection_prompt.format(
+    formatted_prompt = TOKEN_BUDGET.fit(vitals_anomaly_detection_prompt, dict(
         patient_id=user_input.patientId,
         timestamp=user_input.timestamp,
         vitals_info=vitals_info,
@@ -118,32 +62,41 @@ def detect_vitals_anomalies(user_input: VitalsAnomalyInput) -> VitalsAnomalyDete
         conditions=conditions_str,
         medications=medications_str,
         baseline_info=baseline_info,
-        format_instructions=format_instructions
-    )
+        format_instructions=STRUCTURED_OUTPUT.format_instructions
+    ))
 
-    response = llm_model.LLM().invoke(formatted_prompt)
+    return formatted_prompt
+
+
+def _parse_response(response) -> VitalsAnomalyDetection:
+    """Parse the model reply for `detect_vitals_anomalies` into VitalsAnomalyDetection."""
+    return STRUCTURED_OUTPUT.parse(response)
+
+
+def detect_vitals_anomalies(user_input: VitalsAnomalyInput) -> VitalsAnomalyDetection:
+    """
+    Real-time monitoring of patient vital signs to detect anomalies and trigger alerts.
     
-    # Parse the JSON response
-    try:
-        content = response.content.strip()
-        # Remove markdown code blocks if present
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-        
-        data = json.loads(content)
+    Args:
+        user_input: VitalsAnomalyInput containing patient ID, timestamp, vitals, and 
+                   patient context
         
-        # Validate and create VitalsAnomalyDetection object
-        if isinstance(data, dict):
-            return VitalsAnomalyDetection(**data)
-        else:
-            raise ValueError(f"Expected JSON object, got {type(data)}")
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to parse JSON response: {str(e)}. Response content: {content[:200]}")
-    except Exception as e:
-        raise ValueError(f"Failed to process vital signs anomaly detection response: {str(e)}")
+    Returns:
+        VitalsAnomalyDetection object with anomaly status, severity, anomalies, 
+        recommendations, alert level, and confidence
+    """
+    response = STRUCTURED_OUTPUT.bind(llm_model.LLM()).invoke(_format_prompt(user_input))
+    return _parse_response(response)
+
+
+async def detect_vitals_anomalies_async(user_input: VitalsAnomalyInput) -> VitalsAnomalyDetection:
+    """
+    Async variant of `detect_vitals_anomalies` that awaits the model's native async API,
+    so the calling event loop is free while the request is in flight. Identical
+    requests arriving while it is in flight share its model call.
+    """
+    async def compute():
+        response = await STRUCTURED_OUTPUT.bind(llm_model.LLM()).ainvoke(_format_prompt(user_input))
+        return _parse_response(response)
 
+    return await _single_flight.do(_single_flight.make_key(user_input), compute)
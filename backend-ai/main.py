@@ -1,6 +1,60 @@
-from Endpoints import body_vitals, ai_appointments, ai_diagnosis, ai_summarization, ai_icd10, ai_drug_interaction, ai_guest_booking, ai_health_analysis, ai_vitals_anomaly, ai_adherence, ai_lab_interpretation, ai_readmission, ai_prescription, ai_no_show, ai_imaging, email_service
+from AgentRuntime.lazy_loading import timed_import, timed_load, mark_phase, warm_up_lazy_callables
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware 
+from starlette.concurrency import run_in_threadpool
+
+# Endpoint modules are imported one by one so /metrics/startup can show what each costs;
+# models, indexes and agent modules behind them load lazily on first use
+config = timed_import("Configurations.config")
+body_vitals = timed_import("Endpoints.body_vitals")
+ai_appointments = timed_import("Endpoints.ai_appointments")
+ai_diagnosis = timed_import("Endpoints.ai_diagnosis")
+ai_summarization = timed_import("Endpoints.ai_summarization")
+ai_icd10 = timed_import("Endpoints.ai_icd10")
+ai_drug_interaction = timed_import("Endpoints.ai_drug_interaction")
+ai_guest_booking = timed_import("Endpoints.ai_guest_booking")
+ai_health_analysis = timed_import("Endpoints.ai_health_analysis")
+ai_vitals_anomaly = timed_import("Endpoints.ai_vitals_anomaly")
+ai_adherence = timed_import("Endpoints.ai_adherence")
+ai_lab_interpretation = timed_import("Endpoints.ai_lab_interpretation")
+ai_readmission = timed_import("Endpoints.ai_readmission")
+ai_prescription = timed_import("Endpoints.ai_prescription")
+ai_no_show = timed_import("Endpoints.ai_no_show")
+ai_imaging = timed_import("Endpoints.ai_imaging")
+email_service = timed_import("Endpoints.email_service")
+monitoring = timed_import("Endpoints.monitoring")
+admin_models = timed_import("Endpoints.admin_models")
+mark_phase("imports_done")
+
+from Vitals.body_vitals import scheduler, executor, get_predictor
+from ICD10Agent.icd10_index import get_icd10_index
+from AgentRuntime.token_budget import tokenizer
+
+
+def warm_up():
+    """Load everything that is otherwise loaded by the first request."""
+    get_predictor(trigger="warm-up")
+    if config.settings.ICD10_LOCAL_LOOKUP:
+        get_icd10_index(trigger="warm-up")
+    warm_up_lazy_callables()
+    with timed_load("llm_client", trigger="warm-up"):
+        config.llm_model.LLM()
+    tokenizer(trigger="warm-up")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.settings.STARTUP_WARMUP:
+        await run_in_threadpool(warm_up)
+        mark_phase("warm_up_done")
+    mark_phase("ready")
+    yield
+    # Release the shared LLM connection pool and stop vitals inference on shutdown
+    await config.llm_model.aclose()
+    await scheduler.aclose()
+    executor.shutdown()
+
 
 # ----------------------------
 # FastAPI App
@@ -8,7 +62,8 @@ from fastapi.middleware.cors import CORSMiddleware
 app = FastAPI(
     title="Hospital Vitals Live ML API",
     description="API to stream live patient vitals and get ML-based health predictions.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
     
     )
 
@@ -35,4 +90,6 @@ app.include_router(ai_readmission.router)
 app.include_router(ai_prescription.router)
 app.include_router(ai_no_show.router)
 # app.include_router(ai_imaging.router)
-app.include_router(email_service.router)
\ No newline at end of file
+app.include_router(email_service.router)
+app.include_router(monitoring.router)
+app.include_router(admin_models.router)
\ No newline at end of file
@@ -0,0 +1,24 @@
+import pandas as pd
+
+from DataGenerator.dataGenerator import generate_patient_data
+from DataGenerator.dataset_io import write_dataset, read_dataset, to_typed
+
+
+def test_csv_round_trip_keeps_every_value(tmp_path):
+    chunk = to_typed(generate_patient_data(200, seed=3))
+    chunk.loc[chunk.index[:5], "temperature_c"] = [36.15, 35.0, -1.25, 1e6, 37.123]
+    path = str(tmp_path / "vitals.csv")
+
+    assert write_dataset([chunk.iloc[:0], chunk.iloc[:120], chunk.iloc[:0], chunk.iloc[120:]], path) == 200
+
+    pd.testing.assert_frame_equal(read_dataset(path), chunk.reset_index(drop=True))
+    assert open(path).read().count("patient_id") == 1
+
+
+def test_csv_writes_extra_text_columns_as_text(tmp_path):
+    chunk = to_typed(generate_patient_data(3, seed=3)).assign(note=["a, b", 'say "hi"', None])
+    path = str(tmp_path / "vitals.csv")
+
+    write_dataset([chunk], path)
+
+    assert pd.read_csv(path)["note"].tolist()[:2] == ["a, b", 'say "hi"']
@@ -0,0 +1,35 @@
+import pytest
+
+from DrugInteractionAgent.drug_interaction_agent import normalize_drug_name, normalize_drug_list, _match_drug
+
+
+@pytest.mark.parametrize("name, normalized", [
+    ("Warfarin Sodium ", "warfarin"),
+    ("levothyroxine  sodium", "levothyroxine"),
+    ("Diclofenac Potassium", "diclofenac"),
+    ("metoprolol succinate", "metoprolol"),
+    ("doxycycline hyclate monohydrate", "doxycycline"),
+])
+def test_salt_suffixes_after_a_base_name_are_removed(name, normalized):
+    assert normalize_drug_name(name) == normalized
+
+
+@pytest.mark.parametrize("name", [
+    "potassium chloride", "potassium citrate", "magnesium sulfate", "calcium acetate", "calcium", "sodium",
+])
+def test_salts_that_are_the_drug_are_kept_whole(name):
+    assert normalize_drug_name(name) == name
+
+
+def test_different_salts_stay_different_drugs():
+    assert normalize_drug_list(["potassium chloride", "potassium citrate", "calcium", "Calcium"]) == [
+        "calcium", "potassium chloride", "potassium citrate"]
+
+
+def test_model_drug_names_are_matched_exactly():
+    drugs = ["aspirin dipyridamole", "potassium chloride", "warfarin"]
+
+    assert _match_drug("Warfarin Sodium", drugs) == "warfarin"
+    assert _match_drug("aspirin", drugs) is None
+    assert _match_drug("potassium", drugs) is None
+    assert _match_drug("chloride", drugs) is None
@@ -0,0 +1,35 @@
+import asyncio
+import threading
+
+import numpy as np
+
+from Vitals.executor import InferenceExecutor
+
+
+class _RecordingPredictor:
+    def predict(self, features):
+        return features.sum(axis=1)
+
+
+def test_thread_mode_loads_the_model_off_the_event_loop():
+    load_threads = []
+
+    def loader():
+        load_threads.append(threading.current_thread())
+        return _RecordingPredictor()
+
+    executor = InferenceExecutor(loader, mode="thread", workers=1)
+
+    async def score():
+        loop_thread = threading.current_thread()
+        result = await executor.run(np.ones((3, 2)))
+        return loop_thread, result
+
+    try:
+        loop_thread, result = asyncio.run(score())
+    finally:
+        executor.shutdown()
+
+    assert result.tolist() == [2.0, 2.0, 2.0]
+    assert load_threads and all(thread is not loop_thread for thread in load_threads)
+    assert all(thread.name.startswith("vitals-inference") for thread in load_threads)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.multioutput import MultiOutputClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from Vitals.flat_forest import FlatEnsemble, export_flat_model, load_flat_model, check_parity
+from Vitals.inference import FEATURE_NAMES
+
+
+def _export(tmp_path, status, condition):
+    features = np.random.default_rng(3).uniform(0, 200, size=(60, len(FEATURE_NAMES)))
+    le_status, le_condition = LabelEncoder().fit(status), LabelEncoder().fit(condition)
+    scaler = StandardScaler().fit(features)
+    targets = np.column_stack((le_status.transform(status), le_condition.transform(condition)))
+    clf = MultiOutputClassifier(RandomForestClassifier(n_estimators=4, random_state=0)).fit(scaler.transform(features), targets)
+    path = str(tmp_path / "flat.joblib")
+    export_flat_model(clf, scaler, le_status, le_condition, path)
+    return clf, load_flat_model(path), features
+
+
+def test_single_leaf_trees_answer_with_their_root(tmp_path):
+    clf, arrays, features = _export(tmp_path, ["Normal"] * 60, ["Healthy"] * 60)
+    ensemble = FlatEnsemble(arrays)
+    assert ensemble.max_depth == 0
+
+    assert np.array_equal(ensemble.leaves(features), np.tile(ensemble.roots, (len(features), 1)))
+    report = check_parity(clf, arrays, features)
+    assert report["max_abs_proba_diff"] == 0.0
+
+
+def test_forest_matches_sklearn(tmp_path):
+    labels = np.array(["Critical", "Normal", "Warning"])
+    status = labels[np.random.default_rng(5).integers(0, 3, size=60)]
+    clf, arrays, features = _export(tmp_path, status, np.where(status == "Normal", "Healthy", "Not Healthy"))
+
+    report = check_parity(clf, arrays, np.random.default_rng(9).uniform(0, 200, size=(500, len(FEATURE_NAMES))))
+
+    assert report["status_label_mismatches"] == report["condition_label_mismatches"] == 0
+    assert report["max_abs_proba_diff"] == pytest.approx(0.0, abs=1e-12)
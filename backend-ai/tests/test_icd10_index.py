@@ -0,0 +1,55 @@
+import pytest
+
+from ICD10Agent.icd10_index import ICD10Index, MAX_CACHED_CORRECTIONS
+
+
+@pytest.fixture(scope="module")
+def index():
+    return ICD10Index.load()
+
+
+@pytest.mark.parametrize("diagnosis", ["asthma", "migraine", "acute appendicitis", "J45", "E11", "S72.001"])
+def test_categories_are_not_answered_locally(index, diagnosis):
+    assert index.match(diagnosis) is None
+
+
+@pytest.mark.parametrize("diagnosis, code", [
+    ("cholera", "A00.9"),   # category with a single "Cholera, unspecified" code
+    ("gout", "M10.9"),
+    ("type 2 diabetes mellitus without complications", "E11.9"),
+    ("J45.909", "J45.909"),
+    ("S72.001A", "S72.001A"),  # 7th character extension
+])
+def test_local_answers_are_billable(index, diagnosis, code):
+    suggestions = index.match(diagnosis)
+
+    assert suggestions and suggestions[0].code == code
+    assert all(index.is_billable(suggestion.code) for suggestion in suggestions)
+
+
+def test_typo_corrections_are_bounded(index):
+    for number in range(MAX_CACHED_CORRECTIONS + 10):
+        index._correct(f"zzq{number}")
+
+    assert index._closest_term.cache_info().currsize == MAX_CACHED_CORRECTIONS
+    assert index._correct("hypertenshion") == "hypertension"
+
+
+@pytest.mark.parametrize("diagnosis", [
+    "essential hypertension denied",
+    "essential hypertension on lisinopril",
+    "essential hypertension zzqqxx",
+    "chest pain nonexistent",
+    "no essential hypertension",
+    "essential hypertenshion",   # typo-corrected words are not trusted either
+])
+def test_negated_or_qualified_text_goes_to_the_llm(index, diagnosis):
+    assert index.match(diagnosis) is None
+
+
+def test_unresolved_words_are_reported(index):
+    terms, unresolved = index.query_terms("essential hypertenshion on lisinopril")
+
+    assert terms == ["essential", "hypertension"]
+    assert unresolved == ["hypertenshion", "lisinopril"]
+    assert index.match("essential hypertension")[0].code == "I10"
@@ -0,0 +1,67 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from Configurations.config import LLMSetup
+
+
+def test_stats_separate_client_reuse_from_connection_state():
+    setup = LLMSetup()
+    assert setup.stats()["sync_connections"] is None
+
+    first = setup.LLM("gpt-4o-mini")
+    assert setup.LLM("gpt-4o-mini") is first
+    stats = setup.stats()
+    setup.close()
+
+    assert (stats["client_registry_hits"], stats["client_registry_misses"]) == (1, 1)
+    assert stats["sync_connections"] == stats["async_connections"] == {"open": 0, "idle": 0, "in_use": 0}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_pool_stats_follow_the_connection_lifecycle(local_url):
+    setup = LLMSetup()
+    setup.LLM("gpt-4o-mini")
+    client = setup._http_client
+
+    with client.stream("GET", local_url) as response:
+        in_flight = setup.stats()["sync_connections"]
+        response.read()
+    after = setup.stats()["sync_connections"]
+    setup.close()
+
+    assert in_flight == {"open": 1, "idle": 0, "in_use": 1}
+    assert after == {"open": 1, "idle": 1, "in_use": 0}
+
+
+def test_pool_stats_degrade_to_none_when_httpx_internals_change():
+    class _Transport:
+        pass
+
+    class _Client:
+        _transport = _Transport()
+
+    assert LLMSetup._connection_stats(_Client()) is None
+    assert LLMSetup._connection_stats(None) is None
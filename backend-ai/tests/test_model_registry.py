@@ -0,0 +1,122 @@
+import os
+import shutil
+
+import joblib
+import numpy as np
+import pytest
+
+from Vitals.flat_forest import export_flat_model
+from Vitals.inference import FEATURE_NAMES
+from Vitals.model_registry import ModelRegistry, ModelBundleError, BASE_DIR, BUNDLE_FILES, _sha256
+
+
+@pytest.fixture
+def registry(tmp_path):
+    shutil.copytree(os.path.join(BASE_DIR, "Models", "registry"), tmp_path / "registry")
+    return ModelRegistry(str(tmp_path / "registry"))
+
+
+def test_flat_reexport_registers_a_new_version_and_leaves_the_bundle_alone(registry):
+    source = registry.active_version()
+    flat_path = registry.bundle_path(source, "flat_model")
+    before = (os.stat(flat_path).st_ino, _sha256(flat_path), registry.versions()[source]["files"])
+    bundle = [joblib.load(registry.bundle_path(source, artifact))
+              for artifact in ("model", "scaler", "status_encoder", "condition_encoder")]
+
+    entry = registry.derive(source, "v1-reexport", {"flat_model": lambda path: export_flat_model(*bundle, path)})
+
+    assert (os.stat(flat_path).st_ino, _sha256(flat_path), registry.versions()[source]["files"]) == before
+    assert registry.active_version() == source
+    assert entry["derived_from"] == source
+    assert entry["features"] == registry.versions()[source]["features"]
+    for artifact, details in entry["files"].items():
+        assert _sha256(os.path.join(registry.root, "v1-reexport", details["name"])) == details["sha256"]
+    assert set(entry["files"]) >= set(BUNDLE_FILES)
+
+    features = np.random.default_rng(0).uniform(0, 200, size=(50, len(FEATURE_NAMES)))
+    old, new = registry.load(source).predict(features), registry.load("v1-reexport").predict(features)
+    assert np.array_equal(old.label_status, new.label_status)
+
+
+def test_derive_refuses_to_overwrite_an_existing_version(registry):
+    source = registry.active_version()
+    with pytest.raises(ValueError, match="already exists"):
+        registry.derive(source, source, {})
+
+
+def _register_copy(registry, version):
+    """Register the active bundle's training objects again under `version`."""
+    source = registry.active_version()
+    bundle = [joblib.load(registry.bundle_path(source, artifact))
+              for artifact in ("model", "scaler", "status_encoder", "condition_encoder")]
+    return registry.register(version, *bundle)
+
+
+def _fail_to_load(registry, monkeypatch, broken):
+    load = registry.load
+
+    def failing_load(version, *args, **kwargs):
+        if version == broken:
+            raise ValueError(f"model version {version} is corrupt")
+        return load(version, *args, **kwargs)
+
+    monkeypatch.setattr(registry, "load", failing_load)
+
+
+def test_activate_rejects_a_bundle_that_fails_its_checksums(registry):
+    source = registry.active_version()
+    _register_copy(registry, "v2")
+    with open(registry.bundle_path("v2", "scaler"), "ab") as handle:
+        handle.write(b"\0")
+
+    with pytest.raises(ModelBundleError):
+        registry.activate("v2")
+    assert registry.active_version() == source
+
+
+def test_activate_keeps_the_active_version_when_preload_fails(registry, monkeypatch):
+    source = registry.active_version()
+    _register_copy(registry, "v2")
+    _fail_to_load(registry, monkeypatch, "v2")
+    manifest_before = open(os.path.join(registry.root, "manifest.json"), "rb").read()
+
+    with pytest.raises(ValueError, match="corrupt"):
+        registry.activate("v2", preload=lambda version: registry.load(version))
+
+    assert open(os.path.join(registry.root, "manifest.json"), "rb").read() == manifest_before
+    assert registry.active_version() == source
+
+
+def test_admin_activation_loads_before_switching(registry, monkeypatch):
+    from Vitals import body_vitals
+
+    source = registry.active_version()
+    _register_copy(registry, "v2")
+    _register_copy(registry, "v3")
+    _fail_to_load(registry, monkeypatch, "v2")
+    monkeypatch.setattr(body_vitals, "registry", registry)
+    monkeypatch.setattr(body_vitals, "_predictor", None)
+    monkeypatch.setattr(body_vitals, "_predictor_version", None)
+    monkeypatch.setattr(body_vitals, "_version_stats", {})
+
+    with pytest.raises(ValueError, match="corrupt"):
+        body_vitals.activate_version("v2")
+    assert registry.active_version() == source
+    assert "error" in body_vitals.model_versions_stats()["versions"]["v2"]
+
+    worker = body_vitals.activate_version("v3")
+    assert registry.active_version() == "v3"
+    assert worker["serving_version"] == "v3"
+
+
+def test_bundle_with_an_older_flat_format_is_served_from_its_pickles(registry):
+    versions = registry.versions()
+    derived = registry.active_version()
+    source = versions[derived]["derived_from"]
+    registry.verify(source)
+
+    old, new = registry.load(source), registry.load(derived)
+
+    assert (old.backend, new.backend) == ("sklearn", "flat")
+    features = np.random.default_rng(1).uniform(0, 200, size=(50, len(FEATURE_NAMES)))
+    assert np.array_equal(old.predict(features).label_status, new.predict(features).label_status)
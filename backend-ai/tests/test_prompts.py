@@ -0,0 +1,21 @@
+import importlib
+
+import pytest
+
+from Configurations.config import settings
+from Prompts.prefix_check import AGENT_MODULES
+
+
+@pytest.mark.parametrize("module_name", AGENT_MODULES)
+@pytest.mark.parametrize("mode", ["json_schema", "prompt"])
+def test_reply_format_is_only_described_by_format_instructions(module_name, mode, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_STRUCTURED_OUTPUT", mode)
+    module = importlib.import_module(module_name)
+    template = next(value for name, value in vars(module).items()
+                    if name.endswith("_prompt") and hasattr(value, "messages"))
+    text = template.messages[0].prompt.template
+
+    assert "{format_instructions}" in text
+    assert "valid JSON" not in text and "markdown" not in text
+    instructions = module.STRUCTURED_OUTPUT.format_instructions
+    assert ("markdown" in instructions) == (mode == "prompt")
@@ -0,0 +1,69 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from Vitals.inference import VitalsPredictions, FEATURE_NAMES
+from Vitals.rule_engine import RuleEngine, RuleRouter
+
+
+NORMAL_READING = {
+    "heart_rate": 75, "resp_rate": 16, "blood_pressure_systolic": 118, "blood_pressure_diastolic": 76,
+    "spo2": 98, "temperature_c": 36.8, "glucose_mgdl": 95,
+}
+
+
+def _features(*overrides: dict) -> np.ndarray:
+    return np.array([[{**NORMAL_READING, **override}[name] for name in FEATURE_NAMES] for override in overrides])
+
+
+class _Model:
+    """Stands in for the model: labels every reading it is asked about "Model"."""
+
+    def __init__(self):
+        self.scored = []
+
+    async def __call__(self, features: np.ndarray) -> VitalsPredictions:
+        self.scored.append(features.copy())
+        n = len(features)
+        return VitalsPredictions(np.full(n, "Model"), np.full(n, "Model"), np.full(n, 55.0), np.full(n, 55.0))
+
+
+@pytest.fixture
+def engine():
+    return RuleEngine.from_file("Vitals/vitals_rules.json")
+
+
+@pytest.mark.parametrize("value", [np.nan, np.inf, -np.inf])
+def test_rules_refuse_to_label_non_finite_readings(engine, value):
+    features = _features({}, {"heart_rate": value})
+
+    assert engine.decidable(features).tolist() == [True, False]
+    with pytest.raises(ValueError, match="NaN or infinite"):
+        engine.predict(features)
+
+
+@pytest.mark.parametrize("mode", ["hybrid", "rules"])
+def test_router_sends_non_finite_readings_to_the_model(engine, mode):
+    model = _Model()
+    router = RuleRouter(engine, mode=mode)
+    features = _features({}, {"spo2": np.nan}, {"heart_rate": 160})
+
+    predictions = asyncio.run(router.predict(features, model))
+
+    assert predictions.label_status.tolist() == ["Normal", "Model", "Critical"]
+    assert predictions.status_confidence.tolist() == [100.0, 55.0, 100.0]
+    assert len(model.scored) == 1 and np.isnan(model.scored[0][0, FEATURE_NAMES.index("spo2")])
+    assert router.stats()["undecidable"] == 1
+    assert router.stats()["rule_scored"] == 2
+
+
+def test_shadow_mode_compares_only_decidable_readings(engine):
+    router = RuleRouter(engine, mode="shadow")
+    features = _features({}, {"temperature_c": np.inf})
+
+    predictions = asyncio.run(router.predict(features, _Model()))
+
+    assert predictions.label_status.tolist() == ["Model", "Model"]
+    assert router.stats()["compared"] == 1
+    assert router.stats()["undecidable"] == 1
@@ -0,0 +1,77 @@
+import asyncio
+import json
+from itertools import combinations
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from DrugInteractionAgent import drug_interaction_agent as agent
+from PydanticModels.model import DrugInteractionInput
+
+
+class _GatedLLM:
+    """Fake chat model: replies once `gate` opens, with an interaction for every pair of prompted drugs."""
+
+    def __init__(self, drugs):
+        self.drugs = drugs
+        self.calls = 0
+        self.gate = asyncio.Event()
+
+    def bind(self, **options):
+        return self
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        prompted = [drug for drug in self.drugs if drug in messages[-1].content]
+        await self.gate.wait()
+        items = [{"severity": "moderate", "msg": f"{a}+{b}", "drugs": [a, b]} for a, b in combinations(prompted, 2)]
+        return AIMessage(content=json.dumps({"items": items}))
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    fake = _GatedLLM(["aspirin", "ibuprofen", "warfarin"])
+    monkeypatch.setattr(agent.llm_model, "LLM", lambda: fake)
+    agent._cache.clear()
+    yield fake
+    agent._cache.clear()
+
+
+async def _started(*requests):
+    tasks = [asyncio.ensure_future(request) for request in requests]
+    for _ in range(5):
+        await asyncio.sleep(0)
+    return tasks
+
+
+def test_identical_drug_requests_share_one_model_call(llm):
+    async def run():
+        tasks = await _started(*(agent.check_drug_interactions_async(DrugInteractionInput(drugs=drugs))
+                                 for drugs in (["Warfarin", "Aspirin"], ["aspirin", "warfarin sodium"])))
+        llm.gate.set()
+        return await asyncio.gather(*tasks)
+
+    first, second = asyncio.run(run())
+
+    assert llm.calls == 1
+    assert [interaction.msg for interaction in first] == [interaction.msg for interaction in second] == ["aspirin+warfarin"]
+
+
+def test_flight_is_not_shared_when_the_unseen_pairs_differ(llm):
+    drugs = DrugInteractionInput(drugs=["warfarin", "aspirin", "ibuprofen"])
+
+    async def run():
+        # The first request finds (aspirin, ibuprofen) cached and asks about the other two pairs only
+        agent._cache.set(agent._pair_key(("aspirin", "ibuprofen")), [])
+        (first,) = await _started(agent.check_drug_interactions_async(drugs))
+        # The entry expires before an identical request arrives: same drugs, one more unseen pair
+        agent._cache.clear()
+        (second,) = await _started(agent.check_drug_interactions_async(drugs))
+        llm.gate.set()
+        return await first, await second
+
+    first, second = asyncio.run(run())
+
+    assert llm.calls == 2
+    assert sorted(interaction.msg for interaction in first) == ["aspirin+warfarin", "ibuprofen+warfarin"]
+    assert sorted(interaction.msg for interaction in second) == ["aspirin+ibuprofen", "aspirin+warfarin", "ibuprofen+warfarin"]
@@ -0,0 +1,90 @@
+import pytest
+from langchain_core.prompts import ChatPromptTemplate
+
+from AgentRuntime.token_budget import TokenBudget, TokenBudgetError, truncate_text, compact_lines, count_tokens
+
+
+PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You review patient records. Reply with a short summary."),
+    ("human", "Patient: {patient}\nNotes:\n{notes}\nLab results:\n{labs}"),
+])
+
+COMPACTORS = {
+    "notes": truncate_text,
+    "labs": lambda text, max_tokens: compact_lines(text, max_tokens, keep=lambda line: "HIGH" in line),
+}
+
+
+class _Output:
+    """Stands in for an agent's StructuredOutput: a name and a small response schema."""
+
+    def __init__(self, name):
+        self.name = name
+        self.schema = {"type": "object", "properties": {"summary": {"type": "string"}}}
+
+
+def _budget(request, max_input_tokens):
+    return TokenBudget(_Output(f"test_{request.node.name}"), max_input_tokens=max_input_tokens)
+
+
+def _variables(notes_words=10, lab_lines=3, patient="P-1"):
+    notes = "Chief complaint: chest pain. " + " ".join(f"word{i}" for i in range(notes_words)) + " Plan: admit for observation."
+    labs = "\n".join(f"- test{i}: {i} mg/dL {'HIGH' if i % 50 == 0 else 'normal'}" for i in range(lab_lines))
+    return {"patient": patient, "notes": notes, "labs": labs}
+
+
+def test_prompt_within_budget_is_sent_unchanged(request):
+    budget = _budget(request, 4000)
+    variables = _variables()
+
+    messages = budget.fit(PROMPT, variables, COMPACTORS)
+
+    assert messages == PROMPT.format_messages(**variables)
+    assert budget.stats()["trimmed"] == 0 and budget.stats()["calls"] == 1
+
+
+def test_oversized_notes_keep_their_beginning_and_end(request):
+    budget = _budget(request, 600)
+    variables = _variables(notes_words=2000)
+    assert budget.count(PROMPT.format_messages(**variables)) > 600
+
+    messages = budget.fit(PROMPT, variables, COMPACTORS)
+
+    assert budget.count(messages) <= 600
+    patient_message = messages[-1].content
+    assert "Chief complaint: chest pain." in patient_message and "Plan: admit for observation." in patient_message
+    assert "omitted to fit the token budget" in patient_message
+    assert variables["labs"] in patient_message
+    assert messages[0].content == PROMPT.format_messages(**variables)[0].content
+    stats = budget.stats()
+    assert stats["trimmed"] == 1 and stats["tokens_trimmed"] > 0 and stats["max_tokens_seen"] <= 600
+
+
+def test_every_compactable_section_is_trimmed_when_needed(request):
+    budget = _budget(request, 600)
+    variables = _variables(notes_words=2000, lab_lines=400)
+
+    messages = budget.fit(PROMPT, variables, COMPACTORS)
+
+    assert budget.count(messages) <= 600
+    assert messages[-1].content.endswith("more entries omitted to fit the token budget")
+
+
+def test_compact_lines_drops_unflagged_entries_first():
+    labs = _variables(lab_lines=400)["labs"]
+
+    compacted = compact_lines(labs, 200, keep=lambda line: "HIGH" in line)
+
+    assert count_tokens(compacted) <= 200
+    assert all(f"- test{i}: {i} mg/dL HIGH" in compacted for i in range(0, 400, 50))
+    assert compacted.endswith("more entries omitted to fit the token budget")
+
+
+def test_prompt_over_budget_after_trimming_is_rejected(request):
+    budget = _budget(request, 300)
+    # The patient field has no compactor, so nothing can bring it under budget
+    variables = _variables(patient="x " * 2000)
+
+    with pytest.raises(TokenBudgetError, match="over its budget of 300"):
+        budget.fit(PROMPT, variables, COMPACTORS)
+    assert budget.stats()["rejected"] == 1 and budget.stats()["calls"] == 0
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from DiagnosisAgent import diagnosis_agent
+from DrugInteractionAgent import drug_interaction_agent
+from PydanticModels.model import DiagnosisInput, DrugInteractionInput
+
+INTERACTIONS = [
+    {"severity": "severe", "msg": "aspirin+warfarin", "drugs": ["aspirin", "warfarin"], "recommendation": None},
+    {"severity": "moderate", "msg": "ibuprofen+warfarin", "drugs": ["ibuprofen", "warfarin"], "recommendation": None},
+]
+
+
+class _FakeLLM:
+    """Fake chat model returning a fixed reply."""
+
+    def __init__(self, reply):
+        self.reply = reply
+
+    def bind(self, **options):
+        return self
+
+    def invoke(self, messages):
+        return self.reply
+
+
+@pytest.fixture
+def reply_with(monkeypatch):
+    def install(agent, reply):
+        monkeypatch.setattr(agent.llm_model, "LLM", lambda: _FakeLLM(reply))
+        agent._cache.clear()
+    yield install
+    drug_interaction_agent._cache.clear()
+    diagnosis_agent._cache.clear()
+
+
+def _pair_cached(pair):
+    return drug_interaction_agent._cache.get(drug_interaction_agent._pair_key(pair)) is not None
+
+
+def test_truncated_drug_reply_caches_nothing(reply_with):
+    complete = json.dumps({"items": INTERACTIONS})
+    # Cut off inside the second interaction: repair keeps the first and drops the rest
+    reply_with(drug_interaction_agent, AIMessage(content=complete[:complete.index("ibuprofen+") + 4],
+                                                 response_metadata={"finish_reason": "length"}))
+    drugs = DrugInteractionInput(drugs=["warfarin", "aspirin", "ibuprofen"])
+
+    interactions = drug_interaction_agent.check_drug_interactions(drugs)
+
+    assert [interaction.msg for interaction in interactions] == ["aspirin+warfarin"]
+    assert not any(_pair_cached(pair) for pair in [("aspirin", "ibuprofen"), ("aspirin", "warfarin"), ("ibuprofen", "warfarin")])
+
+
+def test_repaired_drug_reply_caches_nothing(reply_with):
+    # No finish_reason, but the reply only parses after repair
+    complete = json.dumps({"items": INTERACTIONS})
+    reply_with(drug_interaction_agent, AIMessage(content=complete[:complete.index("ibuprofen+") + 4]))
+
+    drug_interaction_agent.check_drug_interactions(DrugInteractionInput(drugs=["warfarin", "aspirin", "ibuprofen"]))
+
+    assert not _pair_cached(("aspirin", "ibuprofen"))
+
+
+def test_complete_drug_reply_is_cached_per_pair(reply_with):
+    reply_with(drug_interaction_agent, AIMessage(content=json.dumps({"items": INTERACTIONS}),
+                                                 response_metadata={"finish_reason": "stop"}))
+
+    drug_interaction_agent.check_drug_interactions(DrugInteractionInput(drugs=["warfarin", "aspirin", "ibuprofen"]))
+
+    assert drug_interaction_agent._cache.get(drug_interaction_agent._pair_key(("aspirin", "ibuprofen"))) == []
+    assert _pair_cached(("aspirin", "warfarin")) and _pair_cached(("ibuprofen", "warfarin"))
+
+
+def test_diagnosis_cut_off_at_the_token_limit_is_not_cached(reply_with):
+    diagnoses = {"items": [{"diagnosis": "Influenza", "icd10": "J11.1", "confidence": 70}]}
+    reply_with(diagnosis_agent, AIMessage(content=json.dumps(diagnoses), response_metadata={"finish_reason": "length"}))
+    user_input = DiagnosisInput(symptoms=["fever", "cough"])
+
+    assert diagnosis_agent.get_diagnosis(user_input)[0].diagnosis == "Influenza"
+    assert diagnosis_agent._cache.get(diagnosis_agent._cache_key(user_input)) is None
+    assert diagnosis_agent._cache.stats()["uncached"] >= 1
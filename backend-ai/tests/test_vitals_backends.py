@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Configurations.config import settings
+from Vitals.inference import FEATURE_NAMES
+from Vitals.model_registry import ModelRegistry, BASE_DIR
+
+
+@pytest.fixture(scope="module")
+def registry():
+    return ModelRegistry()
+
+
+@pytest.fixture(scope="module")
+def readings():
+    dataset = pd.read_csv(os.path.join(BASE_DIR, "Datasets", "vitals.csv"))[FEATURE_NAMES].to_numpy(dtype=np.float64)
+    low, high = dataset.min(axis=0), dataset.max(axis=0)
+    synthetic = np.random.default_rng(7).uniform(low, high, size=(2000, len(FEATURE_NAMES)))
+    return np.concatenate((dataset, synthetic))
+
+
+def test_flat_and_sklearn_backends_agree(registry, readings, monkeypatch):
+    monkeypatch.setattr(settings, "VITALS_FLAT_MAX_ROWS", 0)
+    version = registry.active_version()
+    flat, sklearn = registry.load(version, "flat"), registry.load(version, "pickle")
+    assert (flat.backend, sklearn.backend) == ("flat", "sklearn")
+
+    got, want = flat.predict(readings), sklearn.predict(readings)
+
+    for field in got._fields:
+        assert np.array_equal(getattr(got, field), getattr(want, field)), field
+
+
+def test_large_batches_go_to_sklearn_and_small_ones_stay_flat(registry, readings, monkeypatch):
+    monkeypatch.setattr(settings, "VITALS_FLAT_MAX_ROWS", 100)
+    predictor = registry.load(registry.active_version(), "flat")
+
+    predictor.predict(readings[:99])
+    assert predictor._large_batch_predictor is None
+
+    large = predictor.predict(readings[:100])
+    assert predictor._large_batch_predictor.backend == "sklearn"
+    assert np.array_equal(large.label_status, predictor._for_batch(1).predict(readings[:100]).label_status)
+
@@ -0,0 +1,79 @@
+import json
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from Configurations.config import settings
+from Vitals.body_vitals import FEATURE_NAMES, BINARY_READING_DTYPE, parse_readings, decode_frame
+
+
+def _reading(**values) -> dict:
+    reading = dict.fromkeys(FEATURE_NAMES, 1.0)
+    reading.update(values)
+    return reading
+
+
+def _with_value(literal: str) -> str:
+    """One reading as JSON text with `literal` written verbatim as its heart rate."""
+    return json.dumps(_reading(heart_rate=0.0)).replace('"heart_rate": 0.0', f'"heart_rate": {literal}')
+
+
+NON_FINITE = ["NaN", "Infinity", "-Infinity", "1e400"]
+
+
+@pytest.mark.parametrize("literal", NON_FINITE)
+def test_json_batch_rejects_non_finite_values(literal):
+    with pytest.raises(ValidationError):
+        parse_readings(f"[{_with_value(literal)}]".encode())
+
+
+@pytest.mark.parametrize("literal", NON_FINITE)
+def test_ndjson_batch_rejects_non_finite_values(literal):
+    body = f"{json.dumps(_reading())}\n{_with_value(literal)}\n".encode()
+    with pytest.raises(ValidationError):
+        parse_readings(body, ndjson=True)
+
+
+@pytest.mark.parametrize("literal", NON_FINITE)
+def test_websocket_text_frame_rejects_non_finite_values(literal):
+    with pytest.raises(ValueError, match="finite"):
+        decode_frame({"text": _with_value(literal)})
+
+
+@pytest.mark.parametrize("value", [np.nan, np.inf, -np.inf])
+def test_websocket_binary_frame_rejects_non_finite_values(value):
+    features = np.ones((1, len(FEATURE_NAMES)), dtype=BINARY_READING_DTYPE)
+    features[0, 0] = value
+    with pytest.raises(ValueError, match="finite"):
+        decode_frame({"bytes": features.tobytes()})
+
+
+def test_finite_readings_are_accepted_on_every_path():
+    reading = _reading(heart_rate=72.0)
+    expected = np.array([[reading[name] for name in FEATURE_NAMES]])
+    binary = expected.astype(BINARY_READING_DTYPE).tobytes()
+
+    assert np.array_equal(parse_readings(json.dumps([reading]).encode()), expected)
+    assert np.array_equal(parse_readings(json.dumps(reading).encode(), ndjson=True), expected)
+    assert np.array_equal(decode_frame({"text": json.dumps(reading)}), expected)
+    assert np.array_equal(decode_frame({"bytes": binary}), expected)
+
+
+def test_oversized_batch_is_refused_before_parsing(monkeypatch):
+    from Endpoints import body_vitals as endpoint
+
+    def parse_readings(*args):
+        raise AssertionError("the body was parsed")
+
+    monkeypatch.setattr(settings, "VITALS_BATCH_MAX_READINGS", 3)
+    monkeypatch.setattr(endpoint, "parse_readings", parse_readings)
+    app = FastAPI()
+    app.include_router(endpoint.router)
+    body = json.dumps([dict.fromkeys(FEATURE_NAMES, 1.0)] * 4)
+
+    response = TestClient(app).post("/predict/vitals/batch", content=body, headers={"content-type": "application/json"})
+
+    assert response.status_code == 413